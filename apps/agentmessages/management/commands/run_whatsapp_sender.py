@@ -0,0 +1,105 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from apps.agentmessages.models import OutboundMessage
+from apps.agentmessages.services import OutboundMessageService
+from utils.metrics.registry import metrics
+from utils.services.outbound_rate_limiter import get_outbound_rate_limiter
+from utils.services.whatsapp_service import WhatsAppService
+
+
+class Command(BaseCommand):
+    """
+    Comando para enviar las respuestas de WhatsApp encoladas por los webhooks.
+    Single Responsibility: Solo toma envíos vencidos de la cola y los entrega a Twilio
+
+    Los envíos se toman por turnos entre destinos y salen solo si hay cupo
+    por destino y por cuenta (WHATSAPP_DESTINATION_RATE / WHATSAPP_ACCOUNT_RATE);
+    si no, se reprograman para cuando lo haya. Un 429 pausa la cuenta
+    durante Retry-After sin perder el envío.
+    """
+    help = 'Worker que envía las respuestas de WhatsApp en cola, con límites por destino y cuenta, reintentos y backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Envíos simultáneos (por defecto WHATSAPP_SENDER_WORKERS)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Pausa cuando no hay envíos vencidos en segundos (default: 1)')
+        parser.add_argument('--once', action='store_true', help='Terminar cuando no queden envíos vencidos')
+
+    def handle(self, *args, **options):
+        """
+        Ejecuta el worker de envíos
+        """
+        workers = options['workers'] or getattr(settings, 'WHATSAPP_SENDER_WORKERS', 4)
+        if workers < 1:
+            raise CommandError('--workers debe ser mayor que 0')
+
+        service = OutboundMessageService()
+        self.rate_limiter = get_outbound_rate_limiter()
+        self.stdout.write(self.style.MIGRATE_HEADING(f'📤 Enviando respuestas de WhatsApp con {workers} workers'))
+
+        totals = {'sent': 0, 'deferred': 0, 'throttled': 0, 'retry': 0, 'failed': 0}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='whatsapp-sender') as pool:
+            while True:
+                batch = service.claim_due(workers * 2)
+                if not batch:
+                    metrics.set_gauge('whatsapp.outbound.queued', service.selector.count_queued())
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                for outcome in pool.map(lambda outbound: self._send(service, outbound), batch):
+                    totals[outcome] += 1
+                    metrics.increment('whatsapp.outbound.attempts', labels={'outcome': outcome})
+
+                self.stdout.write(f'   {self._summary(totals)}')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {self._summary(totals)}'))
+
+    def _summary(self, totals: dict) -> str:
+        return (
+            f'{totals["sent"]} enviados, {totals["deferred"]} demorados por límite, '
+            f'{totals["throttled"]} limitados por Twilio, {totals["retry"]} a reintentar, {totals["failed"]} fallidos'
+        )
+
+    def _send(self, service: OutboundMessageService, outbound: OutboundMessage) -> str:
+        """
+        Entrega un envío y guarda el resultado.
+
+        Args:
+            service: Servicio de la cola
+            outbound: Envío tomado de la cola
+
+        Returns:
+            str: 'sent', 'deferred', 'throttled', 'retry' o 'failed'
+        """
+        try:
+            account = outbound.source.get_credentials().get('additional1') or f'source-{outbound.source_id}'
+
+            # Sin cupo para el destino o la cuenta: vuelve a la cola sin gastar un intento
+            wait = self.rate_limiter.reserve(account, outbound.to_number)
+            if wait > 0:
+                service.defer(outbound, wait)
+                return 'deferred'
+
+            result = WhatsAppService(outbound.source).deliver(outbound.to_number, outbound.body)
+
+            if result['success']:
+                service.mark_sent(outbound, result)
+                return 'sent'
+
+            if result.get('retry_after') is not None:
+                self.rate_limiter.penalize(account, result['retry_after'])
+                service.defer(outbound, result['retry_after'])
+                return 'throttled'
+
+            if service.mark_failed(outbound, result['error'], result.get('retryable', False)):
+                return 'retry'
+
+            self.stdout.write(self.style.ERROR(f'   ✗ Envío {outbound.id} a {outbound.to_number} fallido: {result["error"]}'))
+            return 'failed'
+
+        finally:
+            close_old_connections()
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agentmessages", "0002_message_company_message_content_type_and_more"),
+        ("drive", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="drive_folder",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Carpeta del día en Google Drive",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="messages",
+                to="drive.drivefolder",
+            ),
+        ),
+    ]
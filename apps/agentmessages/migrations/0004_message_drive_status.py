@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agentmessages", "0003_message_drive_folder"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="drive_status",
+            field=models.CharField(
+                choices=[("uploaded", "Uploaded"), ("deleted", "Deleted")],
+                default="uploaded",
+                help_text="Estado del archivo en Drive según el feed de cambios",
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="drive_file_id",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="ID del archivo en Google Drive",
+                max_length=255,
+            ),
+        ),
+    ]
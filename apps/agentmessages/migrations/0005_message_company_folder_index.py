@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agentmessages", "0004_message_drive_status"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["company", "drive_folder_path"],
+                name="messages_company_folder_idx",
+            ),
+        ),
+    ]
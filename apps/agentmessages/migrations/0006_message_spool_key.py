@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agentmessages", "0005_message_company_folder_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="spool_key",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="Clave del archivo en el spool local mientras espera subir a Drive",
+                max_length=64,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="drive_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("uploaded", "Uploaded"),
+                    ("deleted", "Deleted"),
+                ],
+                default="uploaded",
+                help_text="Estado del archivo en Drive según el feed de cambios",
+                max_length=20,
+            ),
+        ),
+    ]
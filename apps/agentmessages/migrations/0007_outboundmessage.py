@@ -0,0 +1,109 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agentmessages", "0006_message_spool_key"),
+        ("sources", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboundMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "to_number",
+                    models.CharField(help_text="Número de destino", max_length=20),
+                ),
+                ("body", models.TextField(help_text="Texto del mensaje")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("sent", "Sent"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        help_text="Estado del envío",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Intentos de envío realizados"
+                    ),
+                ),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(
+                        help_text="Desde cuándo se puede (re)intentar el envío"
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True, help_text="Error del último intento fallido"
+                    ),
+                ),
+                (
+                    "provider_message_id",
+                    models.CharField(
+                        blank=True, help_text="SID del mensaje en Twilio", max_length=64
+                    ),
+                ),
+                (
+                    "provider_status",
+                    models.CharField(
+                        blank=True,
+                        help_text="Estado informado por Twilio al aceptar el mensaje",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "sent_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Fecha en que Twilio aceptó el mensaje",
+                        null=True,
+                    ),
+                ),
+                (
+                    "source",
+                    models.ForeignKey(
+                        help_text="Fuente (credenciales de Twilio) por la que se envía",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbound_messages",
+                        to="sources.source",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Outbound Message",
+                "verbose_name_plural": "Outbound Messages",
+                "db_table": "outbound_messages",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="outbound_status_next_idx",
+                    )
+                ],
+            },
+        ),
+    ]
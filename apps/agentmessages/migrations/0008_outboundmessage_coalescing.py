@@ -0,0 +1,39 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agentmessages", "0007_outboundmessage"),
+        ("sources", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboundmessage",
+            name="context",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Datos con los que se arma el texto de una respuesta agrupada",
+            ),
+        ),
+        migrations.AddField(
+            model_name="outboundmessage",
+            name="kind",
+            field=models.CharField(
+                blank=True,
+                help_text="Tipo de respuesta; las de un mismo tipo y destino se agrupan mientras esperan",
+                max_length=30,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="outboundmessage",
+            index=models.Index(
+                fields=["to_number", "kind", "status"],
+                name="outbound_to_kind_status_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agentmessages", "0008_outboundmessage_coalescing"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="spool_host",
+            field=models.CharField(
+                blank=True,
+                help_text="Nodo que tiene el archivo en su spool local",
+                max_length=255,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="drive_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("draining", "Draining"),
+                    ("uploaded", "Uploaded"),
+                    ("deleted", "Deleted"),
+                ],
+                default="uploaded",
+                help_text="Estado del archivo en Drive según el feed de cambios",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("agentmessages", "0009_message_spool_host"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="spool_attempts",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                help_text="Intentos fallidos de subir el archivo desde el spool",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="drive_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("draining", "Draining"),
+                    ("uploaded", "Uploaded"),
+                    ("failed", "Failed"),
+                    ("deleted", "Deleted"),
+                ],
+                default="uploaded",
+                help_text="Estado del archivo en Drive según el feed de cambios",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -15,6 +15,14 @@ class Message(BaseModel):
         ('other', 'Other'),
     ]
     
+    DRIVE_STATUSES = [
+        ('pending', 'Pending'),
+        ('draining', 'Draining'),
+        ('uploaded', 'Uploaded'),
+        ('failed', 'Failed'),
+        ('deleted', 'Deleted'),
+    ]
+    
     # Relación con Source
     source = models.ForeignKey(
         'sources.Source', 
@@ -87,6 +95,7 @@ class Message(BaseModel):
     drive_file_id = models.CharField(
         max_length=255, 
         blank=True,
+        db_index=True,
         help_text="ID del archivo en Google Drive"
     )
     drive_shared_link = models.URLField(
@@ -98,12 +107,127 @@ class Message(BaseModel):
         blank=True,
         help_text="Ruta de la carpeta en Google Drive"
     )
+    drive_folder = models.ForeignKey(
+        'drive.DriveFolder',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='messages',
+        help_text="Carpeta del día en Google Drive"
+    )
+    drive_status = models.CharField(
+        max_length=20,
+        choices=DRIVE_STATUSES,
+        default='uploaded',
+        help_text="Estado del archivo en Drive según el feed de cambios"
+    )
+    spool_key = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text="Clave del archivo en el spool local mientras espera subir a Drive"
+    )
+    spool_host = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Nodo que tiene el archivo en su spool local"
+    )
+    spool_attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Intentos fallidos de subir el archivo desde el spool"
+    )
     
     
     class Meta:
         db_table = 'messages'
+        indexes = [
+            # Conteo de archivos por carpeta para desbordar a subcarpetas por hora
+            models.Index(fields=['company', 'drive_folder_path'], name='messages_company_folder_idx'),
+        ]
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
     
     def __str__(self):
         return f"{self.filename} from {self.sender_number}"
+
+
+class OutboundMessage(BaseModel):
+    """
+    Modelo para representar una respuesta pendiente o enviada a WhatsApp.
+    Single Responsibility: Solo guarda la cola de envíos y el resultado de cada uno
+    """
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    source = models.ForeignKey(
+        'sources.Source',
+        on_delete=models.CASCADE,
+        related_name='outbound_messages',
+        help_text="Fuente (credenciales de Twilio) por la que se envía"
+    )
+    to_number = models.CharField(
+        max_length=20,
+        help_text="Número de destino"
+    )
+    body = models.TextField(
+        help_text="Texto del mensaje"
+    )
+    kind = models.CharField(
+        max_length=30,
+        blank=True,
+        help_text="Tipo de respuesta; las de un mismo tipo y destino se agrupan mientras esperan"
+    )
+    context = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Datos con los que se arma el texto de una respuesta agrupada"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUSES,
+        default='queued',
+        help_text="Estado del envío"
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Intentos de envío realizados"
+    )
+    next_attempt_at = models.DateTimeField(
+        help_text="Desde cuándo se puede (re)intentar el envío"
+    )
+    last_error = models.TextField(
+        blank=True,
+        help_text="Error del último intento fallido"
+    )
+    provider_message_id = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text="SID del mensaje en Twilio"
+    )
+    provider_status = models.CharField(
+        max_length=20,
+        blank=True,
+        help_text="Estado informado por Twilio al aceptar el mensaje"
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Fecha en que Twilio aceptó el mensaje"
+    )
+    
+    class Meta:
+        db_table = 'outbound_messages'
+        indexes = [
+            # Búsqueda de envíos vencidos por el worker
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_status_next_idx'),
+            # Respuesta abierta de un destino a la que se suman archivos
+            models.Index(fields=['to_number', 'kind', 'status'], name='outbound_to_kind_status_idx'),
+        ]
+        verbose_name = 'Outbound Message'
+        verbose_name_plural = 'Outbound Messages'
+    
+    def __str__(self):
+        return f"{self.to_number} ({self.status})"
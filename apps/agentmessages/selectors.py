@@ -1,7 +1,8 @@
 from typing import Optional, List
-from django.db.models import QuerySet
+from django.db.models import F, Q, QuerySet, Window
+from django.db.models.functions import RowNumber
 from datetime import datetime
-from .models import Message
+from .models import Message, OutboundMessage
 
 
 class MessageSelector:
@@ -131,3 +132,149 @@ class MessageSelector:
             QuerySet[Message]: Mensajes del tipo de archivo
         """
         return Message.objects.filter(file_type=file_type).order_by('-created_at')
+    
+    @staticmethod
+    def get_messages_by_drive_folder(folder_id: str) -> QuerySet[Message]:
+        """
+        Obtiene los mensajes guardados en una carpeta de Drive.
+        
+        Args:
+            folder_id: ID de la carpeta en Google Drive
+            
+        Returns:
+            QuerySet[Message]: Mensajes de la carpeta
+        """
+        return Message.objects.filter(drive_folder__folder_id=folder_id).order_by('-created_at')
+    
+    @staticmethod
+    def count_messages_in_folder(company_id: int, folder_path: str) -> int:
+        """
+        Cuenta los archivos guardados directamente en una carpeta.
+        
+        Args:
+            company_id: ID de la compañía
+            folder_path: Ruta de la carpeta (Message.drive_folder_path)
+            
+        Returns:
+            int: Cantidad de mensajes en la carpeta
+        """
+        return Message.objects.filter(company_id=company_id, drive_folder_path=folder_path).count()
+    
+    @staticmethod
+    def get_spooled_messages(host: Optional[str] = None, stale_before: Optional[datetime] = None) -> QuerySet[Message]:
+        """
+        Obtiene los mensajes cuyo archivo espera en el spool local para subir a Drive.
+        
+        Args:
+            host: Solo los guardados en el spool de este nodo (y los anteriores
+                a registrar el nodo); None para todos
+            stale_before: Incluir también los tomados por un drain que no
+                terminó antes de esta fecha (opcional)
+            
+        Returns:
+            QuerySet[Message]: Mensajes pendientes, del más antiguo al más reciente
+        """
+        pending = Q(drive_status='pending')
+        if stale_before:
+            pending |= Q(drive_status='draining', updated_at__lt=stale_before)
+        
+        messages = Message.objects.filter(pending).exclude(spool_key='')
+        if host is not None:
+            messages = messages.filter(spool_host__in=[host, ''])
+        
+        return messages.select_related('company').order_by('id')
+    
+    @staticmethod
+    def get_recent_senders_by_company(company_id: int, since: datetime) -> List[str]:
+        """
+        Obtiene los remitentes que enviaron mensajes a una compañía desde una fecha.
+        
+        Args:
+            company_id: ID de la compañía
+            since: Fecha desde
+            
+        Returns:
+            List[str]: Números de los remitentes, sin repetir
+        """
+        return list(
+            Message.objects.filter(company_id=company_id, created_at__gte=since)
+            .exclude(sender_number__isnull=True)
+            .exclude(sender_number='')
+            .values_list('sender_number', flat=True)
+            .distinct()
+        )
+
+
+class OutboundMessageSelector:
+    """
+    Selector para operaciones de consulta de OutboundMessage.
+    Single Responsibility: Solo maneja consultas a la base de datos para OutboundMessage
+    """
+    
+    @staticmethod
+    def get_due_messages(now: datetime) -> QuerySet[OutboundMessage]:
+        """
+        Obtiene los envíos en cola que ya se pueden intentar.
+        
+        Args:
+            now: Fecha actual
+            
+        Returns:
+            QuerySet[OutboundMessage]: Envíos vencidos, del más antiguo al más reciente
+        """
+        return OutboundMessage.objects.filter(status='queued', next_attempt_at__lte=now).order_by('next_attempt_at', 'id')
+    
+    @staticmethod
+    def get_due_messages_round_robin(now: datetime) -> QuerySet[OutboundMessage]:
+        """
+        Obtiene los envíos vencidos intercalando destinos: el más antiguo de
+        cada destino, luego el segundo de cada uno, y así.
+        
+        Args:
+            now: Fecha actual
+            
+        Returns:
+            QuerySet[OutboundMessage]: Envíos vencidos en orden de turnos
+        """
+        return (
+            OutboundMessage.objects.filter(status='queued', next_attempt_at__lte=now)
+            .annotate(turn=Window(
+                expression=RowNumber(),
+                partition_by=[F('to_number')],
+                order_by=[F('next_attempt_at').asc(), F('id').asc()],
+            ))
+            .order_by('turn', 'next_attempt_at', 'id')
+        )
+    
+    @staticmethod
+    def get_open_batch(source_id: int, to_number: str, kind: str, now: datetime) -> QuerySet[OutboundMessage]:
+        """
+        Obtiene la respuesta agrupada de un destino que todavía no salió.
+        
+        Args:
+            source_id: ID de la fuente
+            to_number: Número de destino
+            kind: Tipo de respuesta
+            now: Fecha actual
+            
+        Returns:
+            QuerySet[OutboundMessage]: Respuesta abierta (a lo sumo una en la práctica)
+        """
+        return OutboundMessage.objects.filter(
+            source_id=source_id,
+            to_number=to_number,
+            kind=kind,
+            status='queued',
+            attempts=0,
+            next_attempt_at__gt=now,
+        ).order_by('id')
+    
+    @staticmethod
+    def count_queued() -> int:
+        """
+        Cuenta los envíos que siguen en cola (incluye los que esperan un reintento).
+        
+        Returns:
+            int: Cantidad de envíos en cola
+        """
+        return OutboundMessage.objects.filter(status='queued').count()
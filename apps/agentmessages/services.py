@@ -1,8 +1,21 @@
-from typing import Optional, Dict, Any
-from .models import Message
-from .selectors import MessageSelector
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Callable
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Message, OutboundMessage
+from .selectors import MessageSelector, OutboundMessageSelector
 from apps.sources.models import Source
 from apps.users.services import UserService
+from apps.drive.selectors import DriveFolderSelector
+
+# Locks para serializar la agrupación dentro del proceso: un número fijo
+# repartido por hash de (fuente, destino, tipo), así no crecen con cada destino
+_COALESCE_LOCK_STRIPES = 64
+_coalesce_locks = [threading.Lock() for _ in range(_COALESCE_LOCK_STRIPES)]
 
 
 class MessageService:
@@ -34,6 +47,11 @@ class MessageService:
                 data['sender_number'], company_phone
             )
             
+            # Resolver la carpeta del día desde el índice de carpetas
+            drive_folder = None
+            if data.get('drive_folder_id'):
+                drive_folder = DriveFolderSelector.get_folder_by_folder_id(data['drive_folder_id'])
+            
             # Crear el mensaje
             message = Message.objects.create(
                 source=data['source'],
@@ -49,12 +67,96 @@ class MessageService:
                 drive_file_id=data.get('drive_file_id', ''),
                 drive_shared_link=data.get('drive_shared_link', ''),
                 drive_folder_path=data.get('drive_folder_path', ''),
+                drive_folder=drive_folder,
+                drive_status=data.get('drive_status', 'uploaded'),
+                spool_key=data.get('spool_key', ''),
+                spool_host=data.get('spool_host', ''),
             )
             return message
         except Exception as e:
             print(f"Error creando mensaje: {e}")
             return None
     
+    def complete_spooled_upload(self, message: Message, drive_result: Dict[str, Any]) -> Message:
+        """
+        Marca como subido un mensaje cuyo archivo estaba en el spool local.
+        
+        Args:
+            message: Mensaje pendiente
+            drive_result: Resultado de DriveService.upload_spooled_file
+            
+        Returns:
+            Message: Mensaje actualizado
+        """
+        message.drive_file_id = drive_result['drive_file_id']
+        message.drive_shared_link = drive_result['drive_shared_link']
+        message.drive_folder_path = drive_result['drive_folder_path']
+        message.drive_folder = DriveFolderSelector.get_folder_by_folder_id(drive_result['drive_folder_id'])
+        message.drive_status = 'uploaded'
+        message.spool_key = ''
+        message.save(update_fields=[
+            'drive_file_id', 'drive_shared_link', 'drive_folder_path',
+            'drive_folder', 'drive_status', 'spool_key', 'updated_at'
+        ])
+        return message
+    
+    def claim_spooled_upload(self, message: Message, stale_before: datetime) -> bool:
+        """
+        Toma un mensaje del spool para subirlo, así dos drains no suben el
+        mismo archivo. La marca se hace con un UPDATE condicional, sin dejar
+        una transacción abierta durante la subida.
+        
+        Args:
+            message: Mensaje pendiente
+            stale_before: Los tomados antes de esta fecha se consideran abandonados
+            
+        Returns:
+            bool: True si este proceso tomó el mensaje
+        """
+        now = timezone.now()
+        claimed = (
+            Message.objects.filter(id=message.id)
+            .filter(Q(drive_status='pending') | Q(drive_status='draining', updated_at__lt=stale_before))
+            .update(drive_status='draining', updated_at=now)
+        )
+        if claimed:
+            message.drive_status = 'draining'
+            message.updated_at = now
+        return bool(claimed)
+    
+    def release_spooled_upload(self, message: Message) -> Message:
+        """
+        Devuelve al spool un mensaje tomado que no se pudo subir.
+        
+        Args:
+            message: Mensaje tomado con claim_spooled_upload
+            
+        Returns:
+            Message: Mensaje actualizado
+        """
+        message.drive_status = 'pending'
+        message.save(update_fields=['drive_status', 'updated_at'])
+        return message
+    
+    def record_spooled_failure(self, message: Message, permanent: bool = False) -> bool:
+        """
+        Registra un intento fallido de subir un archivo del spool que no se
+        debe a que Drive esté caído. Pasados DRIVE_SPOOL_MAX_ATTEMPTS (o si el
+        error es permanente) el mensaje queda 'failed' y deja de reintentarse.
+        
+        Args:
+            message: Mensaje tomado con claim_spooled_upload
+            permanent: True si reintentar no tiene sentido (p. ej. el archivo no existe)
+            
+        Returns:
+            bool: True si el mensaje quedó 'failed'
+        """
+        message.spool_attempts += 1
+        max_attempts = getattr(settings, 'DRIVE_SPOOL_MAX_ATTEMPTS', 5)
+        message.drive_status = 'failed' if permanent or message.spool_attempts >= max_attempts else 'pending'
+        message.save(update_fields=['spool_attempts', 'drive_status', 'updated_at'])
+        return message.drive_status == 'failed'
+    
     def validate_message_data(self, data: Dict[str, Any]) -> bool:
         """
         Valida los datos de un mensaje.
@@ -142,3 +244,173 @@ class MessageService:
             'company_name': message.company.name if message.company else None,
             'created_at': message.created_at,
         }
+
+
+class OutboundMessageService:
+    """
+    Servicio para operaciones de negocio de OutboundMessage.
+    Single Responsibility: Solo maneja la cola de respuestas a WhatsApp y sus reintentos
+    
+    Un envío tomado por un worker sigue en 'queued' con next_attempt_at
+    corrido WHATSAPP_SEND_LEASE_SECONDS: si el worker muere a mitad del
+    envío, otro lo retoma al vencer ese plazo.
+    """
+    
+    def __init__(self):
+        self.selector = OutboundMessageSelector()
+    
+    def enqueue(self, source: Source, to_number: str, body: str) -> OutboundMessage:
+        """
+        Encola una respuesta para enviarla en segundo plano.
+        
+        Args:
+            source: Fuente con las credenciales de Twilio
+            to_number: Número de destino
+            body: Texto del mensaje
+            
+        Returns:
+            OutboundMessage: Envío encolado
+        """
+        return OutboundMessage.objects.create(
+            source=source,
+            to_number=to_number,
+            body=body,
+            next_attempt_at=timezone.now(),
+        )
+    
+    def enqueue_coalesced(self, source: Source, to_number: str, kind: str, item: Dict[str, Any],
+                          render: Callable[[Dict[str, Any]], str], context: Dict[str, Any] = None) -> OutboundMessage:
+        """
+        Suma un elemento a la respuesta de un destino que todavía espera, o
+        abre una nueva que sale en WHATSAPP_COALESCE_SECONDS. Sale antes si
+        junta WHATSAPP_COALESCE_MAX_ITEMS elementos.
+        
+        Args:
+            source: Fuente con las credenciales de Twilio
+            to_number: Número de destino
+            kind: Tipo de respuesta (solo se agrupan las del mismo tipo)
+            item: Elemento a sumar (se guarda en context['items'])
+            render: Arma el texto a partir del context
+            context: Datos comunes de la respuesta (los más recientes pisan a los anteriores)
+            
+        Returns:
+            OutboundMessage: Respuesta encolada
+        """
+        now = timezone.now()
+        window = getattr(settings, 'WHATSAPP_COALESCE_SECONDS', 10)
+        max_items = getattr(settings, 'WHATSAPP_COALESCE_MAX_ITEMS', 20)
+        
+        key = f"outbound:{source.id}:{to_number}:{kind}"
+        
+        # Sin el lock, dos primeros elementos simultáneos abrirían dos respuestas:
+        # no hay fila que bloquear hasta que una de ellas se guarda
+        with _coalesce_locks[hash(key) % _COALESCE_LOCK_STRIPES], transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Entre procesos: se suelta al terminar la transacción
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [key])
+            
+            # El lock de la fila evita que el worker la tome mientras se le suma un elemento
+            outbound = self.selector.get_open_batch(source.id, to_number, kind, now).select_for_update().first()
+            # Una respuesta devuelta a la cola por límite de envíos sigue abierta,
+            # salvo que ya esté completa
+            if outbound is None or len(outbound.context.get('items', [])) >= max_items:
+                outbound = OutboundMessage(source=source, to_number=to_number, kind=kind,
+                                           context={'items': []}, next_attempt_at=now + timedelta(seconds=window))
+            
+            outbound.context.update(context or {})
+            outbound.context['items'].append(item)
+            outbound.body = render(outbound.context)
+            if len(outbound.context['items']) >= max_items:
+                outbound.next_attempt_at = now
+            outbound.save()
+        
+        return outbound
+    
+    def claim_due(self, limit: int) -> List[OutboundMessage]:
+        """
+        Toma envíos vencidos para un worker, por turnos entre destinos: primero
+        el más antiguo de cada destino, después el segundo de cada uno, etc.
+        Así un remitente con cien respuestas en cola no posterga a los demás.
+        Con Postgres varios workers pueden tomar a la vez sin repetirse (SKIP LOCKED).
+        
+        Args:
+            limit: Máximo de envíos a tomar
+            
+        Returns:
+            List[OutboundMessage]: Envíos tomados, con su fuente
+        """
+        now = timezone.now()
+        lease = getattr(settings, 'WHATSAPP_SEND_LEASE_SECONDS', 60)
+        candidates = list(self.selector.get_due_messages_round_robin(now).values_list('id', flat=True)[:limit])
+        
+        with transaction.atomic():
+            ids = list(
+                self.selector.get_due_messages(now)
+                .filter(id__in=candidates)
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)
+            )
+            OutboundMessage.objects.filter(id__in=ids).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=lease),
+            )
+        
+        return list(OutboundMessage.objects.filter(id__in=ids).select_related('source').order_by('id'))
+    
+    def defer(self, outbound: OutboundMessage, seconds: float) -> None:
+        """
+        Devuelve a la cola un envío tomado que no salió por límite de envíos
+        (propio o un 429 de Twilio). No cuenta como intento.
+        
+        Args:
+            outbound: Envío
+            seconds: Segundos hasta poder reintentarlo
+        """
+        outbound.attempts = max(0, outbound.attempts - 1)
+        outbound.next_attempt_at = timezone.now() + timedelta(seconds=seconds)
+        outbound.save(update_fields=['attempts', 'next_attempt_at', 'updated_at'])
+    
+    def mark_sent(self, outbound: OutboundMessage, result: Dict[str, Any]) -> None:
+        """
+        Guarda el resultado de un envío aceptado por Twilio.
+        
+        Args:
+            outbound: Envío
+            result: Resultado de WhatsAppService.deliver
+        """
+        outbound.status = 'sent'
+        outbound.provider_message_id = result.get('message_sid') or ''
+        outbound.provider_status = result.get('status') or ''
+        outbound.sent_at = timezone.now()
+        outbound.last_error = ''
+        outbound.save(update_fields=['status', 'provider_message_id', 'provider_status', 'sent_at', 'last_error', 'updated_at'])
+    
+    def mark_failed(self, outbound: OutboundMessage, error: str, retryable: bool) -> bool:
+        """
+        Guarda un intento fallido y programa el reintento con backoff
+        exponencial, o da el envío por fallido.
+        
+        Args:
+            outbound: Envío
+            error: Error del intento
+            retryable: Si el error es transitorio (caída, timeout, 5xx, 429)
+            
+        Returns:
+            bool: True si se va a reintentar
+        """
+        max_attempts = getattr(settings, 'WHATSAPP_SEND_MAX_ATTEMPTS', 6)
+        outbound.last_error = error
+        
+        if retryable and outbound.attempts < max_attempts:
+            base = getattr(settings, 'WHATSAPP_SEND_BACKOFF_SECONDS', 2)
+            ceiling = getattr(settings, 'WHATSAPP_SEND_BACKOFF_MAX_SECONDS', 300)
+            # Jitter para que una caída no genere reintentos sincronizados
+            delay = min(ceiling, base * 2 ** (outbound.attempts - 1)) * random.uniform(0.5, 1)
+            outbound.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            outbound.save(update_fields=['last_error', 'next_attempt_at', 'updated_at'])
+            return True
+        
+        outbound.status = 'failed'
+        outbound.save(update_fields=['status', 'last_error', 'updated_at'])
+        return False
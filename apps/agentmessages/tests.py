@@ -1,3 +1,286 @@
-from django.test import TestCase
+import threading
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from apps.sources.models import Source
+from utils.drive.rate_limiter import DatabaseBucketStore, LocalBucketStore
+from utils.services.outbound_rate_limiter import OutboundRateLimiter
+from .models import OutboundMessage
+from .services import OutboundMessageService
 
-# Create your tests here.
+
+def render_items(context):
+    return ', '.join(context['items'])
+
+
+class OutboundQueueTestMixin:
+    """
+    Datos comunes de los tests de la cola de envíos.
+    """
+
+    def setUp(self):
+        self.source = Source.objects.create(name='whatsapp', api_key='key-whatsapp', additional1='AC1')
+        self.service = OutboundMessageService()
+
+    def make_due(self, outbound):
+        OutboundMessage.objects.filter(id=outbound.id).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+
+class OutboundMessageServiceTests(OutboundQueueTestMixin, TestCase):
+    """
+    Tests de la cola de respuestas de WhatsApp.
+    """
+
+    def test_claim_due_takes_destinations_in_turns(self):
+        for index in range(3):
+            self.service.enqueue(self.source, '+1555000111', f'flood {index}')
+        self.service.enqueue(self.source, '+1555000222', 'b')
+        self.service.enqueue(self.source, '+1555000333', 'c')
+
+        claimed = self.service.claim_due(3)
+
+        self.assertEqual(sorted(outbound.to_number for outbound in claimed), ['+1555000111', '+1555000222', '+1555000333'])
+
+    def test_claimed_messages_are_leased_and_count_an_attempt(self):
+        self.service.enqueue(self.source, '+1555000111', 'hola')
+
+        claimed = self.service.claim_due(10)
+
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertGreater(claimed[0].next_attempt_at, timezone.now())
+        self.assertEqual(self.service.claim_due(10), [])
+
+    def test_claim_due_skips_messages_not_yet_due(self):
+        outbound = self.service.enqueue(self.source, '+1555000111', 'hola')
+        OutboundMessage.objects.filter(id=outbound.id).update(next_attempt_at=timezone.now() + timedelta(minutes=1))
+
+        self.assertEqual(self.service.claim_due(10), [])
+
+    def test_defer_requeues_without_using_an_attempt(self):
+        self.service.enqueue(self.source, '+1555000111', 'hola')
+        outbound = self.service.claim_due(1)[0]
+
+        self.service.defer(outbound, 30)
+
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.attempts, 0)
+        self.assertEqual(outbound.status, 'queued')
+        self.assertGreater(outbound.next_attempt_at, timezone.now() + timedelta(seconds=25))
+        self.assertEqual(self.service.claim_due(10), [])
+
+        self.make_due(outbound)
+        self.assertEqual([claimed.id for claimed in self.service.claim_due(10)], [outbound.id])
+
+    @override_settings(WHATSAPP_SEND_MAX_ATTEMPTS=2, WHATSAPP_SEND_BACKOFF_SECONDS=10)
+    def test_mark_failed_retries_with_backoff_then_gives_up(self):
+        self.service.enqueue(self.source, '+1555000111', 'hola')
+
+        outbound = self.service.claim_due(1)[0]
+        self.assertTrue(self.service.mark_failed(outbound, 'HTTP 503', retryable=True))
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, 'queued')
+        self.assertGreater(outbound.next_attempt_at, timezone.now() + timedelta(seconds=4))
+
+        self.make_due(outbound)
+        outbound = self.service.claim_due(1)[0]
+        self.assertFalse(self.service.mark_failed(outbound, 'HTTP 503', retryable=True))
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, 'failed')
+        self.assertEqual(outbound.last_error, 'HTTP 503')
+
+    def test_mark_failed_does_not_retry_permanent_errors(self):
+        self.service.enqueue(self.source, '+1555000111', 'hola')
+        outbound = self.service.claim_due(1)[0]
+
+        self.assertFalse(self.service.mark_failed(outbound, 'HTTP 400', retryable=False))
+
+        outbound.refresh_from_db()
+        self.assertEqual(outbound.status, 'failed')
+
+
+@override_settings(WHATSAPP_COALESCE_SECONDS=10, WHATSAPP_COALESCE_MAX_ITEMS=3)
+class OutboundCoalescingTests(OutboundQueueTestMixin, TestCase):
+    """
+    Tests de la agrupación de respuestas por destino.
+    """
+
+    def enqueue(self, item, to_number='+1555000111'):
+        return self.service.enqueue_coalesced(self.source, to_number, 'files_uploaded', item, render_items)
+
+    def test_items_within_window_join_one_reply(self):
+        first = self.enqueue('a.jpg')
+        second = self.enqueue('b.jpg')
+
+        self.assertEqual(first.id, second.id)
+        second.refresh_from_db()
+        self.assertEqual(second.body, 'a.jpg, b.jpg')
+        self.assertEqual(self.service.claim_due(10), [])
+
+    def test_destinations_are_not_mixed(self):
+        first = self.enqueue('a.jpg')
+        other = self.enqueue('b.jpg', to_number='+1555000222')
+
+        self.assertNotEqual(first.id, other.id)
+
+    def test_full_reply_is_sent_immediately_and_next_item_opens_a_new_one(self):
+        for item in ('a.jpg', 'b.jpg', 'c.jpg'):
+            full = self.enqueue(item)
+        following = self.enqueue('d.jpg')
+
+        self.assertNotEqual(full.id, following.id)
+        self.assertEqual([outbound.id for outbound in self.service.claim_due(10)], [full.id])
+
+    def test_claimed_reply_is_not_reopened(self):
+        first = self.enqueue('a.jpg')
+        self.make_due(first)
+        self.service.claim_due(10)
+
+        second = self.enqueue('b.jpg')
+
+        self.assertNotEqual(first.id, second.id)
+
+    def test_deferred_reply_is_reopened(self):
+        first = self.enqueue('a.jpg')
+        self.make_due(first)
+        claimed = self.service.claim_due(10)[0]
+        self.service.defer(claimed, 5)
+
+        second = self.enqueue('b.jpg')
+
+        self.assertEqual(first.id, second.id)
+        second.refresh_from_db()
+        self.assertEqual(second.context['items'], ['a.jpg', 'b.jpg'])
+        self.assertEqual(second.attempts, 0)
+
+    def test_full_deferred_reply_does_not_grow(self):
+        for item in ('a.jpg', 'b.jpg', 'c.jpg'):
+            full = self.enqueue(item)
+        claimed = self.service.claim_due(10)[0]
+        self.service.defer(claimed, 5)
+
+        following = self.enqueue('d.jpg')
+
+        self.assertNotEqual(full.id, following.id)
+        full.refresh_from_db()
+        self.assertEqual(len(full.context['items']), 3)
+        self.assertGreater(full.next_attempt_at, timezone.now())
+
+
+@override_settings(WHATSAPP_COALESCE_SECONDS=10, WHATSAPP_COALESCE_MAX_ITEMS=3)
+class OutboundCoalescingRaceTests(OutboundQueueTestMixin, TransactionTestCase):
+    """
+    Tests de la agrupación con varios webhooks a la vez.
+    """
+    
+    def test_concurrent_first_items_open_one_reply(self):
+        both_started = threading.Barrier(2)
+        errors = []
+        
+        def slow_render(context):
+            # Sin el lock los dos buscarían antes de que cualquiera guarde
+            time.sleep(0.2)
+            return render_items(context)
+        
+        def enqueue(item):
+            try:
+                both_started.wait(5)
+                self.service.enqueue_coalesced(self.source, '+1555000111', 'files_uploaded', item, slow_render)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=enqueue, args=(item,)) for item in ('a.jpg', 'b.jpg')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(OutboundMessage.objects.count(), 1)
+        self.assertEqual(sorted(OutboundMessage.objects.get().context['items']), ['a.jpg', 'b.jpg'])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'SKIP LOCKED requiere Postgres')
+class OutboundClaimLockingTests(OutboundQueueTestMixin, TransactionTestCase):
+    """
+    Tests de la toma concurrente de envíos entre workers.
+    """
+
+    def test_claim_due_skips_rows_locked_by_another_worker(self):
+        locked = self.service.enqueue(self.source, '+1555000111', 'tomado')
+        free = self.service.enqueue(self.source, '+1555000222', 'libre')
+        row_locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    OutboundMessage.objects.select_for_update().get(id=locked.id)
+                    row_locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        worker = threading.Thread(target=hold_lock)
+        worker.start()
+        try:
+            self.assertTrue(row_locked.wait(10))
+            claimed = self.service.claim_due(10)
+        finally:
+            release.set()
+            worker.join()
+
+        self.assertEqual([outbound.id for outbound in claimed], [free.id])
+
+
+@override_settings(WHATSAPP_ACCOUNT_RATE=2, WHATSAPP_ACCOUNT_BURST=4, WHATSAPP_DESTINATION_RATE=1, WHATSAPP_DESTINATION_BURST=2)
+class OutboundRateLimiterTests(SimpleTestCase):
+    """
+    Tests del límite de envíos por destino y por cuenta.
+    """
+    
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('utils.services.outbound_rate_limiter.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = OutboundRateLimiter(store=LocalBucketStore())
+    
+    def test_destination_burst_then_waits_without_sleeping(self):
+        with mock.patch('time.sleep') as sleep:
+            waits = [self.limiter.reserve('AC1', '+1555000111') for _ in range(3)]
+        
+        self.assertEqual(waits, [0, 0, 1.0])
+        sleep.assert_not_called()
+    
+    def test_saturated_destination_does_not_hold_back_others(self):
+        for _ in range(3):
+            self.limiter.reserve('AC1', '+1555000111')
+        
+        self.assertEqual(self.limiter.reserve('AC1', '+1555000222'), 0)
+    
+    def test_account_limit_applies_across_destinations(self):
+        waits = [self.limiter.reserve('AC1', f'+155500011{index}') for index in range(5)]
+        
+        self.assertEqual(waits, [0, 0, 0, 0, 0.5])
+        self.assertEqual(self.limiter.reserve('AC2', '+1555000199'), 0)
+    
+    def test_penalize_pauses_the_account(self):
+        self.limiter.penalize('AC1', 30)
+        
+        self.assertGreaterEqual(self.limiter.reserve('AC1', '+1555000111'), 30)
+        self.now += 31
+        self.assertEqual(self.limiter.reserve('AC1', '+1555000222'), 0)
+    
+    @override_settings(REDIS_URL='', WHATSAPP_RATE_LIMIT_BACKEND='', DRIVE_RATE_LIMIT_BACKEND='')
+    def test_account_buckets_are_shared_without_redis(self):
+        limiter = OutboundRateLimiter()
+        
+        self.assertIsInstance(limiter.store, DatabaseBucketStore)
+        self.assertIsInstance(limiter.destination_store, LocalBucketStore)
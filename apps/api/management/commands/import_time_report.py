@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Comando para medir el tiempo de arranque de un worker.
+    Single Responsibility: Solo reporta el costo de importación de los módulos
+    """
+    help = 'Reporta el tiempo de importación (python -X importtime) de la carga de URLs de Django'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='core.urls', help='Módulo a importar tras django.setup() (default: core.urls)')
+        parser.add_argument('--top', type=int, default=20, help='Cantidad de módulos más costosos a mostrar')
+        parser.add_argument('--budget-ms', type=float, help='Falla si la importación acumulada supera este presupuesto')
+
+    def handle(self, *args, **options):
+        """
+        Ejecuta la importación en un proceso limpio y reporta los módulos más costosos
+        """
+        module = options['module']
+        code = f"import django; django.setup(); import {module}"
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings')}
+
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True
+        )
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        if result.returncode != 0:
+            raise CommandError(f'Error importando {module}:\n{result.stderr[-2000:]}')
+
+        timings = self._parse_importtime(result.stderr)
+        total_us = sum(self_us for self_us, _, _ in timings)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'⏱ Importación de {module}'))
+        self.stdout.write(f'   Proceso completo: {wall_ms:.0f} ms')
+        self.stdout.write(f'   Importaciones:    {total_us / 1000:.0f} ms en {len(timings)} módulos\n')
+
+        self.stdout.write(f'{"acumulado":>12} {"propio":>10}  módulo')
+        for self_us, cumulative_us, name in sorted(timings, key=lambda t: t[1], reverse=True)[:options['top']]:
+            self.stdout.write(f'{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {name}')
+
+        budget_ms = options.get('budget_ms')
+        if budget_ms is not None:
+            if total_us / 1000 > budget_ms:
+                raise CommandError(f'❌ Importación de {total_us / 1000:.0f} ms supera el presupuesto de {budget_ms:.0f} ms')
+            self.stdout.write(self.style.SUCCESS(f'\n✅ Dentro del presupuesto de {budget_ms:.0f} ms'))
+
+    def _parse_importtime(self, output: str) -> list:
+        """
+        Parsea la salida de -X importtime.
+
+        Args:
+            output: stderr del proceso
+
+        Returns:
+            list: Tuplas (propio_us, acumulado_us, módulo)
+        """
+        timings = []
+        for line in output.splitlines():
+            if not line.startswith('import time:'):
+                continue
+
+            parts = line[len('import time:'):].split('|')
+            if len(parts) != 3 or not parts[0].strip().isdigit():
+                continue
+
+            timings.append((int(parts[0]), int(parts[1]), parts[2].strip()))
+
+        return timings
@@ -0,0 +1,20 @@
+from rest_framework.permissions import BasePermission
+
+
+class CanAccessCompany(BasePermission):
+    """
+    Permiso para consultar los datos de una compañía.
+    Single Responsibility: Solo verifica que la fuente autenticada tenga acceso a la compañía de la URL
+    """
+    message = 'La fuente no tiene acceso a esta compañía'
+    
+    def has_permission(self, request, view):
+        """
+        Permite el request si la compañía de la URL está entre las de la fuente
+        """
+        source = getattr(request.user, 'source', None)
+        company_id = view.kwargs.get('company_id')
+        if source is None or company_id is None:
+            return False
+        
+        return source.companies.filter(id=company_id).exists()
@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+import tempfile
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.companies.models import Company
+from apps.sources.models import Source
+
+
+class CompanyFolderViewTests(TestCase):
+    """
+    Tests del endpoint para navegar los archivos de una compañía.
+    """
+    
+    def setUp(self):
+        self.storage_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.storage_root.cleanup)
+        settings_override = override_settings(LOCAL_STORAGE_ROOT=self.storage_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.company = Company.objects.create(name='Acme', storage_backend='local')
+        self.other_company = Company.objects.create(name='Globex', storage_backend='local')
+        self.source = Source.objects.create(name='whatsapp', api_key='key-whatsapp')
+        self.source.companies.add(self.company)
+        
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_API_KEY='key-whatsapp')
+    
+    def test_lists_company_assigned_to_source(self):
+        response = self.client.get(f'/api/companies/{self.company.id}/files/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['folder_id'], f'company-{self.company.id}')
+    
+    def test_rejects_company_not_assigned_to_source(self):
+        response = self.client.get(f'/api/companies/{self.other_company.id}/files/')
+        
+        self.assertEqual(response.status_code, 403)
+    
+    def test_rejects_request_without_api_key(self):
+        response = APIClient().get(f'/api/companies/{self.company.id}/files/')
+        
+        self.assertIn(response.status_code, (401, 403))
+    
+    def test_rejects_folder_id_escaping_to_other_company(self):
+        response = self.client.get(
+            f'/api/companies/{self.company.id}/files/',
+            {'folder_id': f'company-{self.company.id}/../company-{self.other_company.id}'}
+        )
+        
+        self.assertEqual(response.status_code, 404)
+
+
+class MetricsViewTests(TestCase):
+    """
+    Tests del endpoint de métricas.
+    """
+    
+    def test_requires_api_key(self):
+        response = APIClient().get('/api/metrics/')
+        
+        self.assertIn(response.status_code, (401, 403))
+    
+    def test_returns_metrics_with_api_key(self):
+        Source.objects.create(name='whatsapp', api_key='key-whatsapp')
+        client = APIClient()
+        client.credentials(HTTP_X_API_KEY='key-whatsapp')
+        
+        response = client.get('/api/metrics/')
+        
+        self.assertEqual(response.status_code, 200)
+
+
+class UrlConfImportTests(SimpleTestCase):
+    """
+    Tests del arranque liviano: cargar las URLs no importa los clientes de Drive ni de Twilio.
+    """
+    
+    def test_loading_urls_does_not_import_heavy_clients(self):
+        code = (
+            "import sys, django; django.setup(); import core.urls; "
+            "print(','.join(m for m in ('googleapiclient', 'google.oauth2', 'twilio', 'utils.drive.service_account_client') if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=os.environ.copy(),
+                                capture_output=True, text=True)
+        
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), '')
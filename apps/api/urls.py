@@ -5,5 +5,8 @@ app_name = 'api'
 
 urlpatterns = [
     path('webhook/<str:source_type>/', views.AgentWebhookView.as_view(), name='webhook'),
+    path('companies/<int:company_id>/files/', views.CompanyFolderView.as_view(), name='company-files'),
     path('health/', views.HealthCheckView.as_view(), name='health'),
+    path('ready/', views.ReadinessView.as_view(), name='ready'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
 ]
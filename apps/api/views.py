@@ -1,10 +1,13 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.http import JsonResponse
+from apps.companies.models import Company
 from apps.sources.models import Source
+from .permissions import CanAccessCompany
 from utils.services.message_service import MessageService
+from utils.metrics.registry import metrics
 
 
 class AgentWebhookView(APIView):
@@ -61,6 +64,44 @@ class AgentWebhookView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class CompanyFolderView(APIView):
+    """
+    Vista para navegar el árbol de archivos de una compañía.
+    Single Responsibility: Solo expone páginas del contenido de una carpeta
+    """
+    permission_classes = [IsAuthenticated, CanAccessCompany]  # Solo compañías asignadas a la fuente
+    
+    def get(self, request, company_id):
+        """
+        Retorna una página del contenido de una carpeta (query params: folder_id,
+        page_token, page_size)
+        """
+        from utils.drive.service import DriveService
+        
+        try:
+            company = Company.objects.get(id=company_id, is_active=True)
+        except Company.DoesNotExist:
+            return Response({'status': 'error', 'message': 'Compañía no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            page_size = min(max(int(request.query_params.get('page_size', 100)), 1), 1000)
+            page = DriveService().get_folder_page(
+                company,
+                folder_id=request.query_params.get('folder_id'),
+                page_token=request.query_params.get('page_token'),
+                page_size=page_size
+            )
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except OSError:
+            page = None
+        
+        if page is None:
+            return Response({'status': 'error', 'message': 'Carpeta no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({'status': 'success', **page})
+
+
 class HealthCheckView(APIView):
     """
     Vista para health check del sistema.
@@ -73,8 +114,54 @@ class HealthCheckView(APIView):
         """
         Retorna el estado del sistema
         """
+        from utils.drive.spool import DriveSpool
+        from utils.resilience.circuit_breaker import STATE_CLOSED, get_circuit_breaker_states
+        
+        circuit_breakers = get_circuit_breaker_states()
+        degraded = any(state['state'] != STATE_CLOSED for state in circuit_breakers.values())
+        
         return JsonResponse({
-            'status': 'healthy',
+            # Degradado: alguna dependencia tiene el circuito abierto (el servicio sigue atendiendo)
+            'status': 'degraded' if degraded else 'healthy',
             'service': 'Drive Agent API',
-            'version': '1.0.0'
+            'version': '1.0.0',
+            # Archivos esperando en el spool local a que Drive se recupere
+            'drive_spool_pending': len(DriveSpool().keys()),
+            'circuit_breakers': circuit_breakers
         })
+
+
+class ReadinessView(APIView):
+    """
+    Vista para readiness check del worker.
+    Single Responsibility: Solo indica si el worker terminó de prepararse para recibir tráfico
+    """
+    permission_classes = [AllowAny]  # No requiere autenticación
+    authentication_classes = []  # No usar autenticación
+    
+    def get(self, request):
+        """
+        Retorna 200 cuando terminó la precarga de carpetas y 503 mientras corre
+        """
+        from utils.drive.warmup import ensure_warmup_started, get_warmup_state, is_ready
+        
+        # El probe suele ser el primer request del worker
+        ensure_warmup_started()
+        ready = is_ready()
+        return JsonResponse({'ready': ready, 'folder_warmup': get_warmup_state()}, status=200 if ready else 503)
+
+
+class MetricsView(APIView):
+    """
+    Vista para exponer las métricas del proceso.
+    Single Responsibility: Solo expone el registro de métricas en memoria
+    
+    Usa la autenticación por API Key por defecto: las métricas incluyen
+    nombres de Service Accounts, cuotas y estado de los circuit breakers.
+    """
+    
+    def get(self, request):
+        """
+        Retorna las métricas del worker que atiende el request
+        """
+        return JsonResponse(metrics.snapshot())
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0003_company_drive_folder_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="company",
+            name="drive_service_account",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Service Account de Drive fijado para la compañía (vacío: asignación automática)",
+                max_length=100,
+            ),
+        ),
+    ]
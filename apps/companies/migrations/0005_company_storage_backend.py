@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0004_company_drive_service_account"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="company",
+            name="storage_backend",
+            field=models.CharField(
+                blank=True,
+                choices=[("google_drive", "Google Drive"), ("local", "Local")],
+                default="",
+                help_text="Almacenamiento de los archivos de la compañía (vacío: STORAGE_BACKEND)",
+                max_length=50,
+            ),
+        ),
+    ]
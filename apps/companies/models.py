@@ -7,6 +7,11 @@ class Company(BaseModel):
     Modelo para representar compañías.
     Single Responsibility: Solo maneja información de compañías
     """
+    STORAGE_BACKENDS = [
+        ('google_drive', 'Google Drive'),
+        ('local', 'Local'),
+    ]
+    
     name = models.CharField(
         max_length=255, 
         unique=True,
@@ -25,6 +30,19 @@ class Company(BaseModel):
         null=True,
         help_text="ID de la carpeta compartida en Google Drive"
     )
+    drive_service_account = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        help_text="Service Account de Drive fijado para la compañía (vacío: asignación automática)"
+    )
+    storage_backend = models.CharField(
+        max_length=50,
+        choices=STORAGE_BACKENDS,
+        blank=True,
+        default='',
+        help_text="Almacenamiento de los archivos de la compañía (vacío: STORAGE_BACKEND)"
+    )
     is_active = models.BooleanField(
         default=True,
         help_text="Indica si la compañía está activa"
@@ -0,0 +1 @@
+# Drive app
\ No newline at end of file
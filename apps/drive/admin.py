@@ -0,0 +1,33 @@
+from django.contrib import admin
+from .models import DriveCacheGeneration, DriveChangesCursor, DriveFolder, DriveRateBucket, DriveUploadSession
+
+
+@admin.register(DriveFolder)
+class DriveFolderAdmin(admin.ModelAdmin):
+    list_display = ['name', 'folder_id', 'parent_id', 'company', 'created_at']
+    list_filter = ['company']
+    search_fields = ['name', 'folder_id', 'parent_id']
+
+
+@admin.register(DriveUploadSession)
+class DriveUploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'folder_id', 'committed_bytes', 'total_size', 'created_at', 'updated_at']
+    search_fields = ['filename', 'folder_id', 'upload_key']
+
+
+@admin.register(DriveRateBucket)
+class DriveRateBucketAdmin(admin.ModelAdmin):
+    list_display = ['name', 'tokens', 'refilled_at', 'updated_at']
+    search_fields = ['name']
+
+
+@admin.register(DriveChangesCursor)
+class DriveChangesCursorAdmin(admin.ModelAdmin):
+    list_display = ['account', 'page_token', 'last_synced_at', 'updated_at']
+    search_fields = ['account']
+
+
+@admin.register(DriveCacheGeneration)
+class DriveCacheGenerationAdmin(admin.ModelAdmin):
+    list_display = ['name', 'generation', 'updated_at']
+    search_fields = ['name']
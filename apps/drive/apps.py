@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class DriveConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.drive'
+    verbose_name = 'Drive'
@@ -0,0 +1,118 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.agentmessages.selectors import MessageSelector
+from apps.agentmessages.services import MessageService
+from utils.drive.service import DriveService
+from utils.drive.spool import DriveSpool, get_spool_host, is_drive_unavailable
+from utils.metrics.registry import metrics
+
+
+class Command(BaseCommand):
+    """
+    Comando para subir a Drive los archivos que quedaron en el spool local.
+    Single Responsibility: Solo vacía el spool a un ritmo controlado y completa los mensajes pendientes
+
+    Cada nodo vacía su propio spool (DRIVE_SPOOL_HOST), salvo que el spool
+    esté en un volumen compartido (DRIVE_SPOOL_SHARED). Cada mensaje se toma
+    antes de subirlo, así varios drains a la vez no suben dos veces un archivo.
+    """
+    help = 'Sube a Drive los archivos guardados en el spool mientras Drive no respondía'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, help='Archivos por segundo (por defecto DRIVE_SPOOL_DRAIN_RATE)')
+        parser.add_argument('--limit', type=int, help='Máximo de archivos a subir en esta ejecución')
+        parser.add_argument('--loop', action='store_true', help='No terminar: reintentar cada --interval segundos')
+        parser.add_argument('--interval', type=int, default=30, help='Pausa entre pasadas con --loop (default: 30)')
+
+    def handle(self, *args, **options):
+        """
+        Ejecuta el comando para vaciar el spool
+        """
+        rate = options['rate'] or getattr(settings, 'DRIVE_SPOOL_DRAIN_RATE', 2)
+        if rate <= 0:
+            raise CommandError('--rate debe ser mayor que 0')
+
+        while True:
+            self._drain(1 / rate, options['limit'])
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def _drain(self, min_interval: float, limit: int = None):
+        """
+        Sube los archivos pendientes del más antiguo al más reciente. Corta en
+        el primer error de disponibilidad: Drive todavía no se recuperó.
+
+        Args:
+            min_interval: Segundos mínimos entre subidas
+            limit: Máximo de archivos a subir (opcional)
+        """
+        spool = DriveSpool()
+        drive_service = DriveService()
+        message_service = MessageService()
+
+        host = None if getattr(settings, 'DRIVE_SPOOL_SHARED', False) else get_spool_host()
+        stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'DRIVE_SPOOL_CLAIM_SECONDS', 600))
+        messages = MessageSelector.get_spooled_messages(host, stale_before)
+        pending = messages.count()
+        metrics.set_gauge('drive.spool.pending', pending)
+        if not pending:
+            self.stdout.write('✓ Spool vacío')
+            return
+
+        total = min(pending, limit) if limit else pending
+        self.stdout.write(self.style.MIGRATE_HEADING(f'📦 {pending} archivos en el spool, subiendo {total} a {1 / min_interval:g}/s'))
+
+        uploaded = failed = skipped = 0
+        for message in messages[:total].iterator():
+            if not message_service.claim_spooled_upload(message, stale_before):
+                # Lo tomó otro drain
+                skipped += 1
+                continue
+
+            started_at = time.monotonic()
+            spool_key = message.spool_key
+            try:
+                result = drive_service.upload_spooled_file(message.company, spool_key)
+            except FileNotFoundError:
+                if host is not None and not message.spool_host:
+                    # Guardado antes de registrar el nodo: puede estar en el spool de otro
+                    message_service.release_spooled_upload(message)
+                    skipped += 1
+                    continue
+                failed += 1
+                message_service.record_spooled_failure(message, permanent=True)
+                self.stdout.write(self.style.ERROR(f'   ✗ Mensaje {message.id}: el archivo {spool_key} ya no está en el spool'))
+                continue
+            except Exception as e:
+                if is_drive_unavailable(e):
+                    message_service.release_spooled_upload(message)
+                    self.stdout.write(self.style.WARNING(f'⚠️  Drive sigue sin responder ({e}), se reintentará más tarde'))
+                    break
+                failed += 1
+                if message_service.record_spooled_failure(message):
+                    spool.discard(spool_key)
+                    metrics.increment('drive.spool.failed')
+                    self.stdout.write(self.style.ERROR(f'   ✗ Mensaje {message.id}: {e} (sin más reintentos)'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'   ✗ Mensaje {message.id}: {e} (intento {message.spool_attempts})'))
+                continue
+
+            # El archivo se borra del spool solo cuando el mensaje ya apunta a Drive
+            message_service.complete_spooled_upload(message, result)
+            spool.remove(spool_key)
+            uploaded += 1
+            metrics.increment('drive.spool.drained')
+            metrics.set_gauge('drive.spool.pending', pending - uploaded)
+
+            if uploaded % 10 == 0 or uploaded == total:
+                self.stdout.write(f'   {uploaded}/{total} subidos')
+
+            time.sleep(max(0.0, min_interval - (time.monotonic() - started_at)))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {uploaded} subidos, {failed} con error, {skipped} omitidos, {messages.count()} pendientes'
+        ))
@@ -0,0 +1,110 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from apps.companies.models import Company
+from apps.drive.services import DriveFolderService
+from utils.drive.folder_cache import get_folder_cache
+from utils.drive.service_account_client import get_drive_client_for_company
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+
+class Command(BaseCommand):
+    """
+    Comando para fusionar carpetas duplicadas en Google Drive.
+    Single Responsibility: Solo repara carpetas con el mismo nombre bajo el mismo padre
+    """
+    help = 'Fusiona carpetas duplicadas (mismo padre y nombre) dentro de las carpetas de las compañías'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Nombre de la compañía a reparar (por defecto todas las activas)')
+        parser.add_argument('--max-depth', type=int, default=4, help='Profundidad máxima a recorrer (sender/año/mes/día = 4)')
+        parser.add_argument('--dry-run', action='store_true', help='Solo reporta los duplicados sin modificar nada')
+
+    def handle(self, *args, **options):
+        """
+        Ejecuta el comando para fusionar carpetas duplicadas
+        """
+        self.folder_index = DriveFolderService()
+        self.dry_run = options['dry_run']
+        self.merged_count = 0
+
+        companies = Company.objects.filter(is_active=True).exclude(drive_folder_id__isnull=True).exclude(drive_folder_id='')
+        if options['company']:
+            companies = companies.filter(name=options['company'])
+
+        for company in companies:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'📁 Revisando {company.name}...'))
+            self.client = get_drive_client_for_company(company)
+            self._merge_children(company.drive_folder_id, company, options['max_depth'], company.name)
+
+        if self.merged_count and not self.dry_run:
+            # Los workers no deben seguir resolviendo rutas a las duplicadas
+            get_folder_cache().invalidate()
+
+        action = 'encontrados' if self.dry_run else 'fusionados'
+        self.stdout.write(self.style.SUCCESS(f'\n📊 Resumen: {self.merged_count} duplicados {action}'))
+
+    def _merge_children(self, parent_id: str, company: Company, depth: int, path: str):
+        """
+        Fusiona las subcarpetas duplicadas de una carpeta y baja recursivamente.
+
+        Args:
+            parent_id: ID de la carpeta a revisar
+            company: Compañía dueña del árbol
+            depth: Niveles restantes por recorrer
+            path: Ruta legible de la carpeta
+        """
+        if depth <= 0:
+            return
+
+        # list_children ordena por createdTime: la primera de cada nombre es la canónica
+        folders_by_name = defaultdict(list)
+        for folder in self.client.list_children(parent_id, folders_only=True):
+            folders_by_name[folder['name']].append(folder)
+
+        for name, folders in folders_by_name.items():
+            canonical, duplicates = folders[0], folders[1:]
+
+            for duplicate in duplicates:
+                self.merged_count += 1
+                self.stdout.write(
+                    self.style.WARNING(f'⚠ Duplicado: {path}/{name} ({duplicate["id"]} → {canonical["id"]})')
+                )
+                if not self.dry_run:
+                    self._merge_folder(duplicate['id'], canonical['id'], parent_id, name, company)
+
+            self._merge_children(canonical['id'], company, depth - 1, f'{path}/{name}')
+
+    def _merge_folder(self, duplicate_id: str, canonical_id: str, parent_id: str, name: str, company: Company):
+        """
+        Mueve el contenido de una carpeta duplicada a la canónica y la envía a la papelera.
+
+        Args:
+            duplicate_id: ID de la carpeta duplicada
+            canonical_id: ID de la carpeta canónica
+            parent_id: ID de la carpeta padre común
+            name: Nombre de la carpeta
+            company: Compañía dueña del árbol
+        """
+        canonical = self.folder_index.register_folder(parent_id, name, canonical_id, company.id)
+        if canonical is None:
+            self.stdout.write(self.style.WARNING(f'   ⚠ No se pudo indexar {name} ({canonical_id}), se omite la fusión'))
+            return
+
+        if canonical.folder_id != canonical_id:
+            # El índice apuntaba a la duplicada: corregirlo hacia la canónica
+            canonical.folder_id = canonical_id
+            canonical.save(update_fields=['folder_id', 'updated_at'])
+
+        children = [child['id'] for child in self.client.list_children(duplicate_id)]
+        moved = self.client.move_files_batch({child_id: canonical_id for child_id in children})
+
+        self.folder_index.replace_folder(duplicate_id, canonical)
+        if len(moved) < len(children):
+            # No enviar a la papelera una carpeta que todavía tiene contenido
+            self.stdout.write(self.style.WARNING(
+                f'   ⚠ {len(children) - len(moved)} elementos no se movieron desde {duplicate_id}, se reintentará en la próxima ejecución'
+            ))
+            return
+
+        self.client.trash_file(duplicate_id)
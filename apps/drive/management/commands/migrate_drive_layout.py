@@ -0,0 +1,185 @@
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from apps.agentmessages.models import Message
+from apps.agentmessages.selectors import MessageSelector
+from apps.drive.selectors import DriveFolderSelector
+from utils.drive.layouts import FOLDER_LAYOUTS, get_folder_layout, strip_overflow
+from utils.storage.factory import get_storage_backend
+
+
+class Command(BaseCommand):
+    """
+    Comando para mover los archivos existentes a la política de carpetas configurada.
+    Single Responsibility: Solo reubica archivos y actualiza la ruta guardada en cada mensaje
+
+    Respeta DRIVE_HOURLY_SPLIT_THRESHOLD igual que las subidas: cuando una
+    carpeta destino ya tiene ese número de archivos, los siguientes van a su
+    subcarpeta por hora en vez de juntarse todos en una carpeta.
+    """
+    help = 'Mueve en lotes los archivos ya subidos a la jerarquía de DRIVE_FOLDER_LAYOUT y reescribe drive_folder_path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--layout', choices=list(FOLDER_LAYOUTS), help='Política destino (por defecto DRIVE_FOLDER_LAYOUT)')
+        parser.add_argument('--company', help='Nombre de la compañía a migrar (por defecto todas)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Mensajes por lote (default: 100)')
+        parser.add_argument('--limit', type=int, help='Máximo de archivos a mover en esta ejecución')
+        parser.add_argument('--dry-run', action='store_true', help='Solo cuenta los archivos que habría que mover')
+
+    def handle(self, *args, **options):
+        """
+        Ejecuta el comando para migrar la política de carpetas
+        """
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size debe ser mayor que 0')
+
+        layout = get_folder_layout(options['layout'])
+        if layout.name != getattr(settings, 'DRIVE_FOLDER_LAYOUT', layout.name):
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  DRIVE_FOLDER_LAYOUT sigue en {settings.DRIVE_FOLDER_LAYOUT}: las subidas nuevas no usarán {layout.name}'
+            ))
+
+        messages = (
+            Message.objects.filter(company__isnull=False, drive_status='uploaded')
+            .exclude(drive_file_id__isnull=True)
+            .exclude(drive_file_id='')
+            .select_related('company')
+            .order_by('id')
+        )
+        if options['company']:
+            messages = messages.filter(company__name=options['company'])
+
+        self.layout = layout
+        self.storages = {}
+        self.split_threshold = getattr(settings, 'DRIVE_HOURLY_SPLIT_THRESHOLD', 0)
+        # (compañía, carpeta destino) -> archivos guardados directamente en ella
+        self.folder_counts = {}
+        totals = Counter()
+        last_id = 0
+
+        # Se avanza por ID y cada lote se confirma por separado: si se interrumpe,
+        # la siguiente ejecución salta los mensajes que ya están en su ruta destino
+        while options['limit'] is None or totals['moved'] < options['limit']:
+            batch = list(messages.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            # Los archivos en subcarpetas por hora ya están en su carpeta destino
+            pending = [message for message in batch if strip_overflow(message.drive_folder_path) != self._target_path(message)]
+            if options['limit'] is not None:
+                pending = pending[:options['limit'] - totals['moved']]
+            totals['scanned'] += len(batch)
+
+            if options['dry_run']:
+                totals['moved'] += len(pending)
+                continue
+
+            by_company = defaultdict(list)
+            for message in pending:
+                by_company[message.company].append(message)
+
+            for company, company_messages in by_company.items():
+                moved, failed = self._migrate_company_batch(company, company_messages)
+                totals['moved'] += moved
+                totals['failed'] += failed
+
+            self.stdout.write(f'   Lote hasta el mensaje {last_id}: {totals["moved"]} movidos, {totals["failed"]} con error')
+
+        action = 'a mover' if options['dry_run'] else 'movidos'
+        self.stdout.write(self.style.SUCCESS(
+            f'\n📊 Resumen ({layout.name}): {totals["scanned"]} mensajes revisados, {totals["moved"]} archivos {action}, '
+            f'{totals["failed"]} con error'
+        ))
+        if totals['failed']:
+            self.stdout.write(self.style.WARNING('   Vuelva a ejecutar el comando para reintentar los que fallaron'))
+
+    def _migrate_company_batch(self, company, messages: list) -> tuple:
+        """
+        Mueve un lote de archivos de una compañía a sus carpetas destino.
+
+        Args:
+            company: Compañía
+            messages: Mensajes a mover
+
+        Returns:
+            Tuple con (archivos movidos, archivos con error)
+        """
+        storage = self.storages.get(company.id)
+        if storage is None:
+            storage = self.storages[company.id] = get_storage_backend(company)
+
+        try:
+            root_id = storage.get_company_root(company)
+        except ValueError as e:
+            self.stdout.write(self.style.WARNING(f'⚠️  {e}'))
+            return 0, len(messages)
+
+        targets = {message.id: self._place(message) for message in messages}
+        segments = {message_id: target_segments for message_id, (target_segments, _) in targets.items()}
+        folder_ids = storage.ensure_folder_paths(root_id, sorted(set(segments.values())), company.id)
+
+        moves = {
+            message.drive_file_id: folder_ids[segments[message.id]]
+            for message in messages if segments[message.id] in folder_ids
+        }
+        moved = storage.move_files(moves)
+        folders = DriveFolderSelector.get_folders_by_folder_ids(list(set(moves.values())))
+
+        updated = []
+        now = timezone.now()
+        for message in messages:
+            result = moved.get(message.drive_file_id)
+            if not result:
+                continue
+
+            folder_id = moves[message.drive_file_id]
+            message.drive_file_id = result['file_id']
+            message.drive_shared_link = result.get('web_view_link', message.drive_shared_link)
+            message.drive_folder = folders.get(folder_id)
+            message.drive_folder_path = targets[message.id][1]
+            message.updated_at = now
+            updated.append(message)
+
+        with transaction.atomic():
+            Message.objects.bulk_update(
+                updated, ['drive_file_id', 'drive_shared_link', 'drive_folder', 'drive_folder_path', 'updated_at']
+            )
+
+        return len(updated), len(messages) - len(updated)
+
+    def _place(self, message: Message) -> tuple:
+        """
+        Elige la carpeta destino de un archivo: la de la política o, si ya
+        está desbordada, su subcarpeta por hora.
+
+        Args:
+            message: Mensaje a mover
+
+        Returns:
+            Tuple con (segmentos de carpetas, ruta legible)
+        """
+        received_at = self._received_at(message)
+        segments = self.layout.segments(message.sender_number, received_at)
+        folder_path = self._target_path(message)
+        if not self.split_threshold:
+            return segments, folder_path
+
+        key = (message.company_id, folder_path)
+        if key not in self.folder_counts:
+            self.folder_counts[key] = MessageSelector.count_messages_in_folder(message.company_id, folder_path)
+
+        if self.folder_counts[key] < self.split_threshold:
+            self.folder_counts[key] += 1
+            return segments, folder_path
+
+        overflow_segment = self.layout.overflow_segment(received_at)
+        return (*segments, overflow_segment), f'{folder_path}/{overflow_segment}'
+
+    def _received_at(self, message: Message):
+        return timezone.localtime(message.created_at)
+
+    def _target_path(self, message: Message) -> str:
+        return self.layout.folder_path(message.company.name, message.sender_number, self._received_at(message))
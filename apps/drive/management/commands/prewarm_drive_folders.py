@@ -0,0 +1,65 @@
+from datetime import date, datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.agentmessages.selectors import MessageSelector
+from apps.companies.models import Company
+from utils.drive.layouts import get_folder_layout
+from utils.drive.service_account_client import get_drive_client_for_company
+
+
+class Command(BaseCommand):
+    """
+    Comando para crear por adelantado las carpetas del día siguiente en Google Drive.
+    Single Responsibility: Solo precrea las carpetas del día (según DRIVE_FOLDER_LAYOUT) de remitentes activos
+    """
+    help = 'Precrea en batch las carpetas del día siguiente para los remitentes recientes de cada compañía'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Día a preparar en formato YYYY-MM-DD (por defecto mañana)')
+        parser.add_argument('--days-back', type=int, default=7, help='Remitentes vistos en los últimos N días (default: 7)')
+        parser.add_argument('--company', help='Nombre de la compañía (por defecto todas las activas)')
+
+    def handle(self, *args, **options):
+        """
+        Ejecuta el comando para precrear las carpetas
+        """
+        target_date = self._parse_date(options['date'])
+        since = timezone.now() - timedelta(days=options['days_back'])
+        companies = Company.objects.filter(is_active=True).exclude(drive_folder_id__isnull=True).exclude(drive_folder_id='')
+        if options['company']:
+            companies = companies.filter(name=options['company'])
+
+        layout = get_folder_layout()
+        total_paths = 0
+        for company in companies:
+            senders = MessageSelector.get_recent_senders_by_company(company.id, since)
+            if not senders:
+                continue
+
+            paths = [layout.segments(sender, target_date) for sender in senders]
+            resolved = get_drive_client_for_company(company).ensure_folder_paths_batch(company.drive_folder_id, paths, company.id)
+            total_paths += len(resolved)
+
+            self.stdout.write(
+                self.style.SUCCESS(f'✓ {company.name}: {len(resolved)}/{len(paths)} carpetas listas para {target_date}')
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'\n📊 Resumen: {total_paths} carpetas de día preparadas'))
+
+    def _parse_date(self, value: str) -> date:
+        """
+        Convierte la fecha recibida o retorna la de mañana.
+
+        Args:
+            value: Fecha en formato YYYY-MM-DD (opcional)
+
+        Returns:
+            date: Día a preparar
+        """
+        if not value:
+            return (datetime.now() + timedelta(days=1)).date()
+
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Fecha inválida: {value}. Use el formato YYYY-MM-DD')
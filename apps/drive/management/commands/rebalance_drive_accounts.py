@@ -0,0 +1,121 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from django.utils import timezone
+from apps.agentmessages.models import Message
+from apps.companies.models import Company
+from utils.drive.accounts import get_company_account, get_service_accounts
+
+
+class Command(BaseCommand):
+    """
+    Comando para repartir las compañías entre las Service Accounts del pool.
+    Single Responsibility: Solo reporta y fija la cuenta de Drive de cada compañía
+    """
+    help = 'Muestra el reparto de compañías por Service Account y opcionalmente lo rebalancea por volumen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Ventana de volumen a considerar en días (default: 30)')
+        parser.add_argument('--apply', action='store_true', help='Fija en cada compañía la cuenta del plan balanceado')
+        parser.add_argument('--clear-pins', action='store_true', help='Quita las cuentas fijadas (vuelve a la asignación automática)')
+        parser.add_argument('--company', help='Nombre de la compañía a fijar manualmente (usar con --account)')
+        parser.add_argument('--account', help='Cuenta a fijar para --company')
+
+    def handle(self, *args, **options):
+        """
+        Ejecuta el comando para rebalancear las cuentas
+        """
+        accounts = get_service_accounts()
+
+        if options['company']:
+            self._pin_company(options['company'], options['account'], accounts)
+            return
+
+        if options['clear_pins']:
+            cleared = Company.objects.exclude(drive_service_account='').update(drive_service_account='')
+            self.stdout.write(self.style.SUCCESS(f'✓ {cleared} compañías vuelven a la asignación automática'))
+            return
+
+        since = timezone.now() - timedelta(days=options['days'])
+        volumes = {
+            row['company_id']: (row['files'], row['bytes'] or 0)
+            for row in Message.objects.filter(created_at__gte=since)
+            .exclude(drive_file_id__isnull=True)
+            .exclude(drive_file_id='')
+            .values('company_id')
+            .annotate(files=Count('id'), bytes=Sum('file_size'))
+        }
+        companies = list(Company.objects.filter(is_active=True))
+
+        current = {company.id: get_company_account(company) for company in companies}
+        self.stdout.write(self.style.MIGRATE_HEADING(f'📊 Reparto actual (últimos {options["days"]} días)'))
+        self._print_distribution(accounts, companies, current, volumes)
+
+        # Plan: la compañía con más bytes va a la cuenta con menos carga acumulada;
+        # a igual carga se queda en su cuenta actual para no moverla sin motivo
+        load = {account: 0 for account in accounts}
+        planned = {}
+        for company in sorted(companies, key=lambda c: volumes.get(c.id, (0, 0))[1], reverse=True):
+            account = min(load, key=lambda name: (load[name], name != current[company.id], name))
+            planned[company.id] = account
+            load[account] += volumes.get(company.id, (0, 0))[1]
+
+        self.stdout.write(self.style.MIGRATE_HEADING('\n📐 Reparto balanceado por volumen'))
+        self._print_distribution(accounts, companies, planned, volumes)
+
+        moved = [company for company in companies if planned[company.id] != current[company.id]]
+        for company in moved:
+            self.stdout.write(f'   {company.name}: {current[company.id]} → {planned[company.id]}')
+
+        if not options['apply']:
+            self.stdout.write(self.style.WARNING(f'\n{len(moved)} compañías cambiarían de cuenta. Use --apply para fijar el plan'))
+            return
+
+        for company in companies:
+            if company.drive_service_account != planned[company.id]:
+                company.drive_service_account = planned[company.id]
+                company.save(update_fields=['drive_service_account', 'updated_at'])
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Plan aplicado: {len(moved)} compañías movidas'))
+        self.stdout.write('   Cada cuenta debe tener acceso de editor a las carpetas de sus compañías')
+
+    def _pin_company(self, name: str, account: str, accounts: dict):
+        """
+        Fija manualmente la cuenta de una compañía.
+
+        Args:
+            name: Nombre de la compañía
+            account: Nombre de la cuenta
+            accounts: Pool de cuentas
+        """
+        if account not in accounts:
+            raise CommandError(f'Cuenta inválida: {account}. Disponibles: {", ".join(accounts)}')
+
+        updated = Company.objects.filter(name=name).update(drive_service_account=account)
+        if not updated:
+            raise CommandError(f'No existe la compañía: {name}')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {name} fijada a la cuenta {account}'))
+
+    def _print_distribution(self, accounts: dict, companies: list, assignment: dict, volumes: dict):
+        """
+        Imprime compañías, archivos y bytes por cuenta.
+
+        Args:
+            accounts: Pool de cuentas
+            companies: Compañías activas
+            assignment: ID de compañía -> cuenta
+            volumes: ID de compañía -> (archivos, bytes)
+        """
+        totals = defaultdict(lambda: [0, 0, 0])
+        for company in companies:
+            files, size = volumes.get(company.id, (0, 0))
+            total = totals[assignment[company.id]]
+            total[0] += 1
+            total[1] += files
+            total[2] += size
+
+        for account in accounts:
+            companies_count, files, size = totals[account]
+            self.stdout.write(f'   {account}: {companies_count} compañías, {files} archivos, {size / (1024 * 1024):.1f} MB')
@@ -0,0 +1,78 @@
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from apps.drive.services import DriveReconciliationService
+from utils.drive.accounts import get_service_accounts
+from utils.drive.service_account_client import get_drive_client
+from utils.metrics.registry import metrics
+
+
+class Command(BaseCommand):
+    """
+    Comando para sincronizar la base con los cambios hechos directamente en Google Drive.
+    Single Responsibility: Solo recorre el feed de cambios de cada cuenta desde su último page token
+    """
+    help = 'Aplica a mensajes y carpetas los borrados, movimientos y renombres hechos en Drive desde la última ejecución'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', help='Service Account a reconciliar (por defecto todas las del pool)')
+        parser.add_argument('--max-pages', type=int, default=100, help='Máximo de páginas del feed por cuenta (default: 100)')
+
+    def handle(self, *args, **options):
+        """
+        Ejecuta el comando para reconciliar los cambios
+        """
+        accounts = list(get_service_accounts())
+        if options['account']:
+            if options['account'] not in accounts:
+                raise CommandError(f'Cuenta inválida: {options["account"]}. Disponibles: {", ".join(accounts)}')
+            accounts = [options['account']]
+
+        service = DriveReconciliationService()
+        for account in accounts:
+            self._reconcile_account(service, account, options['max_pages'])
+
+    def _reconcile_account(self, service: DriveReconciliationService, account: str, max_pages: int):
+        """
+        Aplica el feed de cambios de una cuenta página por página.
+
+        Args:
+            service: Servicio de reconciliación
+            account: Nombre de la cuenta en el pool
+            max_pages: Máximo de páginas a leer en esta ejecución
+        """
+        client = get_drive_client(account)
+        cursor = service.get_cursor(account)
+
+        # Primera ejecución: solo se fija el punto de partida, el historial previo no se recorre
+        if cursor is None:
+            service.save_cursor(account, client.get_start_page_token(), synced=True)
+            self.stdout.write(self.style.SUCCESS(f'✓ {account}: punto de partida guardado, los cambios se aplicarán desde ahora'))
+            return
+
+        page_token = cursor.page_token
+        totals = Counter()
+        pages = 0
+        synced = False
+
+        while pages < max_pages and not synced:
+            changes, next_page_token, new_start_page_token = client.list_changes(page_token)
+            stats = service.apply_changes(changes)
+            pages += 1
+
+            # El cursor avanza solo después de aplicar la página: si algo falla se relee
+            page_token = next_page_token or new_start_page_token
+            synced = bool(new_start_page_token)
+            service.save_cursor(account, page_token, synced=synced)
+
+            totals['changes'] += len(changes)
+            totals.update(stats)
+            metrics.increment('drive.reconcile.changes', len(changes), {'account': account})
+            metrics.increment('drive.reconcile.messages_updated', stats['messages_deleted'] + stats['messages_updated'], {'account': account})
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {account}: {totals["changes"]} cambios en {pages} páginas → '
+            f'{totals["messages_deleted"]} mensajes borrados, {totals["messages_updated"]} actualizados, '
+            f'{totals["folders_deleted"]} carpetas quitadas del índice, {totals["folders_updated"]} movidas o renombradas'
+        ))
+        if not synced:
+            self.stdout.write(self.style.WARNING(f'   Quedan cambios pendientes para {account}, se seguirá en la próxima ejecución'))
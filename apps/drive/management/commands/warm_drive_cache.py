@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from apps.companies.models import Company
+from utils.drive.warmup import FolderCacheWarmer
+
+
+class Command(BaseCommand):
+    """
+    Comando para medir la precarga de la caché de carpetas de Drive.
+    Single Responsibility: Solo ejecuta el recorrido de precarga y reporta su avance
+    """
+    help = 'Recorre el árbol de carpetas de las compañías como la precarga al arrancar y reporta carpetas y tiempos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Nombre de la compañía (por defecto todas las activas)')
+        parser.add_argument('--budget', type=float, help='Presupuesto en segundos (por defecto DRIVE_WARMUP_BUDGET_SECONDS)')
+        parser.add_argument('--max-depth', type=int, help='Niveles a recorrer (por defecto DRIVE_WARMUP_MAX_DEPTH)')
+
+    def handle(self, *args, **options):
+        """
+        Ejecuta el comando para medir la precarga
+        """
+        companies = Company.objects.filter(is_active=True).exclude(drive_folder_id__isnull=True).exclude(drive_folder_id='')
+        if options['company']:
+            companies = companies.filter(name=options['company'])
+
+        warmer = FolderCacheWarmer(budget_seconds=options['budget'], max_depth=options['max_depth'], progress=self._report)
+        stats = warmer.warm(companies)
+
+        if stats['complete']:
+            self.stdout.write(self.style.SUCCESS(
+                f'\n✅ Precarga completa: {stats["folders"]} carpetas de {stats["companies"]} compañías en {stats["elapsed"]}s'
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'\n⚠️  Precarga cortada en el nivel {stats["depth"]}: {stats["folders"]} carpetas en {stats["elapsed"]}s. '
+                f'Aumente DRIVE_WARMUP_BUDGET_SECONDS o DRIVE_FOLDER_CACHE_SIZE'
+            ))
+
+    def _report(self, stats: dict):
+        self.stdout.write(f'   Nivel {stats["depth"]}: {stats["folders"]} carpetas, {stats["elapsed"]}s')
@@ -0,0 +1,73 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("companies", "0003_company_drive_folder_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriveFolder",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "parent_id",
+                    models.CharField(
+                        help_text="ID de la carpeta padre en Google Drive",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(help_text="Nombre de la carpeta", max_length=255),
+                ),
+                (
+                    "folder_id",
+                    models.CharField(
+                        help_text="ID de la carpeta en Google Drive",
+                        max_length=100,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "company",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Compañía dueña de la carpeta",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="drive_folders",
+                        to="companies.company",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Drive Folder",
+                "verbose_name_plural": "Drive Folders",
+                "db_table": "drive_folders",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="drivefolder",
+            constraint=models.UniqueConstraint(
+                fields=("parent_id", "name"), name="unique_drive_folder_parent_name"
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drive", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriveUploadSession",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "upload_key",
+                    models.CharField(
+                        help_text="Hash de la carpeta destino y el contenido del archivo",
+                        max_length=64,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "session_uri",
+                    models.TextField(
+                        help_text="URI de la sesión de subida reanudable en Drive"
+                    ),
+                ),
+                (
+                    "folder_id",
+                    models.CharField(
+                        help_text="ID de la carpeta destino en Google Drive",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(
+                        help_text="Nombre del archivo en Drive", max_length=255
+                    ),
+                ),
+                (
+                    "total_size",
+                    models.BigIntegerField(
+                        help_text="Tamaño total del archivo en bytes"
+                    ),
+                ),
+                (
+                    "committed_bytes",
+                    models.BigIntegerField(
+                        default=0, help_text="Bytes confirmados por Drive"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Drive Upload Session",
+                "verbose_name_plural": "Drive Upload Sessions",
+                "db_table": "drive_upload_sessions",
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drive", "0002_driveuploadsession"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriveRateBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Nombre del presupuesto (p. ej. drive:read)",
+                        max_length=100,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "tokens",
+                    models.FloatField(
+                        help_text="Tokens disponibles en el último relleno (negativo si hay reservas pendientes)"
+                    ),
+                ),
+                (
+                    "refilled_at",
+                    models.FloatField(help_text="Timestamp Unix del último relleno"),
+                ),
+            ],
+            options={
+                "verbose_name": "Drive Rate Bucket",
+                "verbose_name_plural": "Drive Rate Buckets",
+                "db_table": "drive_rate_buckets",
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drive", "0003_driveratebucket"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriveChangesCursor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "account",
+                    models.CharField(
+                        help_text="Service Account del pool dueña del feed",
+                        max_length=100,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "page_token",
+                    models.CharField(
+                        help_text="Page token del feed de cambios desde el que continuar",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "last_synced_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Última vez que se llegó al final del feed",
+                        null=True,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Drive Changes Cursor",
+                "verbose_name_plural": "Drive Changes Cursors",
+                "db_table": "drive_changes_cursors",
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drive", "0004_drivechangescursor"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriveCacheGeneration",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Nombre de la caché (p. ej. drive:folders)",
+                        max_length=100,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "generation",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="Se incrementa cada vez que la caché deja de ser válida en todos los procesos",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Drive Cache Generation",
+                "verbose_name_plural": "Drive Cache Generations",
+                "db_table": "drive_cache_generations",
+            },
+        ),
+    ]
@@ -0,0 +1,161 @@
+from django.db import models
+from utils.models.model import BaseModel
+
+
+class DriveFolder(BaseModel):
+    """
+    Modelo para representar el índice de carpetas de Google Drive.
+    Single Responsibility: Solo recuerda qué ID tiene cada carpeta (padre, nombre)
+    """
+    parent_id = models.CharField(
+        max_length=100,
+        help_text="ID de la carpeta padre en Google Drive"
+    )
+    name = models.CharField(
+        max_length=255,
+        help_text="Nombre de la carpeta"
+    )
+    folder_id = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="ID de la carpeta en Google Drive"
+    )
+    company = models.ForeignKey(
+        'companies.Company',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='drive_folders',
+        help_text="Compañía dueña de la carpeta"
+    )
+    
+    class Meta:
+        db_table = 'drive_folders'
+        verbose_name = 'Drive Folder'
+        verbose_name_plural = 'Drive Folders'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['parent_id', 'name'],
+                name='unique_drive_folder_parent_name'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.folder_id})"
+
+
+class DriveUploadSession(BaseModel):
+    """
+    Modelo para representar una subida reanudable en curso hacia Google Drive.
+    Single Responsibility: Solo recuerda la sesión y el offset confirmado de una subida
+    """
+    upload_key = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="Hash de la carpeta destino y el contenido del archivo"
+    )
+    session_uri = models.TextField(
+        help_text="URI de la sesión de subida reanudable en Drive"
+    )
+    folder_id = models.CharField(
+        max_length=100,
+        help_text="ID de la carpeta destino en Google Drive"
+    )
+    filename = models.CharField(
+        max_length=255,
+        help_text="Nombre del archivo en Drive"
+    )
+    total_size = models.BigIntegerField(
+        help_text="Tamaño total del archivo en bytes"
+    )
+    committed_bytes = models.BigIntegerField(
+        default=0,
+        help_text="Bytes confirmados por Drive"
+    )
+    
+    class Meta:
+        db_table = 'drive_upload_sessions'
+        verbose_name = 'Drive Upload Session'
+        verbose_name_plural = 'Drive Upload Sessions'
+    
+    def __str__(self):
+        return f"{self.filename} ({self.committed_bytes}/{self.total_size})"
+
+
+class DriveRateBucket(BaseModel):
+    """
+    Modelo para representar un token bucket compartido de la cuota de Drive.
+    Single Responsibility: Solo guarda los tokens disponibles de un presupuesto
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Nombre del presupuesto (p. ej. drive:read)"
+    )
+    tokens = models.FloatField(
+        help_text="Tokens disponibles en el último relleno (negativo si hay reservas pendientes)"
+    )
+    refilled_at = models.FloatField(
+        help_text="Timestamp Unix del último relleno"
+    )
+    
+    class Meta:
+        db_table = 'drive_rate_buckets'
+        verbose_name = 'Drive Rate Bucket'
+        verbose_name_plural = 'Drive Rate Buckets'
+    
+    def __str__(self):
+        return f"{self.name} ({self.tokens:.1f})"
+
+
+class DriveChangesCursor(BaseModel):
+    """
+    Modelo para representar la posición en el feed de cambios de Drive de una Service Account.
+    Single Responsibility: Solo recuerda el page token desde el que seguir reconciliando
+    """
+    account = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Service Account del pool dueña del feed"
+    )
+    page_token = models.CharField(
+        max_length=255,
+        help_text="Page token del feed de cambios desde el que continuar"
+    )
+    last_synced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Última vez que se llegó al final del feed"
+    )
+    
+    class Meta:
+        db_table = 'drive_changes_cursors'
+        verbose_name = 'Drive Changes Cursor'
+        verbose_name_plural = 'Drive Changes Cursors'
+    
+    def __str__(self):
+        return f"{self.account} ({self.page_token})"
+
+
+class DriveCacheGeneration(BaseModel):
+    """
+    Modelo para representar la versión de una caché en memoria de los procesos.
+    Single Responsibility: Solo cuenta las invalidaciones de una caché compartida por nombre
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Nombre de la caché (p. ej. drive:folders)"
+    )
+    generation = models.BigIntegerField(
+        default=0,
+        help_text="Se incrementa cada vez que la caché deja de ser válida en todos los procesos"
+    )
+    
+    class Meta:
+        db_table = 'drive_cache_generations'
+        verbose_name = 'Drive Cache Generation'
+        verbose_name_plural = 'Drive Cache Generations'
+    
+    def __str__(self):
+        return f"{self.name} ({self.generation})"
@@ -0,0 +1,147 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from django.db.models import QuerySet
+from .models import DriveCacheGeneration, DriveFolder, DriveUploadSession
+
+
+class DriveFolderSelector:
+    """
+    Selector para operaciones de consulta de DriveFolder.
+    Single Responsibility: Solo maneja consultas a la base de datos para DriveFolder
+    """
+    
+    @staticmethod
+    def get_folder_id(parent_id: str, name: str) -> Optional[str]:
+        """
+        Obtiene el ID de una carpeta por padre y nombre.
+        
+        Args:
+            parent_id: ID de la carpeta padre
+            name: Nombre de la carpeta
+            
+        Returns:
+            Optional[str]: ID de la carpeta si está indexada, None si no
+        """
+        return DriveFolder.objects.filter(
+            parent_id=parent_id,
+            name=name
+        ).values_list('folder_id', flat=True).first()
+    
+    @staticmethod
+    def get_folder_ids_for_pairs(pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """
+        Obtiene los IDs de varias carpetas (padre, nombre) de distintos padres.
+        
+        Args:
+            pairs: Pares (ID de la carpeta padre, nombre)
+            
+        Returns:
+            Dict[Tuple[str, str], str]: (padre, nombre) -> ID de las carpetas indexadas
+        """
+        wanted = set(pairs)
+        rows = DriveFolder.objects.filter(
+            parent_id__in={parent_id for parent_id, _ in wanted},
+            name__in={name for _, name in wanted}
+        ).values_list('parent_id', 'name', 'folder_id')
+        
+        return {(parent_id, name): folder_id for parent_id, name, folder_id in rows if (parent_id, name) in wanted}
+    
+    @staticmethod
+    def get_folder_by_folder_id(folder_id: str) -> Optional[DriveFolder]:
+        """
+        Obtiene una carpeta indexada por su ID de Drive.
+        
+        Args:
+            folder_id: ID de la carpeta en Google Drive
+            
+        Returns:
+            Optional[DriveFolder]: Carpeta si existe, None si no
+        """
+        try:
+            return DriveFolder.objects.get(folder_id=folder_id)
+        except DriveFolder.DoesNotExist:
+            return None
+    
+    @staticmethod
+    def get_folders_by_folder_ids(folder_ids: List[str]) -> Dict[str, DriveFolder]:
+        """
+        Obtiene varias carpetas indexadas por su ID de Drive con una sola consulta.
+        
+        Args:
+            folder_ids: IDs de las carpetas en Google Drive
+            
+        Returns:
+            Dict folder_id -> carpeta (se omiten las que no están en el índice)
+        """
+        return {folder.folder_id: folder for folder in DriveFolder.objects.filter(folder_id__in=folder_ids)}
+    
+    @staticmethod
+    def get_children(parent_id: str) -> QuerySet[DriveFolder]:
+        """
+        Obtiene las carpetas indexadas dentro de una carpeta.
+        
+        Args:
+            parent_id: ID de la carpeta padre
+            
+        Returns:
+            QuerySet[DriveFolder]: Carpetas hijas
+        """
+        return DriveFolder.objects.filter(parent_id=parent_id).order_by('name')
+
+
+class DriveUploadSessionSelector:
+    """
+    Selector para operaciones de consulta de DriveUploadSession.
+    Single Responsibility: Solo maneja consultas a la base de datos para DriveUploadSession
+    """
+    
+    @staticmethod
+    def get_session(upload_key: str, created_after: datetime) -> Optional[DriveUploadSession]:
+        """
+        Obtiene una sesión de subida vigente por su clave.
+        
+        Args:
+            upload_key: Clave de la subida
+            created_after: Las sesiones creadas antes de esta fecha se consideran expiradas
+            
+        Returns:
+            Optional[DriveUploadSession]: Sesión si existe y no expiró, None si no
+        """
+        return DriveUploadSession.objects.filter(
+            upload_key=upload_key,
+            created_at__gte=created_after
+        ).first()
+    
+    @staticmethod
+    def get_expired_sessions(created_before: datetime) -> QuerySet[DriveUploadSession]:
+        """
+        Obtiene las sesiones de subida expiradas.
+        
+        Args:
+            created_before: Fecha límite de creación
+            
+        Returns:
+            QuerySet[DriveUploadSession]: Sesiones expiradas
+        """
+        return DriveUploadSession.objects.filter(created_at__lt=created_before)
+
+
+
+class DriveCacheGenerationSelector:
+    """
+    Selector para operaciones de consulta de DriveCacheGeneration.
+    Single Responsibility: Solo maneja consultas a la base de datos para DriveCacheGeneration
+    """
+    
+    @staticmethod
+    def get_generation(name: str) -> int:
+        """
+        Obtiene la versión actual de una caché.
+        
+        Args:
+            name: Nombre de la caché
+            
+        Returns:
+            int: Versión actual (0 si nunca se invalidó)
+        """
+        return DriveCacheGeneration.objects.filter(name=name).values_list('generation', flat=True).first() or 0
@@ -0,0 +1,588 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import timedelta
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.agentmessages.models import Message
+from apps.companies.models import Company
+from .models import DriveCacheGeneration, DriveChangesCursor, DriveFolder, DriveRateBucket, DriveUploadSession
+from .selectors import DriveFolderSelector, DriveUploadSessionSelector
+from utils.drive.folder_cache import get_folder_cache, get_metadata_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# Locks para serializar la creación dentro del proceso: un número fijo
+# repartido por hash de (padre, nombre), así no crecen con cada carpeta
+_LOCAL_LOCK_STRIPES = 64
+_local_locks = [threading.Lock() for _ in range(_LOCAL_LOCK_STRIPES)]
+
+
+class DriveFolderService:
+    """
+    Servicio para operaciones de negocio de DriveFolder.
+    Single Responsibility: Solo mantiene el índice persistente de carpetas de Drive
+    """
+    
+    def __init__(self):
+        self.selector = DriveFolderSelector()
+    
+    def get_folder_id(self, parent_id: str, name: str) -> Optional[str]:
+        """
+        Consulta el índice antes de ir a la API de Drive.
+        
+        Args:
+            parent_id: ID de la carpeta padre
+            name: Nombre de la carpeta
+            
+        Returns:
+            Optional[str]: ID de la carpeta si está indexada, None si no
+        """
+        try:
+            return self.selector.get_folder_id(parent_id, name)
+        except Exception as e:
+            logger.error(f"Error consultando índice de carpetas '{name}': {e}")
+            return None
+    
+    def get_folder_ids_for_pairs(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """
+        Consulta en el índice varias carpetas (padre, nombre) de distintos padres.
+        
+        Args:
+            pairs: Pares (ID de la carpeta padre, nombre)
+            
+        Returns:
+            Dict[Tuple[str, str], str]: (padre, nombre) -> ID de las carpetas indexadas
+        """
+        if not pairs:
+            return {}
+        
+        try:
+            return self.selector.get_folder_ids_for_pairs(pairs)
+        except Exception as e:
+            logger.error(f"Error consultando índice de carpetas: {e}")
+            return {}
+    
+    def register_folder(self, parent_id: str, name: str, folder_id: str, company_id: int = None) -> Optional[DriveFolder]:
+        """
+        Registra en el índice un ID de carpeta aprendido desde Drive.
+        
+        Args:
+            parent_id: ID de la carpeta padre
+            name: Nombre de la carpeta
+            folder_id: ID de la carpeta en Google Drive
+            company_id: ID de la compañía (opcional)
+            
+        Returns:
+            Optional[DriveFolder]: Carpeta indexada o None si hay error
+        """
+        try:
+            folder, _ = DriveFolder.objects.get_or_create(
+                parent_id=parent_id,
+                name=name,
+                defaults={
+                    'folder_id': folder_id,
+                    'company_id': company_id,
+                }
+            )
+            return folder
+        except IntegrityError:
+            # Otro worker registró la misma carpeta al mismo tiempo
+            return DriveFolder.objects.filter(parent_id=parent_id, name=name).first()
+        except Exception as e:
+            logger.error(f"Error registrando carpeta '{name}' en el índice: {e}")
+            return None
+    
+    @contextmanager
+    def creation_lock(self, parent_id: str, name: str):
+        """
+        Serializa la creación de una carpeta (padre, nombre) en todo el cluster.
+        
+        Dentro del proceso usa un lock por clave (repartidas en un número fijo
+        de locks); entre procesos y nodos usa un advisory lock de sesión de
+        Postgres que se suelta al salir, después de que el ganador registró la
+        carpeta en el índice. No abre una transacción: las llamadas a Drive
+        del bloque no retienen locks de filas. En otros motores se apoya solo
+        en la restricción única del índice.
+        
+        Args:
+            parent_id: ID de la carpeta padre
+            name: Nombre de la carpeta
+        """
+        key = f"{parent_id}/{name}"
+        
+        with _local_locks[hash(key) % _LOCAL_LOCK_STRIPES]:
+            if connection.vendor != 'postgresql':
+                yield
+                return
+            
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", [key])
+            try:
+                yield
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [key])
+    
+    def replace_folder(self, duplicate_folder_id: str, canonical: DriveFolder) -> None:
+        """
+        Reemplaza en el índice una carpeta duplicada por la canónica.
+        
+        Args:
+            duplicate_folder_id: ID de la carpeta duplicada
+            canonical: Carpeta canónica ya indexada
+        """
+        with transaction.atomic():
+            duplicate = self.selector.get_folder_by_folder_id(duplicate_folder_id)
+            if duplicate:
+                duplicate.messages.update(drive_folder=canonical)
+                duplicate.delete()
+            
+            # Las subcarpetas de la duplicada pasan a colgar de la canónica
+            for child in DriveFolder.objects.filter(parent_id=duplicate_folder_id):
+                sibling = DriveFolder.objects.filter(parent_id=canonical.folder_id, name=child.name).first()
+                if sibling:
+                    # Se fusionarán al recorrer el siguiente nivel
+                    child.messages.update(drive_folder=sibling)
+                    child.delete()
+                else:
+                    child.parent_id = canonical.folder_id
+                    child.save(update_fields=['parent_id', 'updated_at'])
+
+
+class DriveUploadSessionService:
+    """
+    Servicio para operaciones de negocio de DriveUploadSession.
+    Single Responsibility: Solo persiste el progreso de las subidas reanudables
+    """
+    
+    def __init__(self):
+        self.selector = DriveUploadSessionSelector()
+    
+    def _expiration_limit(self):
+        """
+        Retorna la fecha antes de la cual una sesión ya expiró en Drive.
+        """
+        ttl = getattr(settings, 'DRIVE_UPLOAD_SESSION_TTL', 6 * 24 * 3600)
+        return timezone.now() - timedelta(seconds=ttl)
+    
+    def get_session(self, upload_key: str) -> Optional[DriveUploadSession]:
+        """
+        Obtiene la sesión vigente de una subida, si existe.
+        
+        Args:
+            upload_key: Clave de la subida
+            
+        Returns:
+            Optional[DriveUploadSession]: Sesión vigente o None
+        """
+        try:
+            return self.selector.get_session(upload_key, self._expiration_limit())
+        except Exception as e:
+            logger.error(f"Error consultando sesión de subida '{upload_key}': {e}")
+            return None
+    
+    def start_session(self, upload_key: str, session_uri: str, folder_id: str, filename: str,
+                      total_size: int) -> Optional[DriveUploadSession]:
+        """
+        Registra una nueva sesión de subida reanudable y limpia las expiradas.
+        
+        Args:
+            upload_key: Clave de la subida
+            session_uri: URI de la sesión en Drive
+            folder_id: ID de la carpeta destino
+            filename: Nombre del archivo
+            total_size: Tamaño total en bytes
+            
+        Returns:
+            Optional[DriveUploadSession]: Sesión registrada o None si hay error
+        """
+        try:
+            self.sweep_expired()
+            session, _ = DriveUploadSession.objects.update_or_create(
+                upload_key=upload_key,
+                defaults={
+                    'session_uri': session_uri,
+                    'folder_id': folder_id,
+                    'filename': filename,
+                    'total_size': total_size,
+                    'committed_bytes': 0,
+                }
+            )
+            return session
+        except Exception as e:
+            logger.error(f"Error registrando sesión de subida '{filename}': {e}")
+            return None
+    
+    def update_progress(self, session: DriveUploadSession, committed_bytes: int) -> None:
+        """
+        Guarda el offset confirmado por Drive.
+        
+        Args:
+            session: Sesión de subida
+            committed_bytes: Bytes confirmados
+        """
+        try:
+            session.committed_bytes = committed_bytes
+            session.save(update_fields=['committed_bytes', 'updated_at'])
+        except Exception as e:
+            logger.error(f"Error guardando progreso de la subida '{session.filename}': {e}")
+    
+    def finish_session(self, upload_key: str) -> None:
+        """
+        Elimina la sesión de una subida terminada o descartada.
+        
+        Args:
+            upload_key: Clave de la subida
+        """
+        try:
+            DriveUploadSession.objects.filter(upload_key=upload_key).delete()
+        except Exception as e:
+            logger.error(f"Error eliminando sesión de subida '{upload_key}': {e}")
+    
+    def sweep_expired(self) -> int:
+        """
+        Elimina las sesiones más antiguas que la expiración de Drive.
+        
+        Returns:
+            int: Cantidad de sesiones eliminadas
+        """
+        deleted, _ = self.selector.get_expired_sessions(self._expiration_limit()).delete()
+        if deleted:
+            logger.info(f"Sesiones de subida expiradas eliminadas: {deleted}")
+        return deleted
+
+
+
+class DriveRateBucketService:
+    """
+    Servicio para operaciones de negocio de DriveRateBucket.
+    Single Responsibility: Solo reserva tokens de un bucket compartido en la base de datos
+    
+    Usa la conexión 'rate_limit' (misma base, otra conexión): cada reserva
+    es su propia transacción y suelta el lock de la fila al instante, aunque
+    se llame dentro de una transacción abierta de quien hace el request.
+    """
+    
+    def __init__(self):
+        self.using = 'rate_limit' if 'rate_limit' in connections.databases else DEFAULT_DB_ALIAS
+    
+    def reserve(self, name: str, rate: float, burst: float, tokens: float, max_wait: float, now: float) -> float:
+        """
+        Rellena el bucket y reserva tokens, bloqueando la fila para que todos
+        los procesos vean el mismo saldo.
+        
+        Args:
+            name: Nombre del bucket
+            rate: Tokens por segundo
+            burst: Capacidad máxima del bucket
+            tokens: Tokens a reservar
+            max_wait: Espera máxima aceptable en segundos
+            now: Timestamp Unix actual
+            
+        Returns:
+            float: Segundos a esperar antes de usar los tokens; si supera
+            max_wait la reserva no se aplica
+        """
+        with transaction.atomic(using=self.using):
+            bucket, _ = DriveRateBucket.objects.using(self.using).select_for_update().get_or_create(
+                name=name,
+                defaults={'tokens': burst, 'refilled_at': now}
+            )
+            
+            available = min(burst, bucket.tokens + max(0.0, now - bucket.refilled_at) * rate)
+            wait = max(0.0, (tokens - available) / rate)
+            if wait > max_wait:
+                return wait
+            
+            bucket.tokens = available - tokens
+            bucket.refilled_at = now
+            bucket.save(using=self.using, update_fields=['tokens', 'refilled_at', 'updated_at'])
+            return wait
+    
+    def drain(self, name: str, rate: float, seconds: float, now: float) -> None:
+        """
+        Deja el bucket en negativo para que nadie lo use durante unos segundos.
+        
+        Args:
+            name: Nombre del bucket
+            rate: Tokens por segundo
+            seconds: Segundos de pausa
+            now: Timestamp Unix actual
+        """
+        with transaction.atomic(using=self.using):
+            bucket, created = DriveRateBucket.objects.using(self.using).select_for_update().get_or_create(
+                name=name,
+                defaults={'tokens': -rate * seconds, 'refilled_at': now}
+            )
+            if created:
+                return
+            
+            available = bucket.tokens + max(0.0, now - bucket.refilled_at) * rate
+            bucket.tokens = min(available, -rate * seconds)
+            bucket.refilled_at = now
+            bucket.save(using=self.using, update_fields=['tokens', 'refilled_at', 'updated_at'])
+
+
+class DriveCacheGenerationService:
+    """
+    Servicio para operaciones de negocio de DriveCacheGeneration.
+    Single Responsibility: Solo incrementa la versión de una caché para invalidarla en todos los procesos
+    """
+    
+    def bump(self, name: str) -> int:
+        """
+        Incrementa la versión de una caché. Cada proceso la compara con la
+        suya y vacía su copia en memoria al ver que cambió.
+        
+        Args:
+            name: Nombre de la caché
+            
+        Returns:
+            int: Nueva versión
+        """
+        with transaction.atomic():
+            generation, created = DriveCacheGeneration.objects.select_for_update().get_or_create(
+                name=name,
+                defaults={'generation': 1}
+            )
+            if not created:
+                generation.generation = F('generation') + 1
+                generation.save(update_fields=['generation', 'updated_at'])
+                generation.refresh_from_db(fields=['generation'])
+            return generation.generation
+
+
+class DriveReconciliationService:
+    """
+    Servicio para aplicar el feed de cambios de Drive a Message y al índice de carpetas.
+    Single Responsibility: Solo sincroniza en bloque lo que cambió en Drive desde el último page token
+    """
+    
+    def __init__(self):
+        self.selector = DriveFolderSelector()
+    
+    def get_cursor(self, account: str) -> Optional[DriveChangesCursor]:
+        """
+        Obtiene la posición en el feed de cambios de una cuenta.
+        
+        Args:
+            account: Service Account del pool
+            
+        Returns:
+            Optional[DriveChangesCursor]: Cursor o None si nunca se reconcilió
+        """
+        return DriveChangesCursor.objects.filter(account=account).first()
+    
+    def save_cursor(self, account: str, page_token: str, synced: bool = False) -> None:
+        """
+        Guarda la posición en el feed de cambios de una cuenta.
+        
+        Args:
+            account: Service Account del pool
+            page_token: Page token desde el que continuar
+            synced: True si se llegó al final del feed
+        """
+        defaults = {'page_token': page_token}
+        if synced:
+            defaults['last_synced_at'] = timezone.now()
+        DriveChangesCursor.objects.update_or_create(account=account, defaults=defaults)
+    
+    def apply_changes(self, changes: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Aplica una página del feed de cambios: borrados, papelera, movimientos
+        y renombres, con consultas en bloque por tipo de cambio.
+        
+        Args:
+            changes: Cambios tal como los entrega changes.list
+            
+        Returns:
+            Dict con la cantidad de carpetas y mensajes afectados
+        """
+        # Solo importa el último estado de cada archivo dentro de la página
+        deleted: Set[str] = set()
+        folders: Dict[str, Dict[str, Any]] = {}
+        files: Dict[str, Dict[str, Any]] = {}
+        
+        for change in changes:
+            file = change.get('file') or {}
+            file_id = change.get('fileId') or file.get('id')
+            deleted.discard(file_id)
+            folders.pop(file_id, None)
+            files.pop(file_id, None)
+            
+            if change.get('removed') or file.get('trashed'):
+                deleted.add(file_id)
+            elif file.get('mimeType') == FOLDER_MIME_TYPE:
+                folders[file_id] = file
+            else:
+                files[file_id] = file
+        
+        with transaction.atomic():
+            folders_deleted, messages_deleted = self._apply_folder_deletions(deleted)
+            stats = {
+                'folders_deleted': folders_deleted,
+                'messages_deleted': messages_deleted + Message.objects.filter(drive_file_id__in=deleted)
+                .exclude(drive_status='deleted')
+                .update(drive_status='deleted', updated_at=timezone.now()),
+                'folders_updated': self._apply_folder_updates(folders),
+                'messages_updated': self._apply_file_updates(files),
+            }
+        
+        if stats['folders_deleted'] or stats['folders_updated']:
+            # Los demás procesos también tienen las rutas viejas en memoria
+            get_folder_cache().invalidate()
+        
+        metadata_cache = get_metadata_cache()
+        for file_id in (*deleted, *files):
+            metadata_cache.invalidate(file_id)
+        
+        return stats
+    
+    def _apply_folder_deletions(self, folder_ids: Set[str]) -> Tuple[int, int]:
+        """
+        Saca del índice las carpetas borradas o en la papelera y sus
+        subcarpetas, y marca como borrados los mensajes que contenían.
+        
+        Returns:
+            Tuple con (carpetas quitadas del índice, mensajes marcados como borrados)
+        """
+        folder_ids = set(
+            DriveFolder.objects.filter(folder_id__in=folder_ids).values_list('folder_id', flat=True)
+        )
+        if not folder_ids:
+            return 0, 0
+        
+        removed = self._with_descendants(folder_ids)
+        messages_deleted = Message.objects.filter(drive_folder__folder_id__in=removed).exclude(
+            drive_status='deleted'
+        ).update(drive_status='deleted', updated_at=timezone.now())
+        DriveFolder.objects.filter(folder_id__in=removed).delete()
+        return len(removed), messages_deleted
+    
+    def _apply_folder_updates(self, folders: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Aplica renombres y movimientos de carpetas indexadas y recalcula la
+        ruta de los mensajes que cuelgan de ellas.
+        """
+        changed = set()
+        
+        for folder in DriveFolder.objects.filter(folder_id__in=folders.keys()):
+            file = folders[folder.folder_id]
+            parent_id = (file.get('parents') or [folder.parent_id])[0]
+            name = file.get('name', folder.name)
+            if parent_id == folder.parent_id and name == folder.name:
+                continue
+            
+            folder.parent_id = parent_id
+            folder.name = name
+            try:
+                with transaction.atomic():
+                    folder.save(update_fields=['parent_id', 'name', 'updated_at'])
+            except IntegrityError:
+                # Ya hay otra carpeta indexada con ese nombre en ese padre: esta
+                # queda fuera del índice y merge_duplicate_drive_folders la fusionará
+                folder.delete()
+                continue
+            changed.add(folder.folder_id)
+        
+        if not changed:
+            return 0
+        
+        paths = {}
+        for folder in DriveFolder.objects.filter(folder_id__in=self._with_descendants(changed)):
+            path = self._folder_path(folder, paths)
+            if path:
+                folder.messages.update(drive_folder_path=path, updated_at=timezone.now())
+        
+        return len(changed)
+    
+    def _apply_file_updates(self, files: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Aplica renombres, movimientos y restauraciones de archivos a sus mensajes.
+        """
+        if not files:
+            return 0
+        
+        folders = {}
+        paths = {}
+        updated = []
+        now = timezone.now()
+        
+        for message in Message.objects.filter(drive_file_id__in=files.keys()).select_related('drive_folder'):
+            file = files[message.drive_file_id]
+            changed = False
+            
+            if message.drive_status != 'uploaded':
+                message.drive_status = 'uploaded'
+                changed = True
+            
+            if file.get('name') and file['name'] != message.filename:
+                message.filename = file['name']
+                changed = True
+            
+            parent_id = (file.get('parents') or [None])[0]
+            current_parent_id = message.drive_folder.folder_id if message.drive_folder else None
+            if parent_id and parent_id != current_parent_id:
+                if parent_id not in folders:
+                    folders[parent_id] = self.selector.get_folder_by_folder_id(parent_id)
+                message.drive_folder = folders[parent_id]
+                path = self._folder_path(message.drive_folder, paths) if message.drive_folder else None
+                if path:
+                    message.drive_folder_path = path
+                changed = True
+            
+            if changed:
+                message.updated_at = now
+                updated.append(message)
+        
+        Message.objects.bulk_update(
+            updated, ['drive_status', 'filename', 'drive_folder', 'drive_folder_path', 'updated_at'], batch_size=500
+        )
+        return len(updated)
+    
+    def _with_descendants(self, folder_ids: Iterable[str]) -> Set[str]:
+        """
+        Retorna las carpetas indicadas junto con todas sus subcarpetas indexadas.
+        """
+        result = set(folder_ids)
+        frontier = set(result)
+        
+        while frontier:
+            children = set(
+                DriveFolder.objects.filter(parent_id__in=frontier).values_list('folder_id', flat=True)
+            ) - result
+            result |= children
+            frontier = children
+        
+        return result
+    
+    def _folder_path(self, folder: DriveFolder, paths: Dict[str, Optional[str]]) -> Optional[str]:
+        """
+        Construye la ruta legible /{compañía}/... de una carpeta subiendo por
+        el índice hasta la carpeta de la compañía.
+        
+        Args:
+            folder: Carpeta indexada
+            paths: Memo folder_id -> ruta compartido entre llamadas
+            
+        Returns:
+            Optional[str]: Ruta o None si la carpeta quedó fuera del árbol de una compañía
+        """
+        if folder.folder_id in paths:
+            return paths[folder.folder_id]
+        
+        parent = self.selector.get_folder_by_folder_id(folder.parent_id)
+        if parent:
+            parent_path = self._folder_path(parent, paths)
+        else:
+            company = Company.objects.filter(drive_folder_id=folder.parent_id).first()
+            parent_path = f"/{company.name}" if company else None
+        
+        paths[folder.folder_id] = f"{parent_path}/{folder.name}" if parent_path else None
+        return paths[folder.folder_id]
@@ -0,0 +1,1592 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+import httplib2
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from googleapiclient.errors import HttpError
+from apps.agentmessages.models import Message
+from apps.companies.models import Company
+from apps.drive.models import DriveFolder, DriveUploadSession
+from apps.drive.services import DriveFolderService, DriveReconciliationService
+from apps.sources.models import Source
+from utils.drive.folder_cache import FileMetadataCache, FolderCache, get_folder_cache
+from utils.drive.layouts import get_folder_layout, strip_overflow
+from utils.drive.rate_limiter import (
+    DatabaseBucketStore, DriveRateLimiter, DriveRateLimitExceeded, LocalBucketStore, build_bucket_store, no_wait_beyond
+)
+from utils.drive import service as drive_service
+from utils.drive.service import DriveService
+from utils.drive import service_account_client
+from utils.drive.accounts import assign_account
+from utils.drive.concurrency import AdaptiveConcurrencyLimiter
+from utils.drive.service_account_client import GoogleDriveServiceAccountClient, get_drive_client
+from utils.drive.spool import DriveSpool
+from utils.drive.token_cache import FileTokenStore, SharedTokenCredentials, _utcnow
+from utils.drive.transport import ThreadLocalHttpPool
+from utils.drive import warmup
+from utils.drive.uploads import (
+    CHUNK_GRANULARITY, UPLOAD_MODE_MULTIPART, UPLOAD_MODE_RESUMABLE, ThroughputEstimator, choose_chunk_size, choose_upload_mode
+)
+from utils.resilience.circuit_breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker, CircuitOpenError
+from utils.storage.local import LocalFileSystemStorage
+
+
+def http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'{}')
+
+
+def make_drive_client(api_root_url='http://drive.test/'):
+    # Con una API falsa y sin archivo de credenciales el cliente no sale a la red
+    with override_settings(GOOGLE_DRIVE_API_ROOT_URL=api_root_url):
+        return GoogleDriveServiceAccountClient(service_account_file='/nonexistent/service-account.json')
+
+
+class FakeFolderDrive:
+    """
+    Drive falso para las búsquedas y creaciones de carpetas de un cliente.
+    """
+    
+    def __init__(self, *clients):
+        self.folders = {}
+        self.calls = []
+        self.lock = threading.Lock()
+        for client in clients:
+            client._find_folder_request = lambda name, parent_id=None: ('find', name, parent_id)
+            client._create_folder_request = lambda name, parent_id=None: ('create', name, parent_id)
+            client._execute = self.execute
+            client.trash_file = lambda file_id: self.calls.append(('trash', file_id, None))
+    
+    def execute(self, request, kind, size=0):
+        action, name, parent_id = request
+        with self.lock:
+            self.calls.append(request)
+            if action == 'find':
+                folder_id = self.folders.get((parent_id, name))
+                return {'files': [{'id': folder_id}] if folder_id else []}
+            
+            folder_id = f'folder-{len(self.calls)}'
+            self.folders[(parent_id, name)] = folder_id
+            return {'id': folder_id}
+    
+    def count(self, action):
+        return sum(1 for call in self.calls if call[0] == action)
+
+
+class LocalFileSystemStoragePathTests(SimpleTestCase):
+    """
+    Tests de la resolución de rutas del almacenamiento local.
+    """
+    
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.storage = LocalFileSystemStorage(root=self.root.name)
+        self.company = SimpleNamespace(id=1)
+        self.other_company = SimpleNamespace(id=2)
+        self.storage.get_company_root(self.other_company)
+    
+    def test_path_rejects_escaping_root(self):
+        with self.assertRaises(ValueError):
+            self.storage._path('../outside')
+        with self.assertRaises(ValueError):
+            self.storage._path('company-1/../../outside')
+    
+    def test_path_resolves_inside_root(self):
+        self.assertEqual(self.storage._path('company-1/a/b'), self.storage.root / 'company-1' / 'a' / 'b')
+    
+    def test_owns_own_root_and_descendants(self):
+        root_id = self.storage.get_company_root(self.company)
+        
+        self.assertTrue(self.storage.owns_folder(self.company, root_id))
+        self.assertTrue(self.storage.owns_folder(self.company, f'{root_id}/+1555/2026'))
+    
+    def test_does_not_own_other_company_through_traversal(self):
+        self.assertFalse(self.storage.owns_folder(self.company, 'company-1/../company-2'))
+        self.assertFalse(self.storage.owns_folder(self.company, 'company-1/x/../../company-2'))
+        self.assertFalse(self.storage.owns_folder(self.company, 'company-2'))
+    
+    def test_does_not_own_sibling_with_same_prefix(self):
+        self.assertFalse(self.storage.owns_folder(self.company, 'company-10'))
+    
+    def test_does_not_own_paths_outside_root(self):
+        self.assertFalse(self.storage.owns_folder(self.company, '../company-1'))
+        self.assertFalse(self.storage.owns_folder(self.company, '/etc'))
+    
+    def test_upload_does_not_overwrite_an_existing_file(self):
+        root_id = self.storage.get_company_root(self.company)
+        
+        first = self.storage.upload_file(b'primero', 'foto.jpg', root_id)
+        second = self.storage.upload_file(b'segundo', 'foto.jpg', root_id)
+        third = self.storage.upload_file(b'tercero', 'foto.jpg', root_id)
+        
+        self.assertEqual([first['filename'], second['filename'], third['filename']], ['foto.jpg', 'foto (1).jpg', 'foto (2).jpg'])
+        self.assertEqual(self.storage._path(first['file_id']).read_bytes(), b'primero')
+        self.assertEqual(self.storage._path(second['file_id']).read_bytes(), b'segundo')
+        # Sin archivos temporales olvidados
+        self.assertEqual(sorted(os.listdir(self.storage._path(root_id))), ['foto (1).jpg', 'foto (2).jpg', 'foto.jpg'])
+
+
+class BucketStoreTestMixin:
+    """
+    Tests de la cuenta de tokens, comunes a todos los stores de buckets.
+    """
+    
+    def test_burst_is_available_then_waits_at_rate(self):
+        for _ in range(3):
+            self.assertEqual(self.store.reserve('read', 2, 3, 1, 0, 100.0), 0)
+        
+        self.assertEqual(self.store.reserve('read', 2, 3, 1, 0, 100.0), 0.5)
+    
+    def test_wait_over_max_wait_does_not_reserve(self):
+        self.store.reserve('read', 2, 1, 1, 0, 100.0)
+        
+        self.assertEqual(self.store.reserve('read', 2, 1, 1, 0, 100.0), 0.5)
+        self.assertEqual(self.store.reserve('read', 2, 1, 1, 0, 100.0), 0.5)
+    
+    def test_reservation_within_max_wait_leaves_a_debt(self):
+        self.store.reserve('read', 2, 1, 1, 0, 100.0)
+        
+        self.assertEqual(self.store.reserve('read', 2, 1, 1, 10, 100.0), 0.5)
+        self.assertEqual(self.store.reserve('read', 2, 1, 1, 10, 100.0), 1.0)
+    
+    def test_refill_is_capped_at_burst(self):
+        self.store.reserve('read', 2, 3, 3, 0, 100.0)
+        
+        for _ in range(3):
+            self.assertEqual(self.store.reserve('read', 2, 3, 1, 0, 1000.0), 0)
+        self.assertEqual(self.store.reserve('read', 2, 3, 1, 0, 1000.0), 0.5)
+    
+    def test_buckets_are_independent(self):
+        self.store.reserve('read', 2, 1, 1, 0, 100.0)
+        
+        self.assertEqual(self.store.reserve('write', 2, 1, 1, 0, 100.0), 0)
+    
+    def test_drain_pauses_the_bucket(self):
+        self.store.drain('write', 2, 5, 100.0)
+        
+        self.assertEqual(self.store.reserve('write', 2, 3, 1, 0, 100.0), 5.5)
+        self.assertEqual(self.store.reserve('write', 2, 3, 1, 0, 105.5), 0)
+
+
+class LocalBucketStoreTests(BucketStoreTestMixin, SimpleTestCase):
+    
+    def setUp(self):
+        self.store = LocalBucketStore()
+
+
+class DatabaseBucketStoreTests(BucketStoreTestMixin, TestCase):
+    databases = '__all__'
+    
+    def setUp(self):
+        self.store = DatabaseBucketStore()
+
+
+@override_settings(DRIVE_RATE_LIMIT_MAX_WAIT=30)
+class DriveRateLimiterTests(SimpleTestCase):
+    """
+    Tests de la espera del limitador de Drive.
+    """
+    
+    def setUp(self):
+        self.limiter = DriveRateLimiter(store=LocalBucketStore(), limits={'write': {'rate': 1, 'burst': 1}})
+        self.limiter.acquire('write')
+    
+    @override_settings(REDIS_URL='', DRIVE_RATE_LIMIT_BACKEND='')
+    def test_default_store_without_redis_is_shared_through_the_database(self):
+        self.assertIsInstance(build_bucket_store(), DatabaseBucketStore)
+    
+    def test_waits_up_to_max_wait(self):
+        with mock.patch('utils.drive.rate_limiter.time.sleep') as sleep:
+            self.assertEqual(self.limiter.acquire('write'), sleep.call_args.args[0])
+        
+        self.assertGreater(sleep.call_args.args[0], 0)
+    
+    def test_no_wait_beyond_rejects_instead_of_sleeping(self):
+        with mock.patch('utils.drive.rate_limiter.time.sleep') as sleep:
+            with no_wait_beyond(0), self.assertRaises(DriveRateLimitExceeded):
+                self.limiter.acquire('write')
+        
+        sleep.assert_not_called()
+    
+    def test_upload_or_spool_spools_when_the_quota_is_exhausted(self):
+        company = SimpleNamespace(id=1, name='Acme')
+        service = DriveService()
+        service.user_service = mock.Mock(get_user_and_company_by_phone=mock.Mock(return_value=(None, company)))
+        service._store_file = lambda *args: self.limiter.acquire('write')
+        service._spool_file = mock.Mock(return_value={'drive_status': 'pending'})
+        
+        with mock.patch('utils.drive.rate_limiter.time.sleep') as sleep:
+            result = service.upload_or_spool(b'hola', 'f.txt', '+1555000111', 'document')
+        
+        sleep.assert_not_called()
+        self.assertEqual(result['drive_status'], 'pending')
+
+
+@override_settings(
+    CIRCUIT_BREAKER_MINIMUM_CALLS=4,
+    CIRCUIT_BREAKER_WINDOW_SIZE=4,
+    CIRCUIT_BREAKER_FAILURE_RATE=0.5,
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS=10,
+    CIRCUIT_BREAKER_SLOW_CALL_RATE=0.5,
+    CIRCUIT_BREAKER_OPEN_SECONDS=30,
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS=2,
+)
+class CircuitBreakerTests(SimpleTestCase):
+    """
+    Tests de las transiciones del circuit breaker.
+    """
+    
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('utils.resilience.circuit_breaker.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('test', is_failure=lambda exception: not isinstance(exception, KeyError))
+    
+    def succeed(self, seconds=0.0, size=0):
+        with self.breaker.guard(size):
+            self.now += seconds
+    
+    def fail(self, exception_class=RuntimeError):
+        with self.assertRaises(exception_class):
+            with self.breaker.guard():
+                raise exception_class('falla')
+    
+    def open_circuit(self):
+        for _ in range(2):
+            self.succeed()
+        for _ in range(2):
+            self.fail()
+        self.assertEqual(self.breaker.state, STATE_OPEN)
+    
+    def test_stays_closed_below_minimum_calls(self):
+        for _ in range(3):
+            self.fail()
+        
+        self.assertEqual(self.breaker.state, STATE_CLOSED)
+    
+    def test_opens_on_failure_rate_and_rejects_calls(self):
+        self.open_circuit()
+        
+        with self.assertRaises(CircuitOpenError):
+            self.succeed()
+    
+    def test_ignores_exceptions_that_are_not_failures(self):
+        for _ in range(4):
+            self.fail(KeyError)
+        
+        self.assertEqual(self.breaker.state, STATE_CLOSED)
+    
+    def test_opens_on_slow_calls(self):
+        for _ in range(2):
+            self.succeed()
+        for _ in range(2):
+            self.succeed(seconds=12)
+        
+        self.assertEqual(self.breaker.state, STATE_OPEN)
+    
+    def test_large_call_is_judged_per_mib(self):
+        for _ in range(4):
+            self.succeed(seconds=12, size=8 * 1024 * 1024)
+        
+        self.assertEqual(self.breaker.state, STATE_CLOSED)
+    
+    def test_half_opens_after_open_seconds(self):
+        self.open_circuit()
+        
+        self.now += 29
+        self.assertEqual(self.breaker.state, STATE_OPEN)
+        self.now += 1
+        self.assertEqual(self.breaker.state, STATE_HALF_OPEN)
+    
+    def test_closes_after_successful_probes(self):
+        self.open_circuit()
+        self.now += 30
+        
+        self.succeed()
+        self.assertEqual(self.breaker.state, STATE_HALF_OPEN)
+        self.succeed()
+        self.assertEqual(self.breaker.state, STATE_CLOSED)
+    
+    def test_reopens_on_failed_probe(self):
+        self.open_circuit()
+        self.now += 30
+        
+        self.fail()
+        
+        self.assertEqual(self.breaker.state, STATE_OPEN)
+    
+    def test_half_open_limits_probes_in_flight(self):
+        self.open_circuit()
+        self.now += 30
+        
+        with self.breaker.guard(), self.breaker.guard():
+            with self.assertRaises(CircuitOpenError):
+                self.succeed()
+    
+    def test_call_admitted_while_closed_is_not_a_probe(self):
+        with self.assertRaises(RuntimeError):
+            with self.breaker.guard():
+                # Mientras esta llamada corre, el circuito se abre y pasa a semiabierto
+                self.open_circuit()
+                self.now += 30
+                self.assertEqual(self.breaker.state, STATE_HALF_OPEN)
+                raise RuntimeError('falla tardía')
+        
+        self.assertEqual(self.breaker.state, STATE_HALF_OPEN)
+        self.succeed()
+        self.succeed()
+        self.assertEqual(self.breaker.state, STATE_CLOSED)
+    
+    def test_late_success_admitted_while_closed_does_not_close_the_circuit(self):
+        with self.breaker.guard():
+            self.open_circuit()
+            self.now += 30
+        
+        self.succeed()
+        self.assertEqual(self.breaker.state, STATE_HALF_OPEN)
+    
+    def test_probe_from_a_previous_round_is_ignored(self):
+        self.open_circuit()
+        self.now += 30
+        
+        with self.breaker.guard():
+            # Otra prueba falla, el circuito se reabre y empieza otra ronda
+            self.fail()
+            self.now += 30
+            self.assertEqual(self.breaker.state, STATE_HALF_OPEN)
+        
+        self.succeed()
+        self.assertEqual(self.breaker.state, STATE_HALF_OPEN)
+        with self.breaker.guard(), self.breaker.guard():
+            with self.assertRaises(CircuitOpenError):
+                self.succeed()
+
+
+class DriveSpoolTests(SimpleTestCase):
+    """
+    Tests del spool local de archivos pendientes.
+    """
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.spool = DriveSpool(self.directory.name)
+    
+    def test_put_get_remove_round_trip(self):
+        key = self.spool.put(b'hola', {'filename': 'f.txt'})
+        
+        self.assertEqual(self.spool.keys(), [key])
+        self.assertEqual(self.spool.get(key), (b'hola', {'filename': 'f.txt'}))
+        
+        self.spool.remove(key)
+        self.assertEqual(self.spool.keys(), [])
+        with self.assertRaises(FileNotFoundError):
+            self.spool.get(key)
+    
+    def test_discard_moves_files_out_of_pending(self):
+        key = self.spool.put(b'hola', {'filename': 'f.txt'})
+        
+        self.spool.discard(key)
+        
+        self.assertEqual(self.spool.keys(), [])
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, 'failed', f'{key}.bin')))
+    
+    def test_rejects_keys_with_paths(self):
+        with self.assertRaises(ValueError):
+            self.spool.get('../secreto')
+
+
+class DrainDriveSpoolTests(TestCase):
+    """
+    Tests del comando drain_drive_spool.
+    """
+    
+    def setUp(self):
+        storage_root = tempfile.TemporaryDirectory()
+        spool_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(storage_root.cleanup)
+        self.addCleanup(spool_directory.cleanup)
+        settings_override = override_settings(
+            LOCAL_STORAGE_ROOT=storage_root.name,
+            DRIVE_SPOOL_DIR=spool_directory.name,
+            DRIVE_SPOOL_HOST='web-1',
+            DRIVE_SPOOL_SHARED=False,
+            DRIVE_SPOOL_MAX_ATTEMPTS=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.storage_root = storage_root.name
+        self.spool = DriveSpool()
+        self.source = Source.objects.create(name='whatsapp', api_key='key-whatsapp')
+        self.company = Company.objects.create(name='Acme', storage_backend='local')
+    
+    def spool_message(self, spool_host=None):
+        result = DriveService()._spool_file(self.company, b'hola', 'f.txt', '+1555000111', 'text/plain', timezone.now())
+        return Message.objects.create(
+            source=self.source,
+            company=self.company,
+            sender_number='+1555000111',
+            filename='f.txt',
+            drive_status=result['drive_status'],
+            drive_folder_path=result['drive_folder_path'],
+            spool_key=result['spool_key'],
+            spool_host=spool_host if spool_host is not None else result['spool_host'],
+        )
+    
+    def drain(self):
+        call_command('drain_drive_spool', rate=1000, stdout=StringIO())
+    
+    def test_uploads_spooled_file_and_empties_spool(self):
+        message = self.spool_message()
+        
+        self.drain()
+        
+        message.refresh_from_db()
+        self.assertEqual(message.drive_status, 'uploaded')
+        self.assertEqual(message.spool_key, '')
+        self.assertEqual(self.spool.keys(), [])
+        with open(os.path.join(self.storage_root, message.drive_file_id), 'rb') as uploaded_file:
+            self.assertEqual(uploaded_file.read(), b'hola')
+    
+    def test_does_not_drain_other_hosts(self):
+        message = self.spool_message(spool_host='web-2')
+        
+        self.drain()
+        
+        message.refresh_from_db()
+        self.assertEqual(message.drive_status, 'pending')
+        self.assertEqual(self.spool.keys(), [message.spool_key])
+    
+    def test_does_not_drain_messages_claimed_by_another_drain(self):
+        message = self.spool_message()
+        Message.objects.filter(id=message.id).update(drive_status='draining')
+        
+        with mock.patch.object(DriveService, 'upload_spooled_file') as upload:
+            self.drain()
+        
+        upload.assert_not_called()
+    
+    def test_drive_unavailable_keeps_message_pending(self):
+        message = self.spool_message()
+        
+        with mock.patch.object(DriveService, 'upload_spooled_file', side_effect=http_error(503)):
+            self.drain()
+        
+        message.refresh_from_db()
+        self.assertEqual(message.drive_status, 'pending')
+        self.assertEqual(message.spool_attempts, 0)
+        self.assertEqual(self.spool.keys(), [message.spool_key])
+    
+    def test_repeated_errors_end_as_failed(self):
+        message = self.spool_message()
+        
+        with mock.patch.object(DriveService, 'upload_spooled_file', side_effect=http_error(400)):
+            self.drain()
+            message.refresh_from_db()
+            self.assertEqual((message.drive_status, message.spool_attempts), ('pending', 1))
+            
+            self.drain()
+        
+        message.refresh_from_db()
+        self.assertEqual((message.drive_status, message.spool_attempts), ('failed', 2))
+        self.assertEqual(self.spool.keys(), [])
+
+
+class FolderCacheInvalidationTests(TestCase):
+    """
+    Tests de la invalidación de la caché de carpetas entre procesos.
+    """
+    
+    def setUp(self):
+        self.company = Company.objects.create(name='Acme', drive_folder_id='root')
+        DriveFolder.objects.create(parent_id='root', name='+1555000111', folder_id='sender-1', company=self.company)
+        DriveFolder.objects.create(parent_id='sender-1', name='2026', folder_id='year-1', company=self.company)
+        # Caché de un worker: un proceso distinto del que reconcilia
+        self.worker_cache = FolderCache(check_seconds=0)
+        self.worker_cache.set_folder('root', '+1555000111', 'sender-1')
+        self.worker_cache.set_folder('sender-1', '2026', 'year-1')
+        self.worker_cache.set_path('root', ('+1555000111', '2026'), 'year-1')
+        self.assertEqual(self.worker_cache.get_path('root', ('+1555000111', '2026')), 'year-1')
+    
+    def test_other_process_drops_folders_reconciled_away(self):
+        DriveReconciliationService().apply_changes([{'fileId': 'sender-1', 'removed': True}])
+        
+        self.assertIsNone(self.worker_cache.get_path('root', ('+1555000111', '2026')))
+        self.assertIsNone(self.worker_cache.get_folder('root', '+1555000111'))
+    
+    def test_other_process_drops_renamed_folders(self):
+        DriveReconciliationService().apply_changes([{
+            'fileId': 'year-1',
+            'file': {'id': 'year-1', 'name': '2025', 'mimeType': 'application/vnd.google-apps.folder', 'parents': ['sender-1']},
+        }])
+        
+        self.assertIsNone(self.worker_cache.get_folder('sender-1', '2026'))
+    
+    def test_file_changes_keep_folder_caches(self):
+        DriveReconciliationService().apply_changes([{'fileId': 'file-1', 'removed': True}])
+        
+        self.assertEqual(self.worker_cache.get_path('root', ('+1555000111', '2026')), 'year-1')
+    
+    def test_check_interval_limits_generation_queries(self):
+        worker_cache = FolderCache(check_seconds=60)
+        worker_cache.set_folder('root', '+1555000111', 'sender-1')
+        worker_cache.get_folder('root', '+1555000111')
+        
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                worker_cache.get_folder('root', '+1555000111')
+
+
+class FolderCreationLockTests(TransactionTestCase):
+    """
+    Tests de la creación de carpetas con un solo creador por ruta.
+    """
+    
+    def setUp(self):
+        get_folder_cache().clear()
+        self.addCleanup(get_folder_cache().clear)
+    
+    def test_concurrent_calls_create_each_folder_once(self):
+        clients = [make_drive_client(), make_drive_client()]
+        drive = FakeFolderDrive(*clients)
+        
+        # Los dos buscan la carpeta antes de que cualquiera la cree, y la
+        # creación tarda: sin el lock los dos la crearían
+        both_searched = threading.Barrier(len(clients))
+        execute = drive.execute
+        
+        def execute_after_both_searched(request, kind, size=0):
+            if request[0] == 'find' and drive.count('find') < len(clients):
+                execute(request, kind, size)
+                both_searched.wait(5)
+                return {'files': []}
+            if request[0] == 'create':
+                time.sleep(0.2)
+            return execute(request, kind, size)
+        
+        for client in clients:
+            client._execute = execute_after_both_searched
+        
+        results = []
+        errors = []
+        
+        def ensure(client):
+            try:
+                results.append(client.ensure_folder_path('root', ('+1555000111', '2026')))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=ensure, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(drive.count('create'), 2)
+        self.assertEqual(drive.count('trash'), 0)
+        self.assertEqual(DriveFolder.objects.count(), 2)
+
+
+class MergeDuplicateDriveFoldersTests(TestCase):
+    """
+    Tests del comando merge_duplicate_drive_folders.
+    """
+    
+    def setUp(self):
+        self.company = Company.objects.create(name='Acme', drive_folder_id='root')
+        self.source = Source.objects.create(name='whatsapp', api_key='key-whatsapp')
+        # El índice apunta a la duplicada y a su subcarpeta; la canónica ya tiene su propio '2026'
+        self.sender_folder = DriveFolder.objects.create(parent_id='root', name='+1555000111', folder_id='dup', company=self.company)
+        self.duplicate_year = DriveFolder.objects.create(parent_id='dup', name='2026', folder_id='year-dup', company=self.company)
+        self.canonical_year = DriveFolder.objects.create(parent_id='canon', name='2026', folder_id='year-canon', company=self.company)
+        self.message = Message.objects.create(source=self.source, company=self.company, drive_folder=self.duplicate_year)
+        
+        self.client = mock.Mock()
+        self.client.list_children.side_effect = lambda parent_id, folders_only=False: {
+            'root': [{'id': 'canon', 'name': '+1555000111'}, {'id': 'dup', 'name': '+1555000111'}],
+            'dup': [{'id': 'file-1', 'name': 'a.jpg'}, {'id': 'year-dup', 'name': '2026'}],
+        }.get(parent_id, [])
+        patcher = mock.patch(
+            'apps.drive.management.commands.merge_duplicate_drive_folders.get_drive_client_for_company',
+            return_value=self.client
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def merge(self):
+        call_command('merge_duplicate_drive_folders', max_depth=1, stdout=StringIO())
+    
+    def test_moves_children_and_repoints_messages(self):
+        self.client.move_files_batch.side_effect = lambda moves: list(moves)
+        
+        self.merge()
+        
+        self.client.move_files_batch.assert_called_once_with({'file-1': 'canon', 'year-dup': 'canon'})
+        self.client.trash_file.assert_called_once_with('dup')
+        self.sender_folder.refresh_from_db()
+        self.assertEqual(self.sender_folder.folder_id, 'canon')
+        self.assertFalse(DriveFolder.objects.filter(folder_id='year-dup').exists())
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.drive_folder, self.canonical_year)
+    
+    def test_does_not_trash_duplicate_with_children_left(self):
+        self.client.move_files_batch.side_effect = lambda moves: ['file-1']
+        
+        self.merge()
+        
+        self.client.trash_file.assert_not_called()
+    
+    def test_dry_run_changes_nothing(self):
+        call_command('merge_duplicate_drive_folders', max_depth=1, dry_run=True, stdout=StringIO())
+        
+        self.client.move_files_batch.assert_not_called()
+        self.sender_folder.refresh_from_db()
+        self.assertEqual(self.sender_folder.folder_id, 'dup')
+    
+    def test_other_processes_stop_resolving_the_duplicate(self):
+        self.client.move_files_batch.side_effect = lambda moves: list(moves)
+        worker_cache = FolderCache(check_seconds=0)
+        worker_cache.set_folder('root', '+1555000111', 'dup')
+        self.assertEqual(worker_cache.get_folder('root', '+1555000111'), 'dup')
+        
+        self.merge()
+        
+        self.assertIsNone(worker_cache.get_folder('root', '+1555000111'))
+
+
+class FolderPathCacheTests(TestCase):
+    """
+    Tests de la caché de IDs de carpetas del remitente/año/mes/día.
+    """
+    
+    def setUp(self):
+        get_folder_cache().clear()
+        self.addCleanup(get_folder_cache().clear)
+        self.client = make_drive_client()
+        self.drive = FakeFolderDrive(self.client)
+    
+    def test_warm_cache_resolves_path_without_drive_calls(self):
+        folder_id = self.client.ensure_folder_path('root', ('+1555000111', '2026', '10', '19'))
+        self.drive.calls.clear()
+        
+        self.assertEqual(self.client.ensure_folder_path('root', ('+1555000111', '2026', '10', '19')), folder_id)
+        self.assertEqual(self.drive.calls, [])
+    
+    def test_new_day_reuses_cached_parents(self):
+        self.client.ensure_folder_path('root', ('+1555000111', '2026', '10', '19'))
+        self.drive.calls.clear()
+        
+        self.client.ensure_folder_path('root', ('+1555000111', '2026', '10', '20'))
+        
+        # Solo el día nuevo va a Drive; remitente, año y mes salen de la caché
+        self.assertEqual({name for _, name, _ in self.drive.calls}, {'20'})
+        self.assertEqual(self.drive.count('create'), 1)
+
+
+class DriveFolderIndexTests(TestCase):
+    """
+    Tests del índice persistente de carpetas compartido por los workers.
+    """
+    
+    def setUp(self):
+        get_folder_cache().clear()
+        self.addCleanup(get_folder_cache().clear)
+        self.service = DriveFolderService()
+    
+    def test_new_process_resolves_path_from_index_without_drive_calls(self):
+        client = make_drive_client()
+        FakeFolderDrive(client)
+        folder_id = client.ensure_folder_path('root', ('+1555000111', '2026', '10', '19'))
+        
+        # Otro proceso: caché vacía, mismo índice
+        get_folder_cache().clear()
+        other_client = make_drive_client()
+        other_drive = FakeFolderDrive(other_client)
+        
+        self.assertEqual(other_client.ensure_folder_path('root', ('+1555000111', '2026', '10', '19')), folder_id)
+        self.assertEqual(other_drive.calls, [])
+    
+    def test_register_folder_keeps_first_id(self):
+        first = self.service.register_folder('root', '+1555000111', 'folder-a')
+        second = self.service.register_folder('root', '+1555000111', 'folder-b')
+        
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(self.service.get_folder_id('root', '+1555000111'), 'folder-a')
+    
+    def test_get_folder_ids_for_pairs_matches_exact_pairs(self):
+        self.service.register_folder('sender-1', '2026', 'year-1')
+        self.service.register_folder('sender-2', '2025', 'year-2')
+        
+        found = self.service.get_folder_ids_for_pairs([('sender-1', '2026'), ('sender-1', '2025'), ('sender-2', '2025')])
+        
+        self.assertEqual(found, {('sender-1', '2026'): 'year-1', ('sender-2', '2025'): 'year-2'})
+
+
+class SharedDriveClientTests(SimpleTestCase):
+    """
+    Tests del cliente de Drive compartido por el proceso y sus transportes por hilo.
+    """
+    
+    def setUp(self):
+        service_account_client._clients.clear()
+        self.addCleanup(service_account_client._clients.clear)
+    
+    @override_settings(GOOGLE_DRIVE_API_ROOT_URL='http://drive.test/', GOOGLE_DRIVE_SERVICE_ACCOUNT_FILES=['/nonexistent/sa-1.json'])
+    def test_client_is_built_once_per_process(self):
+        with mock.patch.object(GoogleDriveServiceAccountClient, '__init__', return_value=None) as build:
+            first = get_drive_client()
+            self.assertIs(get_drive_client('sa-1'), first)
+            
+            # Tras un fork el hijo construye su propio cliente
+            with mock.patch('utils.drive.service_account_client.os.getpid', return_value=-1):
+                self.assertIsNot(get_drive_client(), first)
+        
+        self.assertEqual(build.call_count, 2)
+    
+    def test_each_thread_gets_its_own_transport(self):
+        pool = ThreadLocalHttpPool(credentials=mock.Mock())
+        other_thread_http = []
+        
+        thread = threading.Thread(target=lambda: other_thread_http.append(pool.get()))
+        thread.start()
+        thread.join()
+        
+        self.assertIs(pool.get(), pool.get())
+        self.assertIsNot(pool.get(), other_thread_http[0])
+        self.assertNotIn(308, pool.get().http.redirect_codes)
+    
+    def test_requests_run_on_the_calling_thread_transport(self):
+        pool = ThreadLocalHttpPool(credentials=mock.Mock(), root_url='http://drive.test/')
+        
+        request = pool.build_request(object(), mock.Mock(), 'https://www.googleapis.com/upload/drive/v3/files?uploadType=resumable')
+        
+        self.assertIs(request.http, pool.get())
+        self.assertEqual(request.uri, 'http://drive.test/upload/drive/v3/files?uploadType=resumable')
+
+    
+    def test_client_builds_from_static_discovery_document(self):
+        with mock.patch('httplib2.Http.request', side_effect=AssertionError('no debe salir a la red')):
+            client = make_drive_client()
+        
+        self.assertEqual(client.batch_uri, 'http://drive.test/batch/drive/v3')
+        self.assertTrue(client.service.files().get(fileId='file-1').uri.startswith('http://drive.test/drive/v3/files/file-1'))
+
+
+class FakeBatchHttpRequest:
+    """
+    BatchHttpRequest falso: responde cada request con su índice y guarda el tamaño de cada batch.
+    """
+    sizes = []
+    
+    def __init__(self, callback, batch_uri=None):
+        self.callback = callback
+        self.request_ids = []
+    
+    def add(self, request, request_id):
+        self.request_ids.append(request_id)
+    
+    def execute(self, http=None):
+        FakeBatchHttpRequest.sizes.append(len(self.request_ids))
+        for request_id in self.request_ids:
+            if request_id == '1':
+                self.callback(request_id, None, http_error(404))
+            else:
+                self.callback(request_id, {'index': int(request_id)}, None)
+
+
+class ExecuteBatchTests(SimpleTestCase):
+    """
+    Tests del agrupado de requests en batches de Drive.
+    """
+    
+    def setUp(self):
+        FakeBatchHttpRequest.sizes = []
+        patcher = mock.patch('utils.drive.service_account_client.BatchHttpRequest', FakeBatchHttpRequest)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = make_drive_client()
+        self.client.rate_limiter = mock.Mock()
+    
+    @override_settings(DRIVE_BATCH_SIZE=5)
+    def test_splits_at_bucket_burst_when_smaller(self):
+        self.client.rate_limiter.burst.return_value = 3
+        
+        self.client.execute_batch([object()] * 7)
+        
+        self.assertEqual(FakeBatchHttpRequest.sizes, [3, 3, 1])
+        self.assertEqual([call.args for call in self.client.rate_limiter.acquire.call_args_list], [('read', 3), ('read', 3), ('read', 1)])
+    
+    @override_settings(DRIVE_BATCH_SIZE=5)
+    def test_splits_at_batch_size_when_smaller(self):
+        self.client.rate_limiter.burst.return_value = 10
+        
+        self.client.execute_batch([object()] * 7)
+        
+        self.assertEqual(FakeBatchHttpRequest.sizes, [5, 2])
+    
+    @override_settings(DRIVE_BATCH_SIZE=2)
+    def test_results_keep_request_order_and_errors(self):
+        self.client.rate_limiter.burst.return_value = 10
+        
+        results = self.client.execute_batch([object()] * 3)
+        
+        self.assertEqual([response for response, _ in results], [{'index': 0}, None, {'index': 2}])
+        self.assertIsInstance(results[1][1], HttpError)
+
+
+MiB = 1024 * 1024
+
+
+@override_settings(
+    DRIVE_MULTIPART_UPLOAD_MAX_BYTES=5 * MiB,
+    DRIVE_UPLOAD_MIN_CHUNK_BYTES=1 * MiB,
+    DRIVE_UPLOAD_MAX_CHUNK_BYTES=64 * MiB,
+    DRIVE_UPLOAD_DEFAULT_CHUNK_BYTES=8 * MiB,
+    DRIVE_UPLOAD_CHUNK_TARGET_SECONDS=5,
+)
+class UploadModeTests(SimpleTestCase):
+    """
+    Tests de la elección del modo de subida y del tamaño de chunk.
+    """
+    
+    def test_upload_mode_threshold(self):
+        self.assertEqual(choose_upload_mode(0), UPLOAD_MODE_MULTIPART)
+        self.assertEqual(choose_upload_mode(5 * MiB), UPLOAD_MODE_MULTIPART)
+        self.assertEqual(choose_upload_mode(5 * MiB + 1), UPLOAD_MODE_RESUMABLE)
+    
+    def test_chunk_targets_observed_throughput(self):
+        self.assertEqual(choose_chunk_size(500 * MiB, bytes_per_second=2 * MiB), 10 * MiB)
+    
+    def test_chunk_is_aligned_to_256_kib(self):
+        chunk_size = choose_chunk_size(500 * MiB, bytes_per_second=1_000_000)
+        
+        self.assertEqual(chunk_size % CHUNK_GRANULARITY, 0)
+        self.assertEqual(chunk_size, 5_000_000 // CHUNK_GRANULARITY * CHUNK_GRANULARITY)
+    
+    def test_chunk_is_clamped_to_limits(self):
+        self.assertEqual(choose_chunk_size(500 * MiB, bytes_per_second=100 * MiB), 64 * MiB)
+        self.assertEqual(choose_chunk_size(500 * MiB, bytes_per_second=10 * 1024), 1 * MiB)
+    
+    def test_chunk_is_not_larger_than_file(self):
+        self.assertEqual(choose_chunk_size(6 * MiB, bytes_per_second=100 * MiB), 6 * MiB)
+        self.assertEqual(choose_chunk_size(6 * MiB + 1000, bytes_per_second=100 * MiB), 6 * MiB)
+    
+    def test_chunk_defaults_without_throughput(self):
+        with mock.patch('utils.drive.uploads.throughput_estimator', ThroughputEstimator()):
+            self.assertEqual(choose_chunk_size(500 * MiB), 8 * MiB)
+    
+    def test_throughput_is_a_moving_average(self):
+        estimator = ThroughputEstimator(alpha=0.5)
+        estimator.observe(4 * MiB, 1)
+        estimator.observe(2 * MiB, 1)
+        estimator.observe(1 * MiB, 0)
+        
+        self.assertEqual(estimator.bytes_per_second, 3 * MiB)
+
+
+class FakeResumableUploadServer(ThreadingHTTPServer):
+    """
+    Servidor falso del protocolo de subidas reanudables de Drive.
+    
+    fail_chunk: número de chunk (desde 1) que se guarda pero se responde con
+    503, como un corte después de que Drive lo recibió.
+    """
+    
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeResumableUploadHandler)
+        self.sessions = {}
+        self.files = {}
+        self.chunks = []
+        self.status_queries = 0
+        self.fail_chunk = None
+        self.root_url = f'http://127.0.0.1:{self.server_address[1]}/'
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+    
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeResumableUploadHandler(BaseHTTPRequestHandler):
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        session_id = str(len(self.server.sessions) + 1)
+        self.server.sessions[session_id] = bytearray()
+        self.send_response(200)
+        self.send_header('Location', f'{self.server.root_url}upload/session/{session_id}')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def do_PUT(self):
+        session_id = self.path.rsplit('/', 1)[-1]
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        received = self.server.sessions.get(session_id)
+        if received is None:
+            return self._reply(404)
+        
+        content_range = self.headers['Content-Range'][len('bytes '):]
+        byte_range, total = content_range.split('/')
+        if byte_range == '*':
+            self.server.status_queries += 1
+        else:
+            self.server.chunks.append(session_id)
+            start = int(byte_range.split('-')[0])
+            received[start:] = body
+        
+        if len(received) == int(total):
+            file_id = f'file-{session_id}'
+            self.server.files[file_id] = bytes(received)
+            status, payload = 200, {'id': file_id, 'name': 'video.mp4', 'size': total}
+        else:
+            status, payload = 308, None
+        
+        if byte_range != '*' and len(self.server.chunks) == self.server.fail_chunk:
+            return self._reply(503)
+        self._reply(status, payload, len(received))
+    
+    def _reply(self, status, payload=None, received=0):
+        content = json.dumps(payload).encode() if payload else b''
+        self.send_response(status)
+        if status == 308 and received:
+            self.send_header('Range', f'bytes=0-{received - 1}')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+@override_settings(
+    DRIVE_MULTIPART_UPLOAD_MAX_BYTES=0,
+    DRIVE_UPLOAD_MIN_CHUNK_BYTES=CHUNK_GRANULARITY,
+    DRIVE_UPLOAD_MAX_CHUNK_BYTES=CHUNK_GRANULARITY,
+)
+class ResumableUploadTests(TestCase):
+    """
+    Tests de las subidas reanudables contra un servidor falso de Drive.
+    """
+    
+    def setUp(self):
+        self.server = FakeResumableUploadServer()
+        self.addCleanup(self.server.close)
+        self.client = make_drive_client(self.server.root_url)
+        self.content = os.urandom(3 * CHUNK_GRANULARITY)
+    
+    def upload(self):
+        return self.client.upload_file(self.content, 'video.mp4', 'folder-1', 'video/mp4')
+    
+    def interrupt_second_chunk(self):
+        self.server.fail_chunk = 2
+        with self.assertRaises(HttpError):
+            self.upload()
+        self.server.fail_chunk = None
+        self.server.chunks.clear()
+    
+    def test_resumes_after_interrupted_chunk(self):
+        self.interrupt_second_chunk()
+        self.assertEqual(DriveUploadSession.objects.get().committed_bytes, CHUNK_GRANULARITY)
+        
+        result = self.upload()
+        
+        # Drive ya tenía el segundo chunk: solo falta el tercero
+        self.assertEqual(self.server.status_queries, 1)
+        self.assertEqual(self.server.chunks, ['1'])
+        self.assertEqual(self.server.files[result['file_id']], self.content)
+        self.assertFalse(DriveUploadSession.objects.exists())
+    
+    def test_restarts_when_session_expired(self):
+        self.interrupt_second_chunk()
+        self.server.sessions.clear()
+        
+        result = self.upload()
+        
+        self.assertEqual(self.server.chunks, ['1', '1', '1'])
+        self.assertEqual(self.server.files[result['file_id']], self.content)
+        self.assertFalse(DriveUploadSession.objects.exists())
+    
+    def test_returns_upload_finished_before_the_crash(self):
+        self.server.fail_chunk = 3
+        with self.assertRaises(HttpError):
+            self.upload()
+        self.server.chunks.clear()
+        
+        result = self.upload()
+        
+        self.assertEqual(self.server.chunks, [])
+        self.assertEqual(result['file_id'], 'file-1')
+        self.assertFalse(DriveUploadSession.objects.exists())
+
+
+class PrewarmDriveFoldersTests(TestCase):
+    """
+    Tests de la precreación de las carpetas del día siguiente.
+    """
+    
+    def setUp(self):
+        get_folder_cache().clear()
+        self.addCleanup(get_folder_cache().clear)
+        self.company = Company.objects.create(name='Acme', drive_folder_id='root')
+        self.source = Source.objects.create(name='whatsapp', api_key='key-whatsapp')
+    
+    def test_batch_resolves_one_level_per_request(self):
+        client = make_drive_client()
+        levels = []
+        
+        def create_folder_pairs_batch(pairs, company_id=None):
+            levels.append(pairs)
+            return {(parent_id, name): f'{parent_id}/{name}' for parent_id, name in pairs}
+        
+        client.create_folder_pairs_batch = create_folder_pairs_batch
+        paths = [('+1555000111', '2026', '10', '20'), ('+1555000222', '2026', '10', '20')]
+        
+        resolved = client.ensure_folder_paths_batch('root', paths, self.company.id)
+        
+        self.assertEqual(len(levels), 4)
+        self.assertEqual(levels[0], [('root', '+1555000111'), ('root', '+1555000222')])
+        self.assertEqual(resolved[paths[0]], 'root/+1555000111/2026/10/20')
+        
+        # La primera subida del día ya no va a Drive
+        drive = FakeFolderDrive(client)
+        self.assertEqual(client.ensure_folder_path('root', paths[1]), 'root/+1555000222/2026/10/20')
+        self.assertEqual(drive.calls, [])
+    
+    def test_command_prepares_folders_of_recent_senders(self):
+        Message.objects.create(source=self.source, company=self.company, sender_number='+1555000111')
+        old = Message.objects.create(source=self.source, company=self.company, sender_number='+1555000999')
+        Message.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=30))
+        client = mock.Mock()
+        client.ensure_folder_paths_batch.side_effect = lambda root_id, paths, company_id: {path: 'folder' for path in paths}
+        
+        with mock.patch('apps.drive.management.commands.prewarm_drive_folders.get_drive_client_for_company', return_value=client):
+            call_command('prewarm_drive_folders', date='2026-10-20', stdout=StringIO())
+        
+        expected = [get_folder_layout().segments('+1555000111', date(2026, 10, 20))]
+        client.ensure_folder_paths_batch.assert_called_once_with('root', expected, self.company.id)
+
+
+class AdaptiveConcurrencyTests(SimpleTestCase):
+    """
+    Tests del control AIMD de subidas simultáneas.
+    """
+    
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('utils.drive.concurrency.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def upload(self, limiter, seconds=1.0, size=0, busy=0):
+        # busy: otras subidas en curso mientras termina esta
+        with ExitStack() as stack:
+            for _ in range(busy):
+                stack.enter_context(limiter.slot(0))
+            with limiter.slot(size):
+                self.now += seconds
+    
+    def fail(self, limiter, exception):
+        with self.assertRaises(type(exception)):
+            with limiter.slot(0):
+                raise exception
+    
+    def test_increases_by_one_per_window_while_saturated(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2, minimum=1, maximum=32)
+        
+        # Sube 1/límite por subida: 2 -> 2.5 -> 2.9 -> 3.24
+        for _ in range(2):
+            self.upload(limiter, busy=1)
+        self.assertEqual(limiter.limit, 2)
+        self.upload(limiter, busy=1)
+        self.assertEqual(limiter.limit, 3)
+    
+    def test_does_not_increase_while_the_limit_is_not_used(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=32)
+        
+        for _ in range(20):
+            self.upload(limiter)
+        
+        self.assertEqual(limiter.limit, 4)
+    
+    def test_does_not_increase_past_maximum(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2, minimum=1, maximum=2)
+        
+        for _ in range(10):
+            self.upload(limiter, busy=1)
+        
+        self.assertEqual(limiter.limit, 2)
+    
+    def test_halves_on_overload(self):
+        for exception in (http_error(503), http_error(429), DriveRateLimitExceeded('cuota'), TimeoutError()):
+            limiter = AdaptiveConcurrencyLimiter(initial=8, minimum=1, maximum=32)
+            
+            self.fail(limiter, exception)
+            
+            self.assertEqual(limiter.limit, 4)
+            self.assertEqual(limiter.in_flight, 0)
+    
+    def test_request_errors_do_not_decrease(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=8, minimum=1, maximum=32)
+        
+        self.fail(limiter, http_error(404))
+        self.fail(limiter, ValueError('archivo inválido'))
+        
+        self.assertEqual(limiter.limit, 8)
+    
+    def test_decreases_once_per_window(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=8, minimum=1, maximum=32)
+        
+        self.fail(limiter, http_error(503))
+        self.fail(limiter, http_error(503))
+        self.assertEqual(limiter.limit, 4)
+        
+        self.now += 1
+        self.fail(limiter, http_error(503))
+        self.assertEqual(limiter.limit, 2)
+    
+    def test_does_not_decrease_below_minimum(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=3, minimum=2, maximum=32)
+        
+        for _ in range(3):
+            self.fail(limiter, http_error(503))
+            self.now += 10
+        
+        self.assertEqual(limiter.limit, 2)
+    
+    def test_latency_spike_decreases(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=8, minimum=1, maximum=32, latency_spike_factor=3)
+        for _ in range(5):
+            self.upload(limiter, seconds=1.0)
+        
+        self.upload(limiter, seconds=2.0)
+        self.assertEqual(limiter.limit, 8)
+        self.upload(limiter, seconds=10.0)
+        self.assertEqual(limiter.limit, 4)
+    
+    def test_latency_is_compared_per_mib(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=8, minimum=1, maximum=32, latency_spike_factor=3)
+        for _ in range(5):
+            self.upload(limiter, seconds=1.0, size=1024 * 1024)
+        
+        self.upload(limiter, seconds=10.0, size=10 * 1024 * 1024)
+        
+        self.assertEqual(limiter.limit, 8)
+
+
+class ServiceAccountAssignmentTests(SimpleTestCase):
+    """
+    Tests de la asignación de compañías a Service Accounts.
+    """
+    
+    def assign_all(self, *accounts):
+        with override_settings(GOOGLE_DRIVE_SERVICE_ACCOUNT_FILES=[f'/credentials/{account}.json' for account in accounts]):
+            return {company_id: assign_account(company_id) for company_id in range(1, 501)}
+    
+    def test_assignment_is_stable_and_spread(self):
+        assigned = self.assign_all('sa-1', 'sa-2', 'sa-3')
+        
+        self.assertEqual(assigned, self.assign_all('sa-3', 'sa-1', 'sa-2'))
+        for account in ('sa-1', 'sa-2', 'sa-3'):
+            self.assertGreater(list(assigned.values()).count(account), 100)
+    
+    def test_adding_an_account_only_moves_companies_to_it(self):
+        before = self.assign_all('sa-1', 'sa-2', 'sa-3')
+        after = self.assign_all('sa-1', 'sa-2', 'sa-3', 'sa-4')
+        
+        moved = [company_id for company_id in before if before[company_id] != after[company_id]]
+        self.assertTrue(moved)
+        self.assertEqual({after[company_id] for company_id in moved}, {'sa-4'})
+        self.assertLess(len(moved), 200)
+    
+    def test_removing_an_account_only_moves_its_companies(self):
+        before = self.assign_all('sa-1', 'sa-2', 'sa-3')
+        after = self.assign_all('sa-1', 'sa-3')
+        
+        moved = {company_id for company_id in before if before[company_id] != after[company_id]}
+        self.assertEqual(moved, {company_id for company_id in before if before[company_id] == 'sa-2'})
+    
+    @override_settings(GOOGLE_DRIVE_SERVICE_ACCOUNT_FILES=['/credentials/sa-1.json', '/credentials/sa-2.json'])
+    def test_pinned_account_wins_while_in_the_pool(self):
+        hashed = assign_account(1)
+        other = 'sa-1' if hashed == 'sa-2' else 'sa-2'
+        
+        self.assertEqual(assign_account(1, pinned=other), other)
+        self.assertEqual(assign_account(1, pinned='sa-retirada'), hashed)
+
+
+class FakeGoogleCredentials:
+    """
+    Credenciales falsas que cuentan las renovaciones contra Google.
+    """
+    
+    def __init__(self, refreshes, seconds=0.2):
+        self.refreshes = refreshes
+        self.seconds = seconds
+        self.token = None
+        self.expiry = None
+    
+    def refresh(self, request):
+        time.sleep(self.seconds)
+        with self.refreshes['lock']:
+            self.refreshes['count'] += 1
+            self.token = f"token-{self.refreshes['count']}"
+        self.expiry = _utcnow() + timedelta(hours=1)
+
+
+@override_settings(DRIVE_TOKEN_REFRESH_MARGIN=300, DRIVE_TOKEN_LOCK_TIMEOUT=10)
+class SharedTokenCredentialsTests(SimpleTestCase):
+    """
+    Tests de la renovación compartida de access tokens.
+    """
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = FileTokenStore(directory.name)
+        self.refreshes = {'count': 0, 'lock': threading.Lock()}
+    
+    def make_credentials(self):
+        # Cada instancia hace de un proceso distinto: solo comparten el store
+        return SharedTokenCredentials(FakeGoogleCredentials(self.refreshes), 'drive:token:test', store=self.store)
+    
+    def authorize(self, credentials):
+        headers = {}
+        credentials.before_request(None, 'GET', 'http://drive.test/', headers)
+        return headers['authorization']
+    
+    def test_single_refresher_under_contention(self):
+        workers = [self.make_credentials() for _ in range(8)]
+        barrier = threading.Barrier(len(workers))
+        headers = []
+        
+        def request(credentials):
+            barrier.wait()
+            headers.append(self.authorize(credentials))
+        
+        threads = [threading.Thread(target=request, args=(credentials,)) for credentials in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(self.refreshes['count'], 1)
+        self.assertEqual(set(headers), {'Bearer token-1'})
+    
+    def test_threads_of_one_process_share_the_refresh(self):
+        credentials = self.make_credentials()
+        threads = [threading.Thread(target=self.authorize, args=(credentials,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(self.refreshes['count'], 1)
+    
+    def test_rejected_token_is_not_taken_from_the_cache(self):
+        first, second = self.make_credentials(), self.make_credentials()
+        self.assertEqual(self.authorize(first), 'Bearer token-1')
+        self.assertEqual(self.authorize(second), 'Bearer token-1')
+        
+        second.refresh(None)
+        
+        self.assertEqual(second.token, 'token-2')
+        first.refresh(None)
+        self.assertEqual(first.token, 'token-2')
+        self.assertEqual(self.refreshes['count'], 2)
+
+
+class FolderLayoutTests(SimpleTestCase):
+    """
+    Tests de las políticas de carpetas y de la ruta sin subcarpeta por hora.
+    """
+    
+    when = datetime(2026, 3, 7, 9, 30)
+    
+    def test_segments_per_layout(self):
+        self.assertEqual(get_folder_layout('daily').segments('+1555000111', self.when), ('+1555000111', '2026', '03', '07'))
+        self.assertEqual(get_folder_layout('monthly').segments('+1555000111', self.when), ('+1555000111', '2026-03'))
+        self.assertEqual(get_folder_layout('flat').segments('+1555000111', self.when), ('+1555000111', '2026-03-07'))
+    
+    def test_overflow_segment_per_layout(self):
+        self.assertEqual(get_folder_layout('daily').overflow_segment(self.when), '09h')
+        self.assertEqual(get_folder_layout('flat').overflow_segment(self.when), '09h')
+        self.assertEqual(get_folder_layout('monthly').overflow_segment(self.when), '07-09h')
+    
+    def test_folder_path_starts_with_company(self):
+        self.assertEqual(get_folder_layout('daily').folder_path('Acme', '+1555000111', self.when), '/Acme/+1555000111/2026/03/07')
+    
+    @override_settings(DRIVE_FOLDER_LAYOUT='monthly')
+    def test_default_layout_comes_from_settings(self):
+        self.assertEqual(get_folder_layout().name, 'monthly')
+    
+    def test_unknown_layout_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_folder_layout('weekly')
+    
+    def test_strip_overflow_removes_only_the_hourly_segment(self):
+        for layout in ('daily', 'monthly', 'flat'):
+            folder_layout = get_folder_layout(layout)
+            folder_path = folder_layout.folder_path('Acme', '+1555000111', self.when)
+            
+            self.assertEqual(strip_overflow(f'{folder_path}/{folder_layout.overflow_segment(self.when)}'), folder_path)
+            self.assertEqual(strip_overflow(folder_path), folder_path)
+    
+    def test_strip_overflow_keeps_look_alike_segments(self):
+        for folder_path in ('/Acme/+1555000111/2026/03/07/9h', '/Acme/+1555000111/09h/fotos', '/Acme/+1555000111/2026-03-09h', '/Acme/123h'):
+            self.assertEqual(strip_overflow(folder_path), folder_path)
+        
+        self.assertEqual(strip_overflow(None), '')
+
+
+@override_settings(DRIVE_HOURLY_SPLIT_THRESHOLD=3, DRIVE_FOLDER_LAYOUT='daily')
+class HourlySplitTests(TestCase):
+    """
+    Tests de la división por hora de carpetas con demasiados archivos.
+    """
+    
+    folder_path = '/Acme/+1555000111/2026/03/07'
+    
+    def setUp(self):
+        drive_service._overflowed_folders.clear()
+        self.addCleanup(drive_service._overflowed_folders.clear)
+        storage_root = tempfile.TemporaryDirectory()
+        self.addCleanup(storage_root.cleanup)
+        settings_override = override_settings(LOCAL_STORAGE_ROOT=storage_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
+        self.source = Source.objects.create(name='whatsapp', api_key='key-whatsapp')
+        self.company = Company.objects.create(name='Acme', storage_backend='local')
+        self.service = DriveService()
+    
+    def add_messages(self, count, company=None, folder_path=None):
+        for _ in range(count):
+            Message.objects.create(
+                source=self.source,
+                company=company or self.company,
+                sender_number='+1555000111',
+                drive_folder_path=folder_path or self.folder_path
+            )
+    
+    def test_not_overflowed_below_threshold(self):
+        self.add_messages(2)
+        
+        self.assertFalse(self.service._is_overflowed(self.company.id, self.folder_path))
+    
+    def test_overflowed_at_threshold_and_remembered(self):
+        self.add_messages(3)
+        
+        self.assertTrue(self.service._is_overflowed(self.company.id, self.folder_path))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.service._is_overflowed(self.company.id, self.folder_path))
+    
+    def test_folders_and_companies_are_counted_apart(self):
+        other_company = Company.objects.create(name='Otra', storage_backend='local')
+        self.add_messages(3, company=other_company)
+        self.add_messages(3, folder_path='/Acme/+1555000111/2026/03/06')
+        
+        self.assertFalse(self.service._is_overflowed(self.company.id, self.folder_path))
+    
+    @override_settings(DRIVE_HOURLY_SPLIT_THRESHOLD=0)
+    def test_disabled_without_threshold(self):
+        self.add_messages(3)
+        
+        with self.assertNumQueries(0):
+            self.assertFalse(self.service._is_overflowed(self.company.id, self.folder_path))
+    
+    def test_store_file_goes_to_hourly_folder_once_overflowed(self):
+        when = datetime(2026, 3, 7, 9, 30)
+        
+        result = self.service._store_file(self.company, b'hola', 'a.txt', '+1555000111', 'text/plain', when)
+        self.assertEqual(result['drive_folder_path'], self.folder_path)
+        
+        self.add_messages(3)
+        result = self.service._store_file(self.company, b'hola', 'b.txt', '+1555000111', 'text/plain', when)
+        self.assertEqual(result['drive_folder_path'], f'{self.folder_path}/09h')
+        self.assertTrue(result['drive_file_id'].endswith('/2026/03/07/09h/b.txt'))
+
+
+class FakeWarmupDrive:
+    """
+    Drive falso para la precarga: cada carpeta tiene dos subcarpetas y cada
+    request batch consume tiempo.
+    """
+    
+    def __init__(self, test, seconds_per_batch):
+        self.test = test
+        self.seconds_per_batch = seconds_per_batch
+        self.batches = []
+    
+    def list_child_folders_batch(self, parent_ids):
+        self.batches.append(list(parent_ids))
+        self.test.now += self.seconds_per_batch
+        return {
+            parent_id: [{'id': f'{parent_id}/{name}', 'name': name} for name in ('a', 'b')]
+            for parent_id in parent_ids
+        }
+
+
+@override_settings(DRIVE_BATCH_SIZE=2, DRIVE_WARMUP_ON_STARTUP=True)
+class FolderCacheWarmupTests(SimpleTestCase):
+    """
+    Tests de la precarga de carpetas y del estado de readiness del worker.
+    """
+    
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('utils.drive.warmup.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        get_folder_cache().clear()
+        self.addCleanup(get_folder_cache().clear)
+        self.addCleanup(self.reset_state)
+        self.reset_state()
+        
+        self.run_warmup = warmup._run_warmup
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        patcher = mock.patch('utils.drive.warmup._run_warmup', side_effect=lambda: self.release.wait(10))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def reset_state(self):
+        warmup._state.clear()
+        warmup._state['status'] = warmup.WARMUP_DISABLED
+        warmup._state_pid = None
+    
+    def warm(self, companies, seconds_per_batch, budget_seconds):
+        drive = FakeWarmupDrive(self, seconds_per_batch)
+        with mock.patch('utils.drive.warmup._get_drive_client', return_value=drive):
+            stats = warmup.FolderCacheWarmer(budget_seconds=budget_seconds, max_depth=2).warm(companies)
+        return drive, stats
+    
+    def test_walk_within_budget_fills_the_cache(self):
+        companies = [SimpleNamespace(drive_folder_id='root-1'), SimpleNamespace(drive_folder_id='root-2')]
+        
+        drive, stats = self.warm(companies, seconds_per_batch=1, budget_seconds=60)
+        
+        self.assertTrue(stats['complete'])
+        self.assertEqual((stats['companies'], stats['folders'], stats['depth']), (2, 12, 2))
+        self.assertEqual(drive.batches[0], ['root-1', 'root-2'])
+        self.assertEqual(get_folder_cache().get_path('root-2', ('b', 'a')), 'root-2/b/a')
+    
+    def test_budget_cuts_the_walk(self):
+        companies = [SimpleNamespace(drive_folder_id=f'root-{index}') for index in range(6)]
+        
+        drive, stats = self.warm(companies, seconds_per_batch=6, budget_seconds=10)
+        
+        # El segundo batch arranca a los 6s; el tercero (a los 12s) ya no entra en los 10s
+        self.assertFalse(stats['complete'])
+        self.assertEqual(len(drive.batches), 2)
+        self.assertEqual((stats['folders'], stats['depth']), (8, 1))
+    
+    def test_not_started_is_ready(self):
+        self.assertEqual(warmup.get_warmup_state()['status'], warmup.WARMUP_DISABLED)
+        self.assertTrue(warmup.is_ready())
+    
+    def test_running_warmup_is_not_ready_until_it_finishes(self):
+        warmup.ensure_warmup_started()
+        
+        self.assertEqual(warmup.get_warmup_state()['status'], warmup.WARMUP_RUNNING)
+        self.assertFalse(warmup.is_ready())
+        
+        for status in (warmup.WARMUP_READY, warmup.WARMUP_FAILED):
+            warmup._state['status'] = status
+            self.assertTrue(warmup.is_ready())
+    
+    def test_started_once_per_process(self):
+        self.assertIsNotNone(warmup.ensure_warmup_started())
+        self.assertIsNone(warmup.ensure_warmup_started())
+    
+    def test_forked_worker_starts_its_own_warmup(self):
+        # El master (gunicorn --preload) la lanzó y el worker heredó el estado sin el hilo
+        warmup.ensure_warmup_started()
+        
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            self.assertTrue(warmup.is_ready())
+            
+            self.assertIsNotNone(warmup.ensure_warmup_started())
+            self.assertFalse(warmup.is_ready())
+    
+    @override_settings(DRIVE_WARMUP_ON_STARTUP=False)
+    def test_disabled_warmup_is_not_started(self):
+        self.assertIsNone(warmup.ensure_warmup_started())
+        self.assertTrue(warmup.is_ready())
+    
+    def test_failed_warmup_does_not_block_readiness(self):
+        warmup._state_pid = os.getpid()
+        with mock.patch.object(warmup.FolderCacheWarmer, 'warm', side_effect=RuntimeError('Drive caído')):
+            self.run_warmup()
+        
+        self.assertEqual(warmup.get_warmup_state()['status'], warmup.WARMUP_FAILED)
+        self.assertTrue(warmup.is_ready())
+
+
+class FileMetadataCacheTests(SimpleTestCase):
+    """
+    Tests de la caché de metadata de archivos.
+    """
+    
+    def setUp(self):
+        self.cache = FileMetadataCache(max_size=100, ttl=60)
+        self.fetched = []
+    
+    def fetch(self, file_ids):
+        self.fetched.append(list(file_ids))
+        # Los archivos borrados no vuelven en la respuesta
+        return {file_id: {'file_id': file_id} for file_id in file_ids if file_id != 'borrado'}
+    
+    def test_get_many_fetches_only_misses(self):
+        self.cache.set('a', {'file_id': 'a', 'cached': True})
+        
+        found = self.cache.get_many(['a', 'b', 'c', 'b'], self.fetch)
+        
+        self.assertEqual(self.fetched, [['b', 'c']])
+        self.assertEqual(found['a'], {'file_id': 'a', 'cached': True})
+        self.assertEqual(sorted(found), ['a', 'b', 'c'])
+    
+    def test_get_many_caches_fetched_metadata(self):
+        self.cache.get_many(['a', 'b'], self.fetch)
+        
+        self.assertEqual(self.cache.get_many(['a', 'b'], self.fetch), {'a': {'file_id': 'a'}, 'b': {'file_id': 'b'}})
+        self.assertEqual(self.fetched, [['a', 'b']])
+    
+    def test_get_many_does_not_fetch_when_everything_is_cached(self):
+        self.cache.set('a', {'file_id': 'a'})
+        
+        self.cache.get_many(['a'], self.fetch)
+        
+        self.assertEqual(self.fetched, [])
+    
+    def test_get_many_omits_files_not_returned(self):
+        found = self.cache.get_many(['a', 'borrado'], self.fetch)
+        
+        self.assertEqual(list(found), ['a'])
+        self.assertIsNone(self.cache.get('borrado'))
+    
+    def test_invalidated_file_is_fetched_again(self):
+        self.cache.get_many(['a'], self.fetch)
+        self.cache.invalidate('a')
+        
+        self.cache.get_many(['a'], self.fetch)
+        
+        self.assertEqual(self.fetched, [['a'], ['a']])
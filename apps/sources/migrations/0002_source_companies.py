@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0005_company_storage_backend"),
+        ("sources", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="source",
+            name="companies",
+            field=models.ManyToManyField(
+                blank=True,
+                help_text="Compañías cuyos archivos puede consultar esta fuente por la API",
+                related_name="api_sources",
+                to="companies.company",
+            ),
+        ),
+    ]
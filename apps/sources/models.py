@@ -61,6 +61,14 @@ class Source(BaseModel):
         help_text="Campo adicional 5 - Ej: Configuraciones específicas de la integración"
     )
     
+    # Compañías cuyos archivos puede consultar la fuente con su API Key
+    companies = models.ManyToManyField(
+        'companies.Company',
+        blank=True,
+        related_name='api_sources',
+        help_text="Compañías cuyos archivos puede consultar esta fuente por la API"
+    )
+    
     # Timestamps
     
     class Meta:
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'apps.agentmessages',
     'apps.companies',
     'apps.users',
+    'apps.drive',
     'apps.api',
 ]
 
@@ -106,6 +107,10 @@ DATABASES = {
     }
 }
 
+# Misma base en una conexión aparte, siempre en autocommit: las reservas del limitador
+# de Drive ('database') no se unen a la transacción de quien llama ni retienen el lock
+DATABASES['rate_limit'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
 
 
 
@@ -179,11 +184,167 @@ CORS_ALLOWED_ORIGINS = [
 GOOGLE_DRIVE_CREDENTIALS_FILE = 'token.json'
 GOOGLE_DRIVE_FOLDER_ID = ''
 
+# Pool de Service Accounts de Drive (rutas separadas por coma). Cada compañía se
+# asigna a una cuenta por rendezvous hashing o por la cuenta fijada en la compañía.
+# Vacío: solo credentials/service_account.json
+GOOGLE_DRIVE_SERVICE_ACCOUNT_FILES = [
+    path.strip() for path in os.getenv("GOOGLE_DRIVE_SERVICE_ACCOUNT_FILES", "").split(",") if path.strip()
+]
+
+# Backend de almacenamiento por defecto: 'google_drive' o 'local' (cada compañía puede
+# sobrescribirlo). El backend local guarda en LOCAL_STORAGE_ROOT y enlaza con LOCAL_STORAGE_BASE_URL
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "google_drive")
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", str(BASE_DIR / 'storage'))
+LOCAL_STORAGE_BASE_URL = os.getenv("LOCAL_STORAGE_BASE_URL", "")
+
+# Jerarquía de carpetas bajo la carpeta de cada compañía: 'daily' ({sender}/{YYYY}/{MM}/{DD}),
+# 'monthly' ({sender}/{YYYY-MM}) o 'flat' ({sender}/{YYYY-MM-DD}). Al cambiarla, los archivos
+# existentes se mueven con el comando migrate_drive_layout
+DRIVE_FOLDER_LAYOUT = os.getenv("DRIVE_FOLDER_LAYOUT", "daily")
+
+# Archivos por carpeta del día (o del mes) a partir de los cuales las subidas nuevas van a
+# subcarpetas por hora ('14h', o '19-14h' en 'monthly'). 0 desactiva la división
+DRIVE_HOURLY_SPLIT_THRESHOLD = int(os.getenv("DRIVE_HOURLY_SPLIT_THRESHOLD", 0))
+
+# Caché en memoria de IDs de carpetas de Drive (rutas de DRIVE_FOLDER_LAYOUT)
+DRIVE_FOLDER_CACHE_SIZE = int(os.getenv("DRIVE_FOLDER_CACHE_SIZE", 10000))
+DRIVE_FOLDER_CACHE_TTL = int(os.getenv("DRIVE_FOLDER_CACHE_TTL", 6 * 3600))
+# Cada cuántos segundos cada proceso revisa si otro invalidó la caché de carpetas
+# (reconciliación o fusión de duplicadas)
+DRIVE_FOLDER_CACHE_CHECK_SECONDS = float(os.getenv("DRIVE_FOLDER_CACHE_CHECK_SECONDS", 5))
+
+# Caché de páginas de listados de carpetas (navegación del árbol). Se invalida al subir
+# desde el mismo proceso; en el resto de los workers los cambios se ven al vencer el TTL
+DRIVE_LISTING_CACHE_SIZE = int(os.getenv("DRIVE_LISTING_CACHE_SIZE", 1000))
+DRIVE_LISTING_CACHE_TTL = int(os.getenv("DRIVE_LISTING_CACHE_TTL", 30))
+
+# Caché de metadata de archivos por drive_file_id (nombre, tamaño, enlaces). Se llena con
+# la respuesta de cada subida y se invalida al enviar a la papelera o al reconciliar cambios
+DRIVE_METADATA_CACHE_SIZE = int(os.getenv("DRIVE_METADATA_CACHE_SIZE", 10000))
+DRIVE_METADATA_CACHE_TTL = int(os.getenv("DRIVE_METADATA_CACHE_TTL", 3600))
+
+# Precarga de la caché de carpetas con el primer request de cada worker (recorrido en anchura
+# del árbol de cada compañía con requests batch). Mientras corre, /api/ready/ responde 503
+DRIVE_WARMUP_ON_STARTUP = os.getenv("DRIVE_WARMUP_ON_STARTUP", "false").lower() == "true"
+DRIVE_WARMUP_BUDGET_SECONDS = int(os.getenv("DRIVE_WARMUP_BUDGET_SECONDS", 60))
+DRIVE_WARMUP_MAX_DEPTH = int(os.getenv("DRIVE_WARMUP_MAX_DEPTH", 5))
+
+# Spool local de subidas: si Drive está caído o lento el archivo se guarda en disco, el
+# mensaje queda 'pending' y el comando drain_drive_spool lo sube a N archivos por segundo
+DRIVE_SPOOL_ENABLED = os.getenv("DRIVE_SPOOL_ENABLED", "true").lower() == "true"
+DRIVE_SPOOL_DIR = os.getenv("DRIVE_SPOOL_DIR", str(BASE_DIR / 'spool'))
+DRIVE_SPOOL_DRAIN_RATE = float(os.getenv("DRIVE_SPOOL_DRAIN_RATE", 2))
+
+# El spool es local a cada nodo: drain_drive_spool solo sube lo que se guardó con su
+# DRIVE_SPOOL_HOST (por defecto el hostname). Con DRIVE_SPOOL_SHARED=true (spool en un
+# volumen compartido) sube todo. Un archivo tomado por un drain que no terminó vuelve a
+# estar disponible pasados DRIVE_SPOOL_CLAIM_SECONDS
+DRIVE_SPOOL_HOST = os.getenv("DRIVE_SPOOL_HOST", "")
+DRIVE_SPOOL_SHARED = os.getenv("DRIVE_SPOOL_SHARED", "false").lower() == "true"
+DRIVE_SPOOL_CLAIM_SECONDS = int(os.getenv("DRIVE_SPOOL_CLAIM_SECONDS", 600))
+
+# Intentos de subida desde el spool ante errores que no son de disponibilidad (p. ej. un 4xx)
+# antes de marcar el mensaje 'failed' y apartar el archivo en DRIVE_SPOOL_DIR/failed
+DRIVE_SPOOL_MAX_ATTEMPTS = int(os.getenv("DRIVE_SPOOL_MAX_ATTEMPTS", 5))
+
+# Timeout (segundos) del transporte HTTP compartido del cliente de Drive
+DRIVE_HTTP_TIMEOUT = int(os.getenv("DRIVE_HTTP_TIMEOUT", 60))
+
+# Raíz alternativa de la API de Drive (p. ej. un servidor falso local: http://localhost:8089/)
+GOOGLE_DRIVE_API_ROOT_URL = os.getenv("GOOGLE_DRIVE_API_ROOT_URL", "")
+
+# Máximo de operaciones por request batch de Drive (límite de la API: 100)
+DRIVE_BATCH_SIZE = int(os.getenv("DRIVE_BATCH_SIZE", 100))
+
+# Selección del modo de subida: hasta este tamaño se usa un solo request multipart,
+# por encima subida reanudable con chunks ajustados al throughput observado
+DRIVE_MULTIPART_UPLOAD_MAX_BYTES = int(os.getenv("DRIVE_MULTIPART_UPLOAD_MAX_BYTES", 5 * 1024 * 1024))
+DRIVE_UPLOAD_DEFAULT_CHUNK_BYTES = int(os.getenv("DRIVE_UPLOAD_DEFAULT_CHUNK_BYTES", 8 * 1024 * 1024))
+DRIVE_UPLOAD_MIN_CHUNK_BYTES = int(os.getenv("DRIVE_UPLOAD_MIN_CHUNK_BYTES", 1024 * 1024))
+DRIVE_UPLOAD_MAX_CHUNK_BYTES = int(os.getenv("DRIVE_UPLOAD_MAX_CHUNK_BYTES", 64 * 1024 * 1024))
+DRIVE_UPLOAD_CHUNK_TARGET_SECONDS = int(os.getenv("DRIVE_UPLOAD_CHUNK_TARGET_SECONDS", 5))
+
+# Las URIs de subida reanudable de Drive caducan a la semana; se descartan antes
+DRIVE_UPLOAD_SESSION_TTL = int(os.getenv("DRIVE_UPLOAD_SESSION_TTL", 6 * 24 * 3600))
+
+# Redis compartido entre workers (opcional)
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+# Caché compartida de access tokens de Google (Redis si hay REDIS_URL, si no archivos
+# con flock en este directorio). Un solo proceso renueva cada token, N segundos antes de vencer
+DRIVE_TOKEN_CACHE_DIR = os.getenv("DRIVE_TOKEN_CACHE_DIR", "/tmp/drive-token-cache")
+DRIVE_TOKEN_REFRESH_MARGIN = int(os.getenv("DRIVE_TOKEN_REFRESH_MARGIN", 300))
+DRIVE_TOKEN_LOCK_TIMEOUT = int(os.getenv("DRIVE_TOKEN_LOCK_TIMEOUT", 10))
+
+# Limitador de requests a Drive compartido entre procesos: 'redis' (por defecto si
+# hay REDIS_URL), 'database' (por defecto sin Redis) o 'local' (solo para un proceso).
+# Presupuestos separados de lecturas y escrituras
+DRIVE_RATE_LIMIT_BACKEND = os.getenv("DRIVE_RATE_LIMIT_BACKEND", "")
+DRIVE_RATE_LIMITS = {
+    'read': {
+        'rate': float(os.getenv("DRIVE_READ_RATE", 150)),
+        'burst': int(os.getenv("DRIVE_READ_BURST", 300)),
+    },
+    'write': {
+        'rate': float(os.getenv("DRIVE_WRITE_RATE", 3)),
+        'burst': int(os.getenv("DRIVE_WRITE_BURST", 20)),
+    },
+}
+DRIVE_RATE_LIMIT_MAX_WAIT = float(os.getenv("DRIVE_RATE_LIMIT_MAX_WAIT", 30))
+# Espera máxima por cuota dentro de un webhook: pasado ese tiempo el archivo va al spool
+DRIVE_RATE_LIMIT_WEBHOOK_MAX_WAIT = float(os.getenv("DRIVE_RATE_LIMIT_WEBHOOK_MAX_WAIT", 0))
+DRIVE_RATE_LIMIT_PENALTY_SECONDS = float(os.getenv("DRIVE_RATE_LIMIT_PENALTY_SECONDS", 5))
+
+# Subidas simultáneas por proceso con control AIMD: sube +1 por ventana sana y
+# baja a la mitad ante 429/5xx o latencias sobre N veces la base
+DRIVE_UPLOAD_CONCURRENCY_INITIAL = int(os.getenv("DRIVE_UPLOAD_CONCURRENCY_INITIAL", 4))
+DRIVE_UPLOAD_CONCURRENCY_MIN = int(os.getenv("DRIVE_UPLOAD_CONCURRENCY_MIN", 1))
+DRIVE_UPLOAD_CONCURRENCY_MAX = int(os.getenv("DRIVE_UPLOAD_CONCURRENCY_MAX", 32))
+DRIVE_UPLOAD_LATENCY_SPIKE_FACTOR = float(os.getenv("DRIVE_UPLOAD_LATENCY_SPIKE_FACTOR", 3.0))
+
+# Circuit breakers de las dependencias externas (Drive por cuenta, Twilio, Telegram): se abren
+# si en las últimas N llamadas la proporción de errores o de llamadas lentas supera el umbral,
+# rechazan al instante durante OPEN_SECONDS y luego dejan pasar HALF_OPEN_CALLS de prueba
+CIRCUIT_BREAKER_WINDOW_SIZE = int(os.getenv("CIRCUIT_BREAKER_WINDOW_SIZE", 20))
+CIRCUIT_BREAKER_MINIMUM_CALLS = int(os.getenv("CIRCUIT_BREAKER_MINIMUM_CALLS", 10))
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", 0.5))
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", 10))
+CIRCUIT_BREAKER_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_RATE", 0.8))
+CIRCUIT_BREAKER_OPEN_SECONDS = int(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", 30))
+CIRCUIT_BREAKER_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", 3))
+
+# Timeout (segundos) de los requests a Twilio y Telegram
+OUTBOUND_HTTP_TIMEOUT = int(os.getenv("OUTBOUND_HTTP_TIMEOUT", 30))
+
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = ''
 TWILIO_AUTH_TOKEN = ''
 TWILIO_PHONE_NUMBER = ''
 
+# Respuestas a WhatsApp en cola: el webhook solo encola y el worker run_whatsapp_sender las
+# envía con N hilos, reintentando errores transitorios con backoff exponencial (con jitter)
+WHATSAPP_ASYNC_REPLIES = os.getenv("WHATSAPP_ASYNC_REPLIES", "true").lower() == "true"
+WHATSAPP_SENDER_WORKERS = int(os.getenv("WHATSAPP_SENDER_WORKERS", 4))
+WHATSAPP_SEND_MAX_ATTEMPTS = int(os.getenv("WHATSAPP_SEND_MAX_ATTEMPTS", 6))
+WHATSAPP_SEND_BACKOFF_SECONDS = float(os.getenv("WHATSAPP_SEND_BACKOFF_SECONDS", 2))
+WHATSAPP_SEND_BACKOFF_MAX_SECONDS = float(os.getenv("WHATSAPP_SEND_BACKOFF_MAX_SECONDS", 300))
+WHATSAPP_SEND_LEASE_SECONDS = int(os.getenv("WHATSAPP_SEND_LEASE_SECONDS", 60))
+
+# Confirmaciones de archivos cargados: las de un mismo remitente dentro de la ventana salen
+# en un solo mensaje con la lista de archivos (antes si se juntan N). 0 desactiva la agrupación
+WHATSAPP_COALESCE_SECONDS = int(os.getenv("WHATSAPP_COALESCE_SECONDS", 10))
+WHATSAPP_COALESCE_MAX_ITEMS = int(os.getenv("WHATSAPP_COALESCE_MAX_ITEMS", 20))
+
+# Límites de envío a WhatsApp (mensajes por segundo y ráfaga) por destino y por cuenta de
+# Twilio. Buckets en el backend del limitador de Drive salvo WHATSAPP_RATE_LIMIT_BACKEND; un 429
+# pausa la cuenta durante Retry-After (o N segundos si Twilio no lo indica)
+WHATSAPP_RATE_LIMIT_BACKEND = os.getenv("WHATSAPP_RATE_LIMIT_BACKEND", "")
+WHATSAPP_DESTINATION_RATE = float(os.getenv("WHATSAPP_DESTINATION_RATE", 1))
+WHATSAPP_DESTINATION_BURST = int(os.getenv("WHATSAPP_DESTINATION_BURST", 3))
+WHATSAPP_ACCOUNT_RATE = float(os.getenv("WHATSAPP_ACCOUNT_RATE", 20))
+WHATSAPP_ACCOUNT_BURST = int(os.getenv("WHATSAPP_ACCOUNT_BURST", 20))
+WHATSAPP_RATE_LIMIT_PENALTY_SECONDS = float(os.getenv("WHATSAPP_RATE_LIMIT_PENALTY_SECONDS", 5))
+
 # Telegram Configuration
 TELEGRAM_BOT_TOKEN = ''
 
@@ -13,5 +13,14 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_wsgi_application()
+django_application = get_wsgi_application()
 
+# Precarga de la caché de carpetas de Drive en segundo plano (ver /api/ready/). Se lanza
+# con el primer request de cada worker: con gunicorn --preload este módulo se importa en
+# el master y un hilo lanzado aquí no pasaría a los workers
+from utils.drive.warmup import ensure_warmup_started
+
+
+def application(environ, start_response):
+    ensure_warmup_started()
+    return django_application(environ, start_response)
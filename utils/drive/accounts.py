@@ -0,0 +1,74 @@
+import hashlib
+import os
+import logging
+from typing import Dict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACCOUNT = 'default'
+
+DEFAULT_SERVICE_ACCOUNT_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'credentials',
+    'service_account.json'
+)
+
+
+def get_service_accounts() -> Dict[str, str]:
+    """
+    Retorna el pool de Service Accounts configurado.
+    Cada cuenta se nombra por su archivo (sin .json). Sin
+    GOOGLE_DRIVE_SERVICE_ACCOUNT_FILES el pool es solo credentials/service_account.json.
+
+    Returns:
+        Dict nombre -> ruta del archivo JSON, en el orden configurado
+    """
+    files = getattr(settings, 'GOOGLE_DRIVE_SERVICE_ACCOUNT_FILES', [])
+    if not files:
+        return {DEFAULT_ACCOUNT: DEFAULT_SERVICE_ACCOUNT_FILE}
+
+    return {os.path.splitext(os.path.basename(path))[0]: path for path in files}
+
+
+def assign_account(company_id: int, pinned: str = '') -> str:
+    """
+    Elige la Service Account de una compañía.
+
+    Si la compañía tiene una cuenta fijada y sigue en el pool se usa esa. Si
+    no, se usa rendezvous hashing: cada compañía queda siempre en la misma
+    cuenta y al agregar o quitar una cuenta solo se mueven las compañías de
+    esa cuenta.
+
+    Args:
+        company_id: ID de la compañía
+        pinned: Cuenta fijada en la compañía (opcional)
+
+    Returns:
+        str: Nombre de la cuenta
+    """
+    accounts = get_service_accounts()
+    if pinned:
+        if pinned in accounts:
+            return pinned
+        logger.warning(f"Service Account '{pinned}' de la compañía {company_id} no está en el pool, asignando otra")
+
+    return max(accounts, key=lambda account: _rendezvous_score(company_id, account))
+
+
+def get_company_account(company) -> str:
+    """
+    Retorna la Service Account asignada a una compañía.
+
+    Args:
+        company: Compañía
+
+    Returns:
+        str: Nombre de la cuenta
+    """
+    return assign_account(company.id, company.drive_service_account)
+
+
+def _rendezvous_score(company_id: int, account: str) -> int:
+    digest = hashlib.sha256(f'{company_id}:{account}'.encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
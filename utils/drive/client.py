@@ -1,13 +1,13 @@
 import os
 import io
 from typing import Optional, Dict, Any, List
-from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseUpload
 from django.conf import settings
+from utils.drive.token_cache import share_token
 import logging
 
 logger = logging.getLogger(__name__)
@@ -42,22 +42,22 @@ class GoogleDriveClient:
             if os.path.exists(token_path):
                 self.credentials = Credentials.from_authorized_user_file(token_path, self.SCOPES)
             
-            # Si no hay credenciales válidas, autenticar
-            if not self.credentials or not self.credentials.valid:
-                if self.credentials and self.credentials.expired and self.credentials.refresh_token:
-                    self.credentials.refresh(Request())
-                else:
-                    if not os.path.exists(credentials_path):
-                        raise FileNotFoundError(f"Archivo de credenciales no encontrado: {credentials_path}")
-                    
-                    flow = InstalledAppFlow.from_client_secrets_file(credentials_path, self.SCOPES)
-                    self.credentials = flow.run_local_server(port=0)
+            # Sin refresh token hay que autorizar de nuevo
+            if not self.credentials or not self.credentials.refresh_token:
+                if not os.path.exists(credentials_path):
+                    raise FileNotFoundError(f"Archivo de credenciales no encontrado: {credentials_path}")
+                
+                flow = InstalledAppFlow.from_client_secrets_file(credentials_path, self.SCOPES)
+                self.credentials = flow.run_local_server(port=0)
                 
-                # Guardar las credenciales para la próxima ejecución
+                # Guardar el refresh token para la próxima ejecución
                 os.makedirs(os.path.dirname(token_path), exist_ok=True)
                 with open(token_path, 'w') as token:
                     token.write(self.credentials.to_json())
             
+            # El access token se renueva en la caché compartida, no en token.json
+            self.credentials = share_token(self.credentials, self.credentials.client_id, self.SCOPES)
+            
             # Construir el servicio
             self.service = build('drive', 'v3', credentials=self.credentials)
             logger.info("Autenticación con Google Drive exitosa")
@@ -0,0 +1,151 @@
+import socket
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from django.conf import settings
+from googleapiclient.errors import HttpError
+from utils.drive.rate_limiter import DriveRateLimitExceeded, get_retry_after
+from utils.metrics.registry import metrics
+
+logger = logging.getLogger(__name__)
+
+# Las latencias de archivos distintos se comparan en segundos por MiB; los
+# archivos menores a 1 MiB se comparan por su latencia total
+_NORMALIZATION_BYTES = 1024 * 1024
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Control adaptativo (AIMD) de la cantidad de subidas simultáneas a Drive.
+    Single Responsibility: Solo decide cuántas subidas pueden correr a la vez
+
+    Mientras las subidas terminan bien y sin picos de latencia el límite sube
+    de a poco (+1 por cada ventana completa de subidas). Ante un 429, un 5xx,
+    un timeout o un pico de latencia baja a la mitad, a lo sumo una vez por
+    ventana para que una racha de errores de la misma ventana no lo desplome.
+    """
+
+    def __init__(self, initial: int = None, minimum: int = None, maximum: int = None,
+                 latency_spike_factor: float = None, labels: Optional[Dict[str, Any]] = None):
+        """
+        Inicializa el controlador.
+
+        Args:
+            initial: Límite inicial de subidas simultáneas
+            minimum: Límite mínimo
+            maximum: Límite máximo
+            latency_spike_factor: Veces sobre la latencia base que cuentan como pico
+            labels: Etiquetas de las métricas (opcional)
+        """
+        self.minimum = minimum or getattr(settings, 'DRIVE_UPLOAD_CONCURRENCY_MIN', 1)
+        self.maximum = maximum or getattr(settings, 'DRIVE_UPLOAD_CONCURRENCY_MAX', 32)
+        self.latency_spike_factor = latency_spike_factor or getattr(settings, 'DRIVE_UPLOAD_LATENCY_SPIKE_FACTOR', 3.0)
+        self.labels = labels or {}
+
+        self._limit = float(initial or getattr(settings, 'DRIVE_UPLOAD_CONCURRENCY_INITIAL', 4))
+        self._in_flight = 0
+        self._baseline: Optional[float] = None
+        self._average_elapsed = 1.0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        with self._condition:
+            return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        with self._condition:
+            return self._in_flight
+
+    @contextmanager
+    def slot(self, size: int):
+        """
+        Espera un lugar libre, ejecuta la subida y ajusta el límite según el resultado.
+
+        Args:
+            size: Tamaño del archivo en bytes
+        """
+        self._acquire()
+        started = time.monotonic()
+
+        try:
+            yield
+        except Exception as e:
+            self._release()
+            if self._is_overload(e):
+                self._decrease(type(e).__name__ if not isinstance(e, HttpError) else f'http_{e.resp.status}')
+            raise
+
+        self._release()
+        self._observe(time.monotonic() - started, size)
+
+    def _acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+            self._publish()
+
+    def _release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._publish()
+            self._condition.notify()
+
+    def _observe(self, elapsed: float, size: int) -> None:
+        """
+        Registra una subida exitosa: baja el límite si fue un pico de
+        latencia, si no lo sube de forma aditiva.
+        """
+        cost = elapsed / max(1.0, size / _NORMALIZATION_BYTES)
+
+        with self._condition:
+            baseline = self._baseline
+            self._average_elapsed = 0.9 * self._average_elapsed + 0.1 * elapsed
+            self._baseline = cost if baseline is None else 0.9 * baseline + 0.1 * min(cost, baseline * self.latency_spike_factor)
+
+        if baseline is not None and cost > baseline * self.latency_spike_factor:
+            self._decrease('latency')
+            return
+
+        with self._condition:
+            # Solo crecer si el límite actual se está usando
+            if self._in_flight + 1 >= int(self._limit) and self._limit < self.maximum:
+                previous = int(self._limit)
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+                if int(self._limit) > previous:
+                    metrics.increment('drive.upload.concurrency_decisions', labels={**self.labels, 'decision': 'increase'})
+                    self._publish()
+                    self._condition.notify_all()
+
+    def _decrease(self, reason: str) -> None:
+        with self._condition:
+            now = time.monotonic()
+            # Una ventana dura lo que una subida promedio
+            if now - self._last_decrease < self._average_elapsed or int(self._limit) <= self.minimum:
+                return
+
+            self._last_decrease = now
+            self._limit = max(float(self.minimum), self._limit / 2)
+            self._publish()
+
+        metrics.increment('drive.upload.concurrency_decisions', labels={**self.labels, 'decision': 'decrease', 'reason': reason})
+        logger.warning(f"Concurrencia de subidas a Drive reducida a {self.limit} ({reason})")
+
+    def _is_overload(self, exception: Exception) -> bool:
+        """
+        Indica si un error es señal de sobrecarga (y no un error del request).
+        """
+        if isinstance(exception, HttpError):
+            return exception.resp.status >= 500 or get_retry_after(exception) is not None
+
+        return isinstance(exception, (DriveRateLimitExceeded, socket.timeout, TimeoutError, ConnectionError))
+
+    def _publish(self) -> None:
+        metrics.set_gauge('drive.upload.concurrency_limit', int(self._limit), self.labels)
+        metrics.set_gauge('drive.upload.in_flight', self._in_flight, self.labels)
@@ -0,0 +1,341 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Nombre de la versión compartida de la caché de carpetas (DriveCacheGeneration)
+FOLDER_CACHE_GENERATION = 'drive:folders'
+
+
+class TTLCache:
+    """
+    Caché LRU en memoria con expiración por TTL.
+    Single Responsibility: Solo guarda pares clave/valor acotados en tamaño y tiempo
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        """
+        Inicializa la caché.
+
+        Args:
+            max_size: Número máximo de entradas antes de desalojar la menos usada
+            ttl: Segundos que una entrada permanece válida
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Obtiene un valor si existe y no ha expirado.
+
+        Args:
+            key: Clave a consultar
+
+        Returns:
+            Valor almacenado o None si no existe o expiró
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Guarda un valor, desalojando la entrada menos usada si se excede el tamaño.
+
+        Args:
+            key: Clave a guardar
+            value: Valor asociado
+        """
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Elimina una entrada si existe.
+
+        Args:
+            key: Clave a eliminar
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Vacía la caché.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class FolderCache:
+    """
+    Caché de IDs de carpetas de Google Drive compartida por el proceso.
+    Single Responsibility: Solo recuerda IDs de carpetas ya resueltas
+
+    Mantiene dos niveles:
+    - (parent_id, name) -> folder_id para cada carpeta individual
+    - (company_folder_id, *segmentos) -> folder_id de la carpeta final, para
+      que una ruta completa ya conocida se resuelva sin consultar Drive
+
+    Cuando una carpeta se borra, mueve o renombra en Drive, quien lo detecta
+    llama a invalidate(), que incrementa una versión compartida en la base de
+    datos. Cada proceso la consulta cada DRIVE_FOLDER_CACHE_CHECK_SECONDS y
+    vacía su copia si cambió.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None, check_seconds: float = None):
+        max_size = max_size or getattr(settings, 'DRIVE_FOLDER_CACHE_SIZE', 10000)
+        ttl = ttl or getattr(settings, 'DRIVE_FOLDER_CACHE_TTL', 6 * 3600)
+        self.check_seconds = check_seconds if check_seconds is not None else getattr(settings, 'DRIVE_FOLDER_CACHE_CHECK_SECONDS', 5)
+        self.folders = TTLCache(max_size=max_size, ttl=ttl)
+        self.paths = TTLCache(max_size=max_size, ttl=ttl)
+        self._generation: Optional[int] = None
+        self._checked_at: Optional[float] = None
+
+    def get_folder(self, parent_id: str, name: str) -> Optional[str]:
+        """
+        Obtiene el ID de una carpeta por padre y nombre.
+
+        Args:
+            parent_id: ID de la carpeta padre
+            name: Nombre de la carpeta
+
+        Returns:
+            str: ID de la carpeta o None si no está en caché
+        """
+        self._sync()
+        return self.folders.get((parent_id, name))
+
+    def set_folder(self, parent_id: str, name: str, folder_id: str) -> None:
+        """
+        Guarda el ID de una carpeta por padre y nombre.
+
+        Args:
+            parent_id: ID de la carpeta padre
+            name: Nombre de la carpeta
+            folder_id: ID de la carpeta
+        """
+        self.folders.set((parent_id, name), folder_id)
+
+    def get_path(self, root_id: str, segments: tuple) -> Optional[str]:
+        """
+        Obtiene el ID de la carpeta final de una ruta completa.
+
+        Args:
+            root_id: ID de la carpeta raíz (carpeta de la compañía)
+            segments: Nombres de las carpetas desde la raíz
+
+        Returns:
+            str: ID de la carpeta final o None si no está en caché
+        """
+        self._sync()
+        return self.paths.get((root_id, *segments))
+
+    def set_path(self, root_id: str, segments: tuple, folder_id: str) -> None:
+        """
+        Guarda el ID de la carpeta final de una ruta completa.
+
+        Args:
+            root_id: ID de la carpeta raíz (carpeta de la compañía)
+            segments: Nombres de las carpetas desde la raíz
+            folder_id: ID de la carpeta final
+        """
+        self.paths.set((root_id, *segments), folder_id)
+
+    def clear(self) -> None:
+        """
+        Vacía ambos niveles de la caché de este proceso.
+        """
+        self.folders.clear()
+        self.paths.clear()
+
+    def invalidate(self) -> None:
+        """
+        Vacía la caché en todos los procesos: la de este al instante y la
+        de los demás en su próxima consulta de la versión compartida.
+        """
+        from apps.drive.services import DriveCacheGenerationService
+
+        self._generation = DriveCacheGenerationService().bump(FOLDER_CACHE_GENERATION)
+        self._checked_at = time.monotonic()
+        self.clear()
+
+    def _sync(self) -> None:
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = now
+
+        from apps.drive.selectors import DriveCacheGenerationSelector
+
+        try:
+            generation = DriveCacheGenerationSelector.get_generation(FOLDER_CACHE_GENERATION)
+        except Exception as e:
+            # Sin base de datos se sigue con la caché local hasta la próxima consulta
+            logger.warning(f"No se pudo consultar la versión de la caché de carpetas: {e}")
+            return
+
+        if self._generation is not None and generation != self._generation:
+            self.clear()
+        # La primera consulta solo adopta la versión: no descarta lo precargado al arrancar
+        self._generation = generation
+
+
+class FileMetadataCache:
+    """
+    Caché de metadata de archivos de Google Drive compartida por el proceso.
+    Single Responsibility: Solo recuerda la metadata ya obtenida por drive_file_id
+
+    Se llena con la respuesta de cada subida y con cada consulta; el nombre,
+    tamaño y enlaces de un archivo casi nunca cambian, así que el TTL es largo
+    y los cambios conocidos (papelera, reconciliación) invalidan la entrada.
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None):
+        max_size = max_size or getattr(settings, 'DRIVE_METADATA_CACHE_SIZE', 10000)
+        ttl = ttl or getattr(settings, 'DRIVE_METADATA_CACHE_TTL', 3600)
+        self.files = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la metadata de un archivo.
+
+        Args:
+            file_id: ID del archivo
+
+        Returns:
+            Dict con la metadata o None si no está en caché
+        """
+        return self.files.get(file_id)
+
+    def set(self, file_id: str, info: Dict[str, Any]) -> None:
+        """
+        Guarda la metadata de un archivo.
+
+        Args:
+            file_id: ID del archivo
+            info: Metadata en el formato de get_file_info
+        """
+        self.files.set(file_id, info)
+
+    def invalidate(self, file_id: str) -> None:
+        """
+        Descarta la metadata de un archivo.
+
+        Args:
+            file_id: ID del archivo
+        """
+        self.files.delete(file_id)
+
+    def get_many(self, file_ids: List[str], fetch: Callable[[List[str]], Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene la metadata de varios archivos, pidiendo solo los que faltan.
+
+        Args:
+            file_ids: IDs de los archivos
+            fetch: Función que obtiene de una vez la metadata de los IDs faltantes
+
+        Returns:
+            Dict file_id -> metadata (se omiten los que fetch no retorna)
+        """
+        found = {}
+        missing = []
+        for file_id in dict.fromkeys(file_ids):
+            info = self.files.get(file_id)
+            if info is None:
+                missing.append(file_id)
+            else:
+                found[file_id] = info
+
+        if missing:
+            for file_id, info in fetch(missing).items():
+                self.files.set(file_id, info)
+                found[file_id] = info
+
+        return found
+
+
+_folder_cache: Optional[FolderCache] = None
+_folder_cache_lock = threading.Lock()
+
+
+def get_folder_cache() -> FolderCache:
+    """
+    Retorna la caché de carpetas compartida por todo el proceso.
+
+    Returns:
+        FolderCache: Instancia única de la caché
+    """
+    global _folder_cache
+    if _folder_cache is None:
+        with _folder_cache_lock:
+            if _folder_cache is None:
+                _folder_cache = FolderCache()
+    return _folder_cache
+
+
+_listing_cache: Optional[TTLCache] = None
+_listing_cache_lock = threading.Lock()
+
+
+def get_listing_cache() -> TTLCache:
+    """
+    Retorna la caché de páginas de listados de carpetas compartida por todo
+    el proceso: parent_id -> {(page_token, page_size): (elementos, siguiente token)}.
+    El TTL es corto porque solo se invalida con las subidas de este proceso.
+
+    Returns:
+        TTLCache: Instancia única de la caché
+    """
+    global _listing_cache
+    if _listing_cache is None:
+        with _listing_cache_lock:
+            if _listing_cache is None:
+                _listing_cache = TTLCache(
+                    max_size=getattr(settings, 'DRIVE_LISTING_CACHE_SIZE', 1000),
+                    ttl=getattr(settings, 'DRIVE_LISTING_CACHE_TTL', 30)
+                )
+    return _listing_cache
+
+
+_metadata_cache: Optional[FileMetadataCache] = None
+_metadata_cache_lock = threading.Lock()
+
+
+def get_metadata_cache() -> FileMetadataCache:
+    """
+    Retorna la caché de metadata de archivos compartida por todo el proceso.
+
+    Returns:
+        FileMetadataCache: Instancia única de la caché
+    """
+    global _metadata_cache
+    if _metadata_cache is None:
+        with _metadata_cache_lock:
+            if _metadata_cache is None:
+                _metadata_cache = FileMetadataCache()
+    return _metadata_cache
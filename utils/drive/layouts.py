@@ -0,0 +1,139 @@
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Tuple
+from django.conf import settings
+
+DEFAULT_FOLDER_LAYOUT = 'daily'
+
+# Subcarpetas por hora de una carpeta desbordada: '14h' (o '19-14h' en la política mensual)
+_OVERFLOW_SEGMENT = re.compile(r'/(\d{2}-)?\d{2}h$')
+
+
+class FolderLayout(ABC):
+    """
+    Política de carpetas de los archivos de una compañía.
+    Strategy Pattern: Permite cambiar la jerarquía sender/fecha sin tocar la subida
+
+    Una ruta es una tupla de nombres de carpeta bajo la carpeta de la
+    compañía. Menos niveles significa menos búsquedas por subida y menos
+    carpetas pequeñas.
+    """
+
+    name: str = ''
+
+    @abstractmethod
+    def segments(self, sender_number: str, when: datetime) -> Tuple[str, ...]:
+        """
+        Construye la ruta de carpetas de un archivo.
+
+        Args:
+            sender_number: Número del remitente
+            when: Fecha de recepción del archivo
+
+        Returns:
+            Tuple con los nombres de las carpetas desde la carpeta de la compañía
+        """
+        pass
+
+    def overflow_segment(self, when: datetime) -> str:
+        """
+        Nombre de la subcarpeta por hora cuando la carpeta final está desbordada.
+
+        Args:
+            when: Fecha de recepción del archivo
+
+        Returns:
+            str: Nombre de la subcarpeta
+        """
+        return f"{when.hour:02d}h"
+
+    def folder_path(self, company_name: str, sender_number: str, when: datetime) -> str:
+        """
+        Construye la ruta legible que se guarda en Message.drive_folder_path.
+
+        Args:
+            company_name: Nombre de la compañía
+            sender_number: Número del remitente
+            when: Fecha de recepción del archivo
+
+        Returns:
+            str: Ruta /{compañía}/...
+        """
+        return '/' + '/'.join((company_name, *self.segments(sender_number, when)))
+
+
+class DailyFolderLayout(FolderLayout):
+    """
+    Jerarquía original: {sender}/{YYYY}/{MM}/{DD}.
+    Single Responsibility: Solo arma rutas de cuatro niveles
+    """
+
+    name = 'daily'
+
+    def segments(self, sender_number: str, when: datetime) -> Tuple[str, ...]:
+        return (sender_number, str(when.year), f"{when.month:02d}", f"{when.day:02d}")
+
+
+class MonthlyFolderLayout(FolderLayout):
+    """
+    Una carpeta por remitente y mes: {sender}/{YYYY-MM}.
+    Single Responsibility: Solo arma rutas de dos niveles por mes
+    """
+
+    name = 'monthly'
+
+    def segments(self, sender_number: str, when: datetime) -> Tuple[str, ...]:
+        return (sender_number, f"{when.year}-{when.month:02d}")
+
+    def overflow_segment(self, when: datetime) -> str:
+        return f"{when.day:02d}-{when.hour:02d}h"
+
+
+class FlatDailyFolderLayout(FolderLayout):
+    """
+    Una carpeta por remitente y día: {sender}/{YYYY-MM-DD}.
+    Single Responsibility: Solo arma rutas de dos niveles por día
+    """
+
+    name = 'flat'
+
+    def segments(self, sender_number: str, when: datetime) -> Tuple[str, ...]:
+        return (sender_number, when.strftime('%Y-%m-%d'))
+
+
+FOLDER_LAYOUTS: Dict[str, FolderLayout] = {
+    layout.name: layout for layout in (DailyFolderLayout(), MonthlyFolderLayout(), FlatDailyFolderLayout())
+}
+
+
+def get_folder_layout(name: str = None) -> FolderLayout:
+    """
+    Retorna una política de carpetas.
+
+    Args:
+        name: Nombre de la política (por defecto DRIVE_FOLDER_LAYOUT)
+
+    Returns:
+        FolderLayout: Política de carpetas
+
+    Raises:
+        ValueError: Si la política no existe
+    """
+    name = name or getattr(settings, 'DRIVE_FOLDER_LAYOUT', DEFAULT_FOLDER_LAYOUT)
+    if name not in FOLDER_LAYOUTS:
+        raise ValueError(f"Política de carpetas no soportada: {name}. Disponibles: {', '.join(FOLDER_LAYOUTS)}")
+    return FOLDER_LAYOUTS[name]
+
+
+def strip_overflow(folder_path: str) -> str:
+    """
+    Retorna la carpeta final de una ruta, sin la subcarpeta por hora si la tiene.
+
+    Args:
+        folder_path: Ruta guardada en Message.drive_folder_path
+
+    Returns:
+        str: Ruta de la carpeta del día (o del mes)
+    """
+    return _OVERFLOW_SEGMENT.sub('', folder_path or '')
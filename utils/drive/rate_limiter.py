@@ -0,0 +1,339 @@
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+from django.conf import settings
+from googleapiclient.errors import HttpError
+from utils.drive.accounts import DEFAULT_ACCOUNT
+from utils.metrics.registry import metrics
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_READ = 'read'
+RATE_LIMIT_WRITE = 'write'
+
+# Cuotas de Drive: ~12.000 consultas/minuto por usuario y ~3 escrituras/segundo
+# sostenidas. Se apunta un poco por debajo para no oscilar entre 200 y 403/429
+DEFAULT_RATE_LIMITS = {
+    RATE_LIMIT_READ: {'rate': 150, 'burst': 300},
+    RATE_LIMIT_WRITE: {'rate': 3, 'burst': 20},
+}
+
+# Espera máxima del contexto actual, si es menor que la del limitador (ver no_wait_beyond)
+_max_wait_override: ContextVar[Optional[float]] = ContextVar('drive_rate_limit_max_wait', default=None)
+
+# Reserva atómica en Redis: rellena el bucket según el tiempo transcurrido y
+# descuenta los tokens. El saldo puede quedar negativo: quien reserva espera
+# hasta que se pague la deuda, así las esperas quedan en fila sin reintentos
+_RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+local now = tonumber(ARGV[5])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+  tokens = burst
+  ts = now
+end
+local available = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = math.max(0, (requested - available) / rate)
+if wait <= max_wait then
+  redis.call('HSET', KEYS[1], 'tokens', tostring(available - requested), 'ts', tostring(now))
+  redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate + wait) + 60)
+end
+return tostring(wait)
+"""
+
+_DRAIN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local seconds = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+local drained = -rate * seconds
+if tokens ~= nil then
+  drained = math.min(tokens + math.max(0, now - ts) * rate, drained)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(drained), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(seconds) + 60)
+return 1
+"""
+
+
+class DriveRateLimitExceeded(Exception):
+    """
+    La cuota de Drive no alcanza para ejecutar el request dentro de la espera máxima.
+    """
+
+
+class LocalBucketStore:
+    """
+    Token buckets en memoria del proceso.
+    Single Responsibility: Solo lleva el saldo de buckets que no se comparten
+
+    Se usa como respaldo cuando no hay backend compartido disponible.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, name: str, rate: float, burst: float, tokens: float, max_wait: float, now: float) -> float:
+        with self._lock:
+            available, refilled_at = self._buckets.get(name, (burst, now))
+            available = min(burst, available + max(0.0, now - refilled_at) * rate)
+            wait = max(0.0, (tokens - available) / rate)
+            if wait <= max_wait:
+                self._buckets[name] = (available - tokens, now)
+            return wait
+
+    def drain(self, name: str, rate: float, seconds: float, now: float) -> None:
+        with self._lock:
+            drained = -rate * seconds
+            if name in self._buckets:
+                available, refilled_at = self._buckets[name]
+                drained = min(available + max(0.0, now - refilled_at) * rate, drained)
+            self._buckets[name] = (drained, now)
+
+
+class RedisBucketStore:
+    """
+    Token buckets compartidos entre procesos en Redis.
+    Single Responsibility: Solo ejecuta las reservas atómicas con scripts Lua
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self._reserve = self.client.register_script(_RESERVE_SCRIPT)
+        self._drain = self.client.register_script(_DRAIN_SCRIPT)
+
+    def reserve(self, name: str, rate: float, burst: float, tokens: float, max_wait: float, now: float) -> float:
+        return float(self._reserve(keys=[name], args=[rate, burst, tokens, max_wait, now]))
+
+    def drain(self, name: str, rate: float, seconds: float, now: float) -> None:
+        self._drain(keys=[name], args=[rate, seconds, now])
+
+
+class DatabaseBucketStore:
+    """
+    Token buckets compartidos entre procesos en la base de datos.
+    Single Responsibility: Solo delega las reservas al servicio de DriveRateBucket
+
+    Cada reserva bloquea la fila del bucket (SELECT ... FOR UPDATE) en una
+    conexión propia en autocommit, así que solo conviene cuando no hay Redis.
+    """
+
+    def __init__(self):
+        from apps.drive.services import DriveRateBucketService
+
+        self.service = DriveRateBucketService()
+
+    def reserve(self, name: str, rate: float, burst: float, tokens: float, max_wait: float, now: float) -> float:
+        return self.service.reserve(name, rate, burst, tokens, max_wait, now)
+
+    def drain(self, name: str, rate: float, seconds: float, now: float) -> None:
+        self.service.drain(name, rate, seconds, now)
+
+
+class DriveRateLimiter:
+    """
+    Limitador de requests a la API de Google Drive con presupuestos separados
+    para lecturas y escrituras.
+    Single Responsibility: Solo decide cuándo puede salir un request hacia Drive
+
+    Antes de cada request se reservan tokens en el bucket compartido y se
+    espera lo necesario. Si Drive responde 429 o 403 rateLimitExceeded, el
+    bucket se vacía para que todos los workers hagan pausa a la vez.
+    """
+
+    def __init__(self, store=None, limits: Dict[str, Dict[str, float]] = None, max_wait: float = None,
+                 namespace: str = 'drive:rate', labels: Optional[Dict[str, Any]] = None):
+        """
+        Inicializa el limitador.
+
+        Args:
+            store: Backend de los buckets (por defecto según DRIVE_RATE_LIMIT_BACKEND)
+            limits: Presupuestos {'read': {'rate', 'burst'}, 'write': {...}}
+            max_wait: Espera máxima en segundos antes de rechazar un request
+            namespace: Prefijo de los nombres de los buckets
+            labels: Etiquetas de las métricas (opcional)
+        """
+        self.store = store or build_bucket_store()
+        self.fallback_store = LocalBucketStore()
+        self.limits = limits or getattr(settings, 'DRIVE_RATE_LIMITS', DEFAULT_RATE_LIMITS)
+        self.max_wait = max_wait if max_wait is not None else getattr(settings, 'DRIVE_RATE_LIMIT_MAX_WAIT', 30)
+        self.namespace = namespace
+        self.labels = labels or {}
+
+    def burst(self, kind: str) -> int:
+        """
+        Retorna la capacidad del bucket de un tipo de request.
+
+        Args:
+            kind: RATE_LIMIT_READ o RATE_LIMIT_WRITE
+
+        Returns:
+            int: Máximo de requests que pueden salir de golpe
+        """
+        return int(self.limits[kind]['burst'])
+
+    def acquire(self, kind: str, tokens: int = 1) -> float:
+        """
+        Reserva tokens y espera hasta poder usarlos.
+
+        Args:
+            kind: RATE_LIMIT_READ o RATE_LIMIT_WRITE
+            tokens: Cantidad de requests a ejecutar
+
+        Returns:
+            float: Segundos esperados
+
+        Raises:
+            DriveRateLimitExceeded: Si la espera supera DRIVE_RATE_LIMIT_MAX_WAIT
+            (o la de no_wait_beyond)
+        """
+        limit = self.limits[kind]
+        name = f'{self.namespace}:{kind}'
+        max_wait = self.max_wait
+        override = _max_wait_override.get()
+        if override is not None:
+            max_wait = min(max_wait, override)
+
+        try:
+            wait = self.store.reserve(name, limit['rate'], limit['burst'], tokens, max_wait, time.time())
+        except Exception as e:
+            logger.warning(f"Backend del limitador de Drive no disponible, usando límite local: {e}")
+            metrics.increment('drive.rate_limit.store_errors')
+            wait = self.fallback_store.reserve(name, limit['rate'], limit['burst'], tokens, max_wait, time.time())
+
+        if wait > max_wait:
+            metrics.increment('drive.rate_limit.rejected', labels={**self.labels, 'kind': kind})
+            raise DriveRateLimitExceeded(f"Cuota de Drive ({kind}) agotada: habría que esperar {wait:.1f}s")
+
+        if wait > 0:
+            metrics.observe('drive.rate_limit.wait', wait, {**self.labels, 'kind': kind})
+            time.sleep(wait)
+
+        return wait
+
+    def penalize(self, kind: str, exception: Exception) -> bool:
+        """
+        Vacía el bucket si la excepción indica que Drive nos está limitando.
+
+        Args:
+            kind: RATE_LIMIT_READ o RATE_LIMIT_WRITE
+            exception: Excepción del request
+
+        Returns:
+            bool: True si la excepción era de cuota
+        """
+        retry_after = get_retry_after(exception)
+        if retry_after is None:
+            return False
+
+        limit = self.limits[kind]
+        name = f'{self.namespace}:{kind}'
+        logger.warning(f"Drive limitó un request ({kind}), pausando {retry_after:.0f}s")
+        metrics.increment('drive.rate_limit.throttled', labels={**self.labels, 'kind': kind})
+
+        try:
+            self.store.drain(name, limit['rate'], retry_after, time.time())
+        except Exception as e:
+            logger.warning(f"Backend del limitador de Drive no disponible, usando límite local: {e}")
+            self.fallback_store.drain(name, limit['rate'], retry_after, time.time())
+
+        return True
+
+
+def get_retry_after(exception: Exception) -> Optional[float]:
+    """
+    Indica si una excepción es un límite de cuota de Drive y cuánto esperar.
+
+    Args:
+        exception: Excepción de un request a Drive
+
+    Returns:
+        float: Segundos de pausa, o None si no es un error de cuota
+    """
+    if not isinstance(exception, HttpError):
+        return None
+
+    status = exception.resp.status
+    content = (exception.content or b'').decode('utf-8', errors='ignore').lower()
+    if status != 429 and not (status == 403 and 'ratelimitexceeded' in content):
+        return None
+
+    try:
+        return float(exception.resp.get('retry-after'))
+    except (TypeError, ValueError):
+        return float(getattr(settings, 'DRIVE_RATE_LIMIT_PENALTY_SECONDS', 5))
+
+
+@contextmanager
+def no_wait_beyond(seconds: float):
+    """
+    Limita la espera de los limitadores de Drive dentro del bloque: si no
+    hay cuota en ese tiempo, acquire lanza DriveRateLimitExceeded en lugar
+    de dormir. Para el camino de un request, que puede guardar en el spool.
+
+    Args:
+        seconds: Espera máxima en segundos (0: no esperar)
+    """
+    token = _max_wait_override.set(seconds)
+    try:
+        yield
+    finally:
+        _max_wait_override.reset(token)
+
+
+def build_bucket_store(backend: str = None):
+    """
+    Construye el backend de buckets configurado.
+    'redis' (por defecto si hay REDIS_URL), 'database' (por defecto sin
+    Redis) o 'local'. Los dos primeros comparten la cuota entre todos los
+    procesos; 'local' da a cada proceso la cuota entera, solo sirve con uno.
+
+    Args:
+        backend: Backend a usar (por defecto DRIVE_RATE_LIMIT_BACKEND)
+    """
+    redis_url = getattr(settings, 'REDIS_URL', '')
+    backend = backend or getattr(settings, 'DRIVE_RATE_LIMIT_BACKEND', '') or ('redis' if redis_url else 'database')
+
+    if backend == 'redis':
+        return RedisBucketStore(redis_url)
+    if backend == 'database':
+        return DatabaseBucketStore()
+    return LocalBucketStore()
+
+
+_rate_limiters: Dict[str, DriveRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(account: str = DEFAULT_ACCOUNT) -> DriveRateLimiter:
+    """
+    Retorna el limitador de Drive de una Service Account, compartido por
+    todo el proceso. Cada cuenta tiene su propia cuota en Drive.
+
+    Args:
+        account: Nombre de la cuenta en el pool
+
+    Returns:
+        DriveRateLimiter: Instancia única del limitador de la cuenta
+    """
+    rate_limiter = _rate_limiters.get(account)
+    if rate_limiter is None:
+        with _rate_limiters_lock:
+            rate_limiter = _rate_limiters.get(account)
+            if rate_limiter is None:
+                rate_limiter = DriveRateLimiter(namespace=f'drive:rate:{account}', labels={'account': account})
+                _rate_limiters[account] = rate_limiter
+    return rate_limiter
@@ -1,15 +1,25 @@
 import os
 from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Iterator, Optional, Tuple
 from django.conf import settings
+from django.db.models import Count
 from apps.users.models import User
 from apps.companies.models import Company
+from apps.agentmessages.selectors import MessageSelector
 from apps.users.services import UserService
-from utils.drive.service_account_client import GoogleDriveServiceAccountClient
+from utils.drive.folder_cache import TTLCache
+from utils.drive.layouts import get_folder_layout, strip_overflow
+from utils.drive.rate_limiter import no_wait_beyond
+from utils.drive.spool import DriveSpool, get_spool_host, is_drive_unavailable
+from utils.storage.factory import get_storage_backend
+from utils.metrics.registry import metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Carpetas que ya superaron DRIVE_HOURLY_SPLIT_THRESHOLD: no se vuelven a contar
+_overflowed_folders = TTLCache(max_size=10000, ttl=3600)
+
 
 class DriveService:
     """
@@ -18,13 +28,21 @@ class DriveService:
     """
     
     def __init__(self):
-        self.drive_client = GoogleDriveServiceAccountClient()
         self.user_service = UserService()
     
+    @property
+    def drive_client(self):
+        """
+        Cliente de Drive de la cuenta por defecto (se construye solo si se usa).
+        """
+        from utils.drive.service_account_client import get_drive_client
+        
+        return get_drive_client()
+    
     def upload_file_from_message(self, file_content: bytes, filename: str, sender_number: str, 
                                 file_type: str, mime_type: str = None, company_phone: str = None) -> Dict[str, Any]:
         """
-        Sube un archivo a Google Drive organizándolo por estructura de carpetas.
+        Sube un archivo al almacenamiento de la compañía (Drive o local) organizándolo por estructura de carpetas.
         
         Args:
             file_content: Contenido del archivo en bytes
@@ -37,6 +55,31 @@ class DriveService:
         Returns:
             Dict con información del archivo subido
         """
+        return self._upload_from_message(file_content, filename, sender_number, mime_type, company_phone, spool=False)
+    
+    def upload_or_spool(self, file_content: bytes, filename: str, sender_number: str,
+                        file_type: str, mime_type: str = None, company_phone: str = None) -> Dict[str, Any]:
+        """
+        Sube un archivo como upload_file_from_message, pero si Drive está caído
+        o lento lo guarda en el spool local para subirlo después con drain_drive_spool.
+        
+        Args:
+            file_content: Contenido del archivo en bytes
+            filename: Nombre del archivo
+            sender_number: Número del remitente
+            file_type: Tipo de archivo (image, video, document, etc.)
+            mime_type: Tipo MIME del archivo
+            company_phone: Número de teléfono de la compañía para identificación
+            
+        Returns:
+            Dict con información del archivo subido, o con drive_status='pending'
+            y spool_key si quedó en el spool
+        """
+        spool = getattr(settings, 'DRIVE_SPOOL_ENABLED', True)
+        return self._upload_from_message(file_content, filename, sender_number, mime_type, company_phone, spool=spool)
+    
+    def _upload_from_message(self, file_content: bytes, filename: str, sender_number: str,
+                             mime_type: Optional[str], company_phone: Optional[str], spool: bool) -> Dict[str, Any]:
         try:
             # Obtener información del usuario y compañía usando UserService
             user, company = self.user_service.get_user_and_company_by_phone(sender_number, company_phone)
@@ -44,38 +87,28 @@ class DriveService:
             if not user and not company:
                 raise ValueError(f"No se encontró usuario o compañía para el número: {sender_number}")
             
-            # Crear estructura de carpetas
-            now = datetime.now()
-            folder_id = self.drive_client.create_folder_structure(
-                company_name=company.name,
-                sender_number=sender_number,
-                year=str(now.year),
-                month=f"{now.month:02d}",
-                day=f"{now.day:02d}"
-            )
-            
             # Generar nombre único para el archivo
+            now = datetime.now()
             unique_filename = self._generate_unique_filename(filename, now)
             
-            # Subir archivo
-            upload_result = self.drive_client.upload_file(
-                file_content=file_content,
-                filename=unique_filename,
-                folder_id=folder_id,
-                mime_type=mime_type
-            )
-            
-            # Generar ruta de la carpeta para almacenar en BD
-            folder_path = f"/{company.name}/{sender_number}/{now.year}/{now.month:02d}/{now.day:02d}"
-            
-            logger.info(f"Archivo subido exitosamente: {unique_filename} para {company.name}")
+            try:
+                if spool:
+                    # Sin cuota no se duerme dentro del webhook: el archivo va al spool
+                    with no_wait_beyond(getattr(settings, 'DRIVE_RATE_LIMIT_WEBHOOK_MAX_WAIT', 0)):
+                        result = self._store_file(company, file_content, unique_filename, sender_number, mime_type, now)
+                else:
+                    result = self._store_file(company, file_content, unique_filename, sender_number, mime_type, now)
+            except Exception as e:
+                if not spool or not is_drive_unavailable(e):
+                    raise
+                logger.warning(f"Drive no disponible ({e}), guardando {unique_filename} en el spool")
+                result = self._spool_file(company, file_content, unique_filename, sender_number, mime_type, now)
+            else:
+                logger.info(f"Archivo subido exitosamente: {unique_filename} para {company.name}")
             
             return {
-                'drive_file_id': upload_result['file_id'],
-                'drive_shared_link': upload_result['web_view_link'],
-                'drive_folder_path': folder_path,
+                **result,
                 'filename': unique_filename,
-                'file_size': upload_result['size'],
                 'company_name': company.name,
                 'user_id': user.id if user else None
             }
@@ -84,6 +117,132 @@ class DriveService:
             logger.error(f"Error subiendo archivo desde mensaje: {e}")
             raise
     
+    def _spool_file(self, company: Company, file_content: bytes, unique_filename: str, sender_number: str,
+                    mime_type: Optional[str], when: datetime) -> Dict[str, Any]:
+        """
+        Guarda un archivo en el spool local con lo necesario para subirlo después.
+        
+        Returns:
+            Dict con drive_status='pending', spool_key, spool_host,
+            drive_folder_path (la carpeta prevista) y file_size
+        """
+        spool_key = DriveSpool().put(file_content, {
+            'company_id': company.id,
+            'sender_number': sender_number,
+            'filename': unique_filename,
+            'mime_type': mime_type,
+            'received_at': when.isoformat()
+        })
+        metrics.increment('drive.spool.spooled')
+        
+        return {
+            'drive_status': 'pending',
+            'spool_key': spool_key,
+            'spool_host': get_spool_host(),
+            'drive_folder_path': get_folder_layout().folder_path(company.name, sender_number, when),
+            'file_size': str(len(file_content))
+        }
+    
+    def upload_spooled_file(self, company: Company, spool_key: str) -> Dict[str, Any]:
+        """
+        Sube a Drive un archivo del spool. El archivo se deja en el spool:
+        quien llama lo borra cuando el mensaje quedó actualizado.
+        
+        Args:
+            company: Compañía del archivo
+            spool_key: Clave del archivo en el spool
+            
+        Returns:
+            Dict con drive_file_id, drive_shared_link, drive_folder_path,
+            drive_folder_id y file_size
+            
+        Raises:
+            FileNotFoundError: Si el archivo ya no está en el spool
+        """
+        file_content, metadata = DriveSpool().get(spool_key)
+        
+        # Se ubica según la fecha de recepción, no la de la subida
+        received_at = datetime.fromisoformat(metadata['received_at'])
+        return self._store_file(company, file_content, metadata['filename'], metadata['sender_number'],
+                                metadata.get('mime_type'), received_at)
+    
+    def _store_file(self, company: Company, file_content: bytes, unique_filename: str, sender_number: str,
+                    mime_type: Optional[str], when: datetime) -> Dict[str, Any]:
+        """
+        Guarda un archivo en la carpeta que le corresponde según DRIVE_FOLDER_LAYOUT.
+        
+        Args:
+            company: Compañía
+            file_content: Contenido del archivo en bytes
+            unique_filename: Nombre final del archivo
+            sender_number: Número del remitente
+            mime_type: Tipo MIME del archivo
+            when: Fecha de recepción (define la carpeta)
+            
+        Returns:
+            Dict con drive_file_id, drive_shared_link, drive_folder_path,
+            drive_folder_id, drive_folder_link y file_size
+        """
+        # Drive (con la Service Account asignada) o almacenamiento local según la compañía
+        storage = get_storage_backend(company)
+        root_id = storage.get_company_root(company)
+        
+        # Crear estructura de carpetas según DRIVE_FOLDER_LAYOUT (resuelta desde caché cuando ya se conoce)
+        layout = get_folder_layout()
+        segments = layout.segments(sender_number, when)
+        folder_path = layout.folder_path(company.name, sender_number, when)
+        
+        # Carpeta con demasiados archivos: los nuevos van a una subcarpeta por hora
+        if self._is_overflowed(company.id, folder_path):
+            overflow_segment = layout.overflow_segment(when)
+            segments = (*segments, overflow_segment)
+            folder_path = f"{folder_path}/{overflow_segment}"
+        
+        folder_id = storage.ensure_folder_path(root_id, segments, company.id)
+        
+        # Subir archivo
+        upload_result = storage.upload_file(
+            file_content=file_content,
+            filename=unique_filename,
+            folder_id=folder_id,
+            mime_type=mime_type
+        )
+        
+        return {
+            'drive_file_id': upload_result['file_id'],
+            'drive_shared_link': upload_result['web_view_link'],
+            'drive_folder_path': folder_path,
+            'drive_folder_id': folder_id,
+            'drive_folder_link': storage.get_folder_link(folder_id),
+            'file_size': upload_result['size']
+        }
+    
+    def _is_overflowed(self, company_id: int, folder_path: str) -> bool:
+        """
+        Indica si una carpeta ya alcanzó DRIVE_HOURLY_SPLIT_THRESHOLD archivos.
+        
+        Args:
+            company_id: ID de la compañía
+            folder_path: Ruta de la carpeta del día (o del mes)
+            
+        Returns:
+            bool: True si las subidas nuevas deben ir a subcarpetas por hora
+        """
+        threshold = getattr(settings, 'DRIVE_HOURLY_SPLIT_THRESHOLD', 0)
+        if not threshold:
+            return False
+        
+        key = (company_id, folder_path)
+        if _overflowed_folders.get(key):
+            return True
+        
+        if MessageSelector.count_messages_in_folder(company_id, folder_path) < threshold:
+            return False
+        
+        logger.info(f"Carpeta {folder_path} superó {threshold} archivos, dividiendo por hora")
+        _overflowed_folders.set(key, True)
+        return True
+    
     def _get_user_and_company(self, sender_number: str) -> Tuple[Optional[User], Optional[Company]]:
         """
         Obtiene el usuario y compañía basado en el número del remitente.
@@ -144,24 +303,59 @@ class DriveService:
             # Fallback: usar timestamp como nombre
             return f"file_{timestamp.strftime('%Y%m%d_%H%M%S')}"
     
-    def get_folder_contents(self, folder_path: str) -> list:
+    def get_folder_contents(self, company: Company, folder_id: str = None, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
         """
-        Obtiene el contenido de una carpeta.
+        Recorre el contenido de una carpeta de la compañía página por página,
+        sin cargar carpetas enormes enteras en memoria.
         
         Args:
-            folder_path: Ruta de la carpeta
+            company: Compañía
+            folder_id: ID de la carpeta (por defecto la raíz de la compañía)
+            page_size: Elementos por request al almacenamiento
             
-        Returns:
-            list: Lista de archivos en la carpeta
+        Yields:
+            Dict con id, name, mimeType y, según el backend, size y modifiedTime
         """
-        try:
-            # TODO: Implementar búsqueda de carpeta por ruta
-            # Por ahora retornamos lista vacía
-            return []
+        storage = get_storage_backend(company)
+        parent_id = folder_id or storage.get_company_root(company)
+        
+        page_token = None
+        while True:
+            items, page_token = storage.list_children_page(parent_id, page_token, page_size)
+            yield from items
+            if not page_token:
+                return
+    
+    def get_folder_page(self, company: Company, folder_id: str = None, page_token: str = None,
+                        page_size: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene una página del contenido de una carpeta de la compañía para navegar su árbol.
+        
+        Args:
+            company: Compañía
+            folder_id: ID de la carpeta (por defecto la raíz de la compañía)
+            page_token: Token de la página (None para la primera)
+            page_size: Elementos por página
             
-        except Exception as e:
-            logger.error(f"Error obteniendo contenido de carpeta {folder_path}: {e}")
-            return []
+        Returns:
+            Dict con folder_id, items y next_page_token, o None si la carpeta
+            no pertenece a la compañía
+            
+        Raises:
+            ValueError: Si la compañía no tiene carpeta o el token no es válido
+        """
+        storage = get_storage_backend(company)
+        folder_id = folder_id or storage.get_company_root(company)
+        
+        if not storage.owns_folder(company, folder_id):
+            return None
+        
+        items, next_page_token = storage.list_children_page(folder_id, page_token, page_size)
+        return {
+            'folder_id': folder_id,
+            'items': items,
+            'next_page_token': next_page_token
+        }
     
     def create_summary_report(self, company_name: str, date_from: datetime, date_to: datetime) -> Dict[str, Any]:
         """
@@ -176,15 +370,39 @@ class DriveService:
             Dict con resumen de archivos
         """
         try:
-            # TODO: Implementar lógica de reportes
-            # Por ahora retornamos estructura básica
+            company = Company.objects.filter(name=company_name).first()
+            if not company:
+                raise ValueError(f"No existe la compañía: {company_name}")
+            
+            messages = MessageSelector.get_messages_by_date_range(date_from, date_to, company.id).exclude(drive_file_id='').order_by()
+            
+            files_by_type = {
+                row['file_type'] or 'unknown': row['total']
+                for row in messages.values('file_type').annotate(total=Count('id'))
+            }
+            files_by_sender = {
+                row['sender_number']: row['total']
+                for row in messages.values('sender_number').annotate(total=Count('id'))
+            }
+            
+            # Las subcarpetas por hora se suman a su carpeta del día
+            files_by_folder: Dict[str, int] = {}
+            split_folders = set()
+            for row in messages.values('drive_folder_path').annotate(total=Count('id')):
+                folder_path = strip_overflow(row['drive_folder_path'])
+                files_by_folder[folder_path] = files_by_folder.get(folder_path, 0) + row['total']
+                if folder_path != row['drive_folder_path']:
+                    split_folders.add(folder_path)
+            
             return {
                 'company_name': company_name,
                 'date_from': date_from.isoformat(),
                 'date_to': date_to.isoformat(),
-                'total_files': 0,
-                'files_by_type': {},
-                'files_by_sender': {}
+                'total_files': sum(files_by_type.values()),
+                'files_by_type': files_by_type,
+                'files_by_sender': files_by_sender,
+                'files_by_folder': files_by_folder,
+                'split_folders': sorted(split_folders)
             }
             
         except Exception as e:
@@ -1,13 +1,41 @@
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Iterator
+from google.auth.credentials import AnonymousCredentials
 from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.discovery import build_from_document
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest, HttpRequest, MediaIoBaseUpload
+from django.conf import settings
+from utils.drive.accounts import DEFAULT_ACCOUNT, get_company_account, get_service_accounts
+from utils.drive.concurrency import AdaptiveConcurrencyLimiter
+from utils.drive.folder_cache import get_folder_cache, get_listing_cache, get_metadata_cache
+from utils.drive.token_cache import share_token
+from utils.drive.rate_limiter import RATE_LIMIT_READ, RATE_LIMIT_WRITE, get_rate_limiter, get_retry_after
+from utils.drive.spool import is_drive_failure
+from utils.drive.transport import ThreadLocalHttpPool
+from utils.resilience.circuit_breaker import get_circuit_breaker
+from utils.drive.uploads import (
+    UPLOAD_MODE_MULTIPART, choose_chunk_size, choose_upload_mode, throughput_estimator
+)
+from utils.metrics.registry import metrics
+from apps.drive.services import DriveFolderService, DriveUploadSessionService
+import hashlib
 import io
+import json
+import threading
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Documento de discovery de Drive v3 versionado con el código: construir el
+# servicio no descarga nada y el JSON se parsea una sola vez por proceso
+DISCOVERY_DOCUMENT_PATH = os.path.join(os.path.dirname(__file__), 'discovery', 'drive.v3.json')
+
+# Campos de metadata de un archivo: los mismos al subirlo y al consultarlo, así la
+# respuesta de la subida sirve para llenar la caché de metadata
+FILE_INFO_FIELDS = 'id,name,size,mimeType,createdTime,modifiedTime,webViewLink,webContentLink'
+
 
 class GoogleDriveServiceAccountClient:
     """
@@ -20,25 +48,29 @@ class GoogleDriveServiceAccountClient:
         'https://www.googleapis.com/auth/drive'
     ]
     
-    def __init__(self, service_account_file: str = None):
+    def __init__(self, service_account_file: str = None, account: str = DEFAULT_ACCOUNT):
         """
         Inicializa el cliente con Service Account.
         
         Args:
             service_account_file: Ruta al archivo JSON del Service Account
+            account: Nombre de la cuenta en el pool (etiqueta cuota y métricas)
         """
         self.service = None
         self.credentials = None
+        self.account = account
+        self.folder_cache = get_folder_cache()
+        self.listing_cache = get_listing_cache()
+        self.metadata_cache = get_metadata_cache()
+        self.folder_index = DriveFolderService()
+        self.upload_sessions = DriveUploadSessionService()
+        # Cada cuenta tiene su propia cuota y su propio control de concurrencia
+        self.rate_limiter = get_rate_limiter(account)
+        self.upload_concurrency = AdaptiveConcurrencyLimiter(labels={'account': account})
+        # Con Drive caído o lento se deja de esperar timeouts: los requests fallan al instante
+        self.circuit_breaker = get_circuit_breaker(f'drive:{account}', is_drive_failure)
         
-        # Ruta por defecto al archivo de Service Account
-        if not service_account_file:
-            service_account_file = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-                'credentials',
-                'service_account.json'
-            )
-        
-        self.service_account_file = service_account_file
+        self.service_account_file = service_account_file or get_service_accounts()[account]
         self._authenticate()
     
     def _authenticate(self):
@@ -46,24 +78,45 @@ class GoogleDriveServiceAccountClient:
         Autentica con Google Drive API usando Service Account.
         """
         try:
-            if not os.path.exists(self.service_account_file):
+            api_root_url = getattr(settings, 'GOOGLE_DRIVE_API_ROOT_URL', '')
+            
+            if api_root_url and not os.path.exists(self.service_account_file):
+                # Servidor de Drive falso local: no requiere credenciales reales
+                self.credentials = AnonymousCredentials()
+            elif not os.path.exists(self.service_account_file):
                 raise FileNotFoundError(f"Archivo de Service Account no encontrado: {self.service_account_file}")
+            else:
+                # Cargar credenciales del Service Account; el access token se
+                # comparte entre procesos y lo renueva uno solo antes de vencer
+                credentials = service_account.Credentials.from_service_account_file(
+                    self.service_account_file,
+                    scopes=self.SCOPES
+                )
+                self.credentials = share_token(credentials, credentials.service_account_email, self.SCOPES)
             
-            # Cargar credenciales del Service Account
-            self.credentials = service_account.Credentials.from_service_account_file(
-                self.service_account_file,
-                scopes=self.SCOPES
-            )
+            # Construir el servicio una sola vez; cada hilo ejecuta sus requests
+            # sobre su propio transporte keep-alive del pool
+            self.http_pool = ThreadLocalHttpPool(self.credentials, root_url=api_root_url)
+            with open(DISCOVERY_DOCUMENT_PATH) as discovery_file:
+                discovery_document = json.load(discovery_file)
             
-            # Construir el servicio
-            self.service = build('drive', 'v3', credentials=self.credentials)
+            root_url = api_root_url or discovery_document['rootUrl']
+            self.batch_uri = f"{root_url}{discovery_document['batchPath']}"
+            
+            self.service = build_from_document(
+                discovery_document,
+                http=self.http_pool.get(),
+                requestBuilder=self.http_pool.build_request,
+                client_options={'api_endpoint': f"{root_url}{discovery_document['servicePath']}"}
+            )
             logger.info("Autenticación con Google Drive usando Service Account exitosa")
             
         except Exception as e:
             logger.error(f"Error autenticando con Service Account: {e}")
             raise
     
-    def create_folder_structure_in_company_folder(self, company_folder_id: str, sender_number: str, year: str, month: str, day: str) -> str:
+    def create_folder_structure_in_company_folder(self, company_folder_id: str, sender_number: str, year: str, month: str, day: str,
+                                                  company_id: int = None) -> str:
         """
         Crea la estructura de carpetas dentro de la carpeta de la compañía.
         
@@ -73,103 +126,240 @@ class GoogleDriveServiceAccountClient:
             year: Año
             month: Mes
             day: Día
+            company_id: ID de la compañía para el índice de carpetas (opcional)
             
         Returns:
             str: ID de la carpeta del día
         """
+        # Estructura: /{company_folder}/{sender}/{year}/{month}/{day}
+        return self.ensure_folder_path(company_folder_id, (sender_number, year, month, day), company_id)
+    
+    def ensure_folder_path(self, root_id: str, segments: Tuple[str, ...], company_id: int = None) -> str:
+        """
+        Obtiene o crea una ruta de carpetas bajo una carpeta raíz.
+        
+        Args:
+            root_id: ID de la carpeta raíz (carpeta de la compañía)
+            segments: Nombres de las carpetas desde la raíz
+            company_id: ID de la compañía para el índice de carpetas (opcional)
+            
+        Returns:
+            str: ID de la carpeta final
+        """
         try:
-            # Estructura: /{company_folder}/{sender}/{year}/{month}/{day}
-            folder_names = [
-                sender_number,
-                year,
-                month,
-                day
-            ]
-            
-            current_parent_id = company_folder_id
+            # Camino rápido: la ruta completa ya fue resuelta antes
+            folder_id = self.folder_cache.get_path(root_id, tuple(segments))
+            if folder_id:
+                return folder_id
+            
+            current_parent_id = root_id
             current_path = ""
             
-            for folder_name in folder_names:
+            for folder_name in segments:
                 current_path = f"{current_path}/{folder_name}" if current_path else folder_name
                 
-                # Buscar si la carpeta ya existe
-                folder_id = self._find_folder_by_name(folder_name, current_parent_id)
+                folder_id = self.folder_cache.get_folder(current_parent_id, folder_name)
                 
                 if not folder_id:
-                    # Crear la carpeta si no existe
-                    folder_id = self._create_folder(folder_name, current_parent_id)
-                    logger.info(f"Carpeta creada: {current_path} (ID: {folder_id})")
-                else:
-                    logger.info(f"Carpeta encontrada: {current_path} (ID: {folder_id})")
+                    folder_id, created = self._get_or_create_folder(folder_name, current_parent_id, company_id)
+                    
+                    if created:
+                        logger.info(f"Carpeta creada: {current_path} (ID: {folder_id})")
+                    else:
+                        logger.info(f"Carpeta encontrada: {current_path} (ID: {folder_id})")
+                    
+                    self.folder_cache.set_folder(current_parent_id, folder_name, folder_id)
                 
                 current_parent_id = folder_id
             
+            self.folder_cache.set_path(root_id, tuple(segments), folder_id)
             return folder_id
             
         except Exception as e:
             logger.error(f"Error creando estructura de carpetas en carpeta de compañía: {e}")
             raise
     
-    def _find_folder_by_name(self, folder_name: str, parent_id: Optional[str] = None) -> Optional[str]:
+    def _get_or_create_folder(self, folder_name: str, parent_id: str, company_id: int = None) -> Tuple[str, bool]:
+        """
+        Obtiene una carpeta o la crea con una sola creación por ruta en el cluster.
+        
+        Si varios workers no encuentran la carpeta al mismo tiempo, solo el que
+        obtiene el lock la crea; el resto espera y la lee del índice.
+        
+        Args:
+            folder_name: Nombre de la carpeta
+            parent_id: ID de la carpeta padre
+            company_id: ID de la compañía para el índice (opcional)
+            
+        Returns:
+            Tuple[str, bool]: (ID de la carpeta, True si fue creada)
+        """
+        folder_id = self._find_folder_by_name(folder_name, parent_id, company_id)
+        if folder_id:
+            return folder_id, False
+        
+        with self.folder_index.creation_lock(parent_id, folder_name):
+            # Revisar de nuevo: otro worker pudo crearla mientras esperábamos
+            folder_id = self._find_folder_by_name(folder_name, parent_id, company_id)
+            if folder_id:
+                return folder_id, False
+            
+            return self._create_folder(folder_name, parent_id, company_id), True
+    
+    def _find_folder_by_name(self, folder_name: str, parent_id: Optional[str] = None, company_id: int = None) -> Optional[str]:
         """
         Busca una carpeta por nombre y padre.
+        Consulta primero el índice persistente y solo va a Drive si no está.
         
         Args:
             folder_name: Nombre de la carpeta
             parent_id: ID de la carpeta padre
+            company_id: ID de la compañía para el índice (opcional)
             
         Returns:
             str: ID de la carpeta si existe, None si no
+            
+        Raises:
+            Exception: Si Drive no responde; no se asume que la carpeta no
+            existe, eso crearía duplicados
         """
         try:
-            query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            
             if parent_id:
-                query += f" and '{parent_id}' in parents"
-            
-            results = self.service.files().list(
-                q=query,
-                fields="files(id, name)"
-            ).execute()
+                folder_id = self.folder_index.get_folder_id(parent_id, folder_name)
+                if folder_id:
+                    return folder_id
             
-            folders = results.get('files', [])
-            return folders[0]['id'] if folders else None
+            results = self._execute(self._find_folder_request(folder_name, parent_id), RATE_LIMIT_READ)
+            return self._register_found_folder(results, folder_name, parent_id, company_id)
             
         except Exception as e:
             logger.error(f"Error buscando carpeta '{folder_name}': {e}")
-            return None
+            raise
     
-    def _create_folder(self, folder_name: str, parent_id: Optional[str] = None) -> str:
+    def _create_folder(self, folder_name: str, parent_id: Optional[str] = None, company_id: int = None) -> str:
         """
-        Crea una carpeta en Google Drive.
+        Crea una carpeta en Google Drive y la registra en el índice.
         
         Args:
             folder_name: Nombre de la carpeta
             parent_id: ID de la carpeta padre
+            company_id: ID de la compañía para el índice (opcional)
             
         Returns:
             str: ID de la carpeta creada
         """
         try:
-            folder_metadata = {
-                'name': folder_name,
-                'mimeType': 'application/vnd.google-apps.folder'
-            }
-            
-            if parent_id:
-                folder_metadata['parents'] = [parent_id]
-            
-            folder = self.service.files().create(
-                body=folder_metadata,
-                fields='id'
-            ).execute()
-            
-            return folder.get('id')
+            folder = self._execute(self._create_folder_request(folder_name, parent_id), RATE_LIMIT_WRITE)
+            return self._register_created_folder(folder.get('id'), folder_name, parent_id, company_id)
             
         except Exception as e:
             logger.error(f"Error creando carpeta '{folder_name}': {e}")
             raise
     
+    def _find_folder_request(self, folder_name: str, parent_id: Optional[str] = None) -> HttpRequest:
+        """
+        Construye el request de búsqueda de una carpeta por nombre y padre.
+        
+        Args:
+            folder_name: Nombre de la carpeta
+            parent_id: ID de la carpeta padre
+            
+        Returns:
+            HttpRequest: Request sin ejecutar
+        """
+        escaped_name = folder_name.replace("\\", "\\\\").replace("'", "\\'")
+        query = f"name='{escaped_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        
+        if parent_id:
+            query += f" and '{parent_id}' in parents"
+        
+        # Si ya existen duplicados, elegir siempre la carpeta más antigua
+        return self.service.files().list(
+            q=query,
+            orderBy='createdTime',
+            fields="files(id, name)"
+        )
+    
+    def _register_found_folder(self, results: Dict[str, Any], folder_name: str, parent_id: Optional[str],
+                               company_id: int = None) -> Optional[str]:
+        """
+        Extrae el ID de una búsqueda de carpeta y lo registra en el índice.
+        
+        Args:
+            results: Respuesta de files().list
+            folder_name: Nombre de la carpeta
+            parent_id: ID de la carpeta padre
+            company_id: ID de la compañía para el índice (opcional)
+            
+        Returns:
+            str: ID de la carpeta si existe, None si no
+        """
+        folders = results.get('files', [])
+        if not folders:
+            return None
+        
+        folder_id = folders[0]['id']
+        if parent_id:
+            self.folder_index.register_folder(parent_id, folder_name, folder_id, company_id)
+        
+        return folder_id
+    
+    def _create_folder_request(self, folder_name: str, parent_id: Optional[str] = None) -> HttpRequest:
+        """
+        Construye el request de creación de una carpeta.
+        
+        Args:
+            folder_name: Nombre de la carpeta
+            parent_id: ID de la carpeta padre
+            
+        Returns:
+            HttpRequest: Request sin ejecutar
+        """
+        folder_metadata = {
+            'name': folder_name,
+            'mimeType': 'application/vnd.google-apps.folder'
+        }
+        
+        if parent_id:
+            folder_metadata['parents'] = [parent_id]
+        
+        return self.service.files().create(
+            body=folder_metadata,
+            fields='id'
+        )
+    
+    def _register_created_folder(self, folder_id: str, folder_name: str, parent_id: Optional[str],
+                                 company_id: int = None) -> str:
+        """
+        Registra una carpeta recién creada en el índice.
+        Si otro worker registró antes la misma ruta, descarta la propia.
+        
+        Args:
+            folder_id: ID de la carpeta creada
+            folder_name: Nombre de la carpeta
+            parent_id: ID de la carpeta padre
+            company_id: ID de la compañía para el índice (opcional)
+            
+        Returns:
+            str: ID de la carpeta que queda vigente
+        """
+        if not parent_id:
+            return folder_id
+        
+        self.listing_cache.delete(parent_id)
+        indexed = self.folder_index.register_folder(parent_id, folder_name, folder_id, company_id)
+        
+        if indexed and indexed.folder_id != folder_id:
+            # Otro worker ganó la carrera: descartar la carpeta duplicada
+            logger.warning(f"Carpeta duplicada '{folder_name}' descartada, se usa {indexed.folder_id}")
+            try:
+                self.trash_file(folder_id)
+            except Exception:
+                pass
+            return indexed.folder_id
+        
+        return folder_id
+    
     def upload_file(self, file_content: bytes, filename: str, folder_id: str, mime_type: str = None) -> Dict[str, Any]:
         """
         Sube un archivo a Google Drive.
@@ -190,21 +380,50 @@ class GoogleDriveServiceAccountClient:
                 'parents': [folder_id]
             }
             
-            # Crear objeto de media
-            media = MediaIoBaseUpload(
-                io.BytesIO(file_content),
-                mimetype=mime_type,
-                resumable=True
-            )
+            size = len(file_content)
+            mode = choose_upload_mode(size)
             
-            # Subir archivo
-            file = self.service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id,name,size,webViewLink,webContentLink'
-            ).execute()
+            # El límite de subidas simultáneas se ajusta solo (AIMD) según la salud de Drive
+            with self.upload_concurrency.slot(size):
+                started = time.monotonic()
+                
+                if mode == UPLOAD_MODE_MULTIPART:
+                    # Archivo pequeño: metadata y contenido en un solo request
+                    media = MediaIoBaseUpload(
+                        io.BytesIO(file_content),
+                        mimetype=mime_type,
+                        resumable=False
+                    )
+                    file = self._execute(self.service.files().create(
+                        body=file_metadata,
+                        media_body=media,
+                        fields=FILE_INFO_FIELDS
+                    ), RATE_LIMIT_WRITE, size)
+                else:
+                    media = MediaIoBaseUpload(
+                        io.BytesIO(file_content),
+                        mimetype=mime_type,
+                        chunksize=choose_chunk_size(size),
+                        resumable=True
+                    )
+                    request = self.service.files().create(
+                        body=file_metadata,
+                        media_body=media,
+                        fields=FILE_INFO_FIELDS
+                    )
+                    upload_key = hashlib.sha256(folder_id.encode() + b':' + hashlib.sha256(file_content).digest()).hexdigest()
+                    file = self._execute_resumable_upload(request, upload_key, folder_id, filename)
+            
+            elapsed = time.monotonic() - started
+            self.listing_cache.delete(folder_id)
+            # La respuesta de la subida ya trae la metadata: se guarda para no volver a pedirla
+            self.metadata_cache.set(file.get('id'), self._format_file_info(file))
+            labels = {'mode': mode, 'account': self.account}
+            metrics.observe('drive.upload.latency', elapsed, labels)
+            metrics.increment('drive.upload.count', labels=labels)
+            metrics.increment('drive.upload.bytes', size, labels)
             
-            logger.info(f"Archivo subido exitosamente: {filename} (ID: {file.get('id')})")
+            logger.info(f"Archivo subido exitosamente ({mode}, {size} bytes, {elapsed:.2f}s): {filename} (ID: {file.get('id')})")
             
             return {
                 'file_id': file.get('id'),
@@ -219,9 +438,135 @@ class GoogleDriveServiceAccountClient:
             logger.error(f"Error subiendo archivo '{filename}': {e}")
             raise
     
+    def _execute_resumable_upload(self, request: HttpRequest, upload_key: str, folder_id: str, filename: str) -> Dict[str, Any]:
+        """
+        Ejecuta una subida reanudable chunk por chunk, persistiendo la URI de
+        la sesión y el offset confirmado para que un reintento tras una caída
+        continúe desde ahí. También alimenta el estimador de throughput.
+        
+        Args:
+            request: Request de creación con media reanudable
+            upload_key: Clave estable de la subida (carpeta + contenido)
+            folder_id: ID de la carpeta destino
+            filename: Nombre del archivo
+            
+        Returns:
+            Dict con la respuesta de Drive del archivo creado
+        """
+        session = self.upload_sessions.get_session(upload_key)
+        if session and session.total_size != request.resumable.size():
+            session = None
+        
+        if session:
+            # Retomar desde lo que Drive confirmó, que puede ser más de lo
+            # persistido si la caída fue entre el envío y el registro
+            try:
+                committed_bytes, file = self._query_upload_session(request, session.session_uri)
+            except HttpError as e:
+                if e.resp.status not in (404, 410):
+                    raise
+                logger.warning(f"Sesión de subida expirada para {filename}, reiniciando")
+                self.upload_sessions.finish_session(upload_key)
+                session = None
+            else:
+                metrics.increment('drive.upload.resumed')
+                if file is not None:
+                    # La subida había terminado pero no llegamos a ver la respuesta
+                    self.upload_sessions.finish_session(upload_key)
+                    return file
+                
+                request.resumable_uri = session.session_uri
+                request.resumable_progress = committed_bytes
+                logger.info(f"Retomando subida de {filename} desde el byte {committed_bytes}")
+        
+        response = None
+        while response is None:
+            progress_before = request.resumable_progress
+            chunk_started = time.monotonic()
+            
+            try:
+                self.rate_limiter.acquire(RATE_LIMIT_WRITE)
+                metrics.increment('drive.requests', labels={'account': self.account, 'kind': RATE_LIMIT_WRITE})
+                chunk_size = min(request.resumable.chunksize(), request.resumable.size() - progress_before)
+                with self.circuit_breaker.guard(chunk_size):
+                    status, response = request.next_chunk()
+            except HttpError as e:
+                self._record_error(RATE_LIMIT_WRITE, e)
+                if get_retry_after(e) is not None:
+                    raise
+                if session and e.resp.status in (404, 410):
+                    # La sesión expiró en Drive: empezar de cero
+                    logger.warning(f"Sesión de subida expirada para {filename}, reiniciando")
+                    self.upload_sessions.finish_session(upload_key)
+                    session = None
+                    request.resumable_uri = None
+                    request.resumable_progress = 0
+                    continue
+                raise
+            
+            if session is None and request.resumable_uri and response is None:
+                session = self.upload_sessions.start_session(
+                    upload_key, request.resumable_uri, folder_id, filename, request.resumable.size()
+                )
+            
+            if status:
+                sent_bytes = status.resumable_progress - progress_before
+                if session:
+                    self.upload_sessions.update_progress(session, status.resumable_progress)
+            else:
+                sent_bytes = request.resumable.size() - progress_before
+            
+            throughput_estimator.observe(sent_bytes, time.monotonic() - chunk_started)
+        
+        self.upload_sessions.finish_session(upload_key)
+        
+        if throughput_estimator.bytes_per_second:
+            metrics.set_gauge('drive.upload.throughput_bytes_per_second', int(throughput_estimator.bytes_per_second))
+        
+        return response
+    
+    def _query_upload_session(self, request: HttpRequest, session_uri: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """
+        Consulta a Drive cuántos bytes confirmó una sesión de subida
+        reanudable, con un PUT vacío y Content-Range: bytes */total.
+        
+        Args:
+            request: Request de creación con media reanudable
+            session_uri: URI de la sesión de subida
+            
+        Returns:
+            Tuple con (bytes confirmados, respuesta de Drive del archivo si
+            la subida ya había terminado)
+            
+        Raises:
+            HttpError: Si la sesión ya no existe (404/410) o Drive responde con error
+        """
+        total_size = request.resumable.size()
+        headers = {'Content-Range': f'bytes */{total_size}', 'Content-Length': '0'}
+        
+        self.rate_limiter.acquire(RATE_LIMIT_WRITE)
+        metrics.increment('drive.requests', labels={'account': self.account, 'kind': RATE_LIMIT_WRITE})
+        try:
+            with self.circuit_breaker.guard():
+                response, content = self.http_pool.get().request(session_uri, method='PUT', body=b'', headers=headers)
+                if response.status not in (200, 201, 308):
+                    raise HttpError(response, content, uri=session_uri)
+        except HttpError as e:
+            self._record_error(RATE_LIMIT_WRITE, e)
+            raise
+        
+        if response.status != 308:
+            return total_size, request.postproc(response, content)
+        
+        # 308 con Range: bytes=0-N confirma hasta el byte N; sin Range no llegó nada
+        if 'range' not in response:
+            return 0, None
+        return int(response['range'].split('-')[1]) + 1, None
+    
     def get_file_info(self, file_id: str) -> Dict[str, Any]:
         """
-        Obtiene información de un archivo en Google Drive.
+        Obtiene información de un archivo en Google Drive (desde la caché de
+        metadata si ya se conoce).
         
         Args:
             file_id: ID del archivo en Google Drive
@@ -229,23 +574,606 @@ class GoogleDriveServiceAccountClient:
         Returns:
             Dict con información del archivo
         """
+        info = self.metadata_cache.get(file_id)
+        if info is not None:
+            metrics.increment('drive.metadata.cache_hit')
+            return info
+        
+        try:
+            file = self._execute(self._file_info_request(file_id), RATE_LIMIT_READ)
+            info = self._format_file_info(file)
+            self.metadata_cache.set(file_id, info)
+            return info
+            
+        except Exception as e:
+            logger.error(f"Error obteniendo información del archivo '{file_id}': {e}")
+            raise
+    
+    def _file_info_request(self, file_id: str) -> HttpRequest:
+        """
+        Construye el request de metadata de un archivo.
+        
+        Args:
+            file_id: ID del archivo en Google Drive
+            
+        Returns:
+            HttpRequest: Request sin ejecutar
+        """
+        return self.service.files().get(fileId=file_id, fields=FILE_INFO_FIELDS)
+    
+    def _format_file_info(self, file: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convierte la metadata de Drive al formato usado por la aplicación.
+        
+        Args:
+            file: Respuesta de Drive con la metadata del archivo
+            
+        Returns:
+            Dict con información del archivo
+        """
+        return {
+            'file_id': file.get('id'),
+            'filename': file.get('name'),
+            'size': file.get('size'),
+            'mime_type': file.get('mimeType'),
+            'created_time': file.get('createdTime'),
+            'modified_time': file.get('modifiedTime'),
+            'web_view_link': file.get('webViewLink'),
+            'web_content_link': file.get('webContentLink')
+        }
+    
+    def list_children(self, parent_id: str, folders_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Lista los elementos dentro de una carpeta, recorriendo todas las páginas.
+        
+        Args:
+            parent_id: ID de la carpeta padre
+            folders_only: Si es True, solo retorna subcarpetas
+            
+        Returns:
+            List con id, name, mimeType y createdTime de cada elemento
+        """
+        try:
+            query = f"'{parent_id}' in parents and trashed=false"
+            if folders_only:
+                query += " and mimeType='application/vnd.google-apps.folder'"
+            
+            children = []
+            page_token = None
+            
+            while True:
+                results = self._execute(self.service.files().list(
+                    q=query,
+                    orderBy='createdTime',
+                    pageSize=1000,
+                    pageToken=page_token,
+                    fields="nextPageToken, files(id, name, mimeType, createdTime)"
+                ), RATE_LIMIT_READ)
+                
+                children.extend(results.get('files', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    return children
+            
+        except Exception as e:
+            logger.error(f"Error listando contenido de la carpeta '{parent_id}': {e}")
+            raise
+    
+    def list_children_page(self, parent_id: str, page_token: Optional[str] = None,
+                           page_size: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Lista una página del contenido de una carpeta (carpetas primero, por
+        nombre) pidiendo solo los campos que se muestran. Las páginas quedan
+        en una caché de TTL corto que se invalida al subir a la carpeta.
+        
+        Args:
+            parent_id: ID de la carpeta
+            page_token: Token de la página (None para la primera)
+            page_size: Elementos por página (máximo 1000)
+            
+        Returns:
+            Tuple con (elementos con id, name, mimeType, size y modifiedTime, token de la página siguiente)
+        """
+        pages = self.listing_cache.get(parent_id)
+        key = (page_token, page_size)
+        if pages is not None and key in pages:
+            metrics.increment('drive.listing.cache_hit')
+            return pages[key]
+        
+        results = self._execute(self.service.files().list(
+            q=f"'{parent_id}' in parents and trashed=false",
+            orderBy='folder,name',
+            pageSize=page_size,
+            pageToken=page_token,
+            fields="nextPageToken, files(id, name, mimeType, size, modifiedTime)"
+        ), RATE_LIMIT_READ)
+        page = (results.get('files', []), results.get('nextPageToken'))
+        
+        if pages is None:
+            pages = {}
+            self.listing_cache.set(parent_id, pages)
+        pages[key] = page
+        return page
+    
+    def iter_children(self, parent_id: str, page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre el contenido de una carpeta página por página sin cargarlo
+        entero en memoria.
+        
+        Args:
+            parent_id: ID de la carpeta
+            page_size: Elementos por request (máximo 1000)
+            
+        Yields:
+            Dict con id, name, mimeType, size y modifiedTime de cada elemento
+        """
+        page_token = None
+        while True:
+            items, page_token = self.list_children_page(parent_id, page_token, page_size)
+            yield from items
+            if not page_token:
+                return
+    
+    def list_child_folders_batch(self, parent_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Lista las subcarpetas de varias carpetas con requests batch, pidiendo
+        las páginas siguientes de todas las carpetas en la misma ronda.
+        
+        Args:
+            parent_ids: IDs de las carpetas padre
+            
+        Returns:
+            Dict parent_id -> subcarpetas (id, name) de la más antigua a la más
+            nueva (se omiten las carpetas que fallan)
+        """
+        children: Dict[str, List[Dict[str, Any]]] = {parent_id: [] for parent_id in parent_ids}
+        pending: List[Tuple[str, Optional[str]]] = [(parent_id, None) for parent_id in parent_ids]
+        
+        while pending:
+            responses = self.execute_batch([
+                self.service.files().list(
+                    q=f"'{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false",
+                    orderBy='createdTime',
+                    pageSize=1000,
+                    pageToken=page_token,
+                    fields="nextPageToken, files(id, name)"
+                )
+                for parent_id, page_token in pending
+            ], RATE_LIMIT_READ)
+            
+            next_pending = []
+            for (parent_id, _), (response, exception) in zip(pending, responses):
+                if exception:
+                    logger.error(f"Error listando subcarpetas de '{parent_id}' en batch: {exception}")
+                    children.pop(parent_id, None)
+                    continue
+                children[parent_id].extend(response.get('files', []))
+                if response.get('nextPageToken'):
+                    next_pending.append((parent_id, response['nextPageToken']))
+            pending = next_pending
+        
+        return children
+    
+    def move_file(self, file_id: str, new_parent_id: str, old_parent_id: str) -> None:
+        """
+        Mueve un archivo o carpeta a otra carpeta.
+        
+        Args:
+            file_id: ID del archivo o carpeta
+            new_parent_id: ID de la carpeta destino
+            old_parent_id: ID de la carpeta actual
+        """
         try:
-            file = self.service.files().get(
+            self._execute(self.service.files().update(
                 fileId=file_id,
-                fields='id,name,size,mimeType,createdTime,modifiedTime,webViewLink,webContentLink'
-            ).execute()
+                addParents=new_parent_id,
+                removeParents=old_parent_id,
+                fields='id'
+            ), RATE_LIMIT_WRITE)
             
-            return {
-                'file_id': file.get('id'),
-                'filename': file.get('name'),
-                'size': file.get('size'),
-                'mime_type': file.get('mimeType'),
-                'created_time': file.get('createdTime'),
-                'modified_time': file.get('modifiedTime'),
-                'web_view_link': file.get('webViewLink'),
-                'web_content_link': file.get('webContentLink')
-            }
+        except Exception as e:
+            logger.error(f"Error moviendo '{file_id}' a '{new_parent_id}': {e}")
+            raise
+    
+    def move_files_batch(self, moves: Dict[str, str]) -> List[str]:
+        """
+        Mueve varios archivos a otras carpetas con dos rondas de requests
+        batch: una para leer sus carpetas actuales y otra para moverlos.
+        
+        Args:
+            moves: file_id -> ID de la carpeta destino
+            
+        Returns:
+            List con los IDs de los archivos que quedaron en su destino
+        """
+        file_ids = list(moves)
+        parents = self.execute_batch(
+            [self.service.files().get(fileId=file_id, fields='id,parents') for file_id in file_ids],
+            RATE_LIMIT_READ
+        )
+        
+        pending = []
+        moved = []
+        for file_id, (response, exception) in zip(file_ids, parents):
+            if exception:
+                logger.error(f"Error leyendo las carpetas de '{file_id}': {exception}")
+                continue
+            old_parents = [parent for parent in response.get('parents', []) if parent != moves[file_id]]
+            if not old_parents:
+                moved.append(file_id)
+                continue
+            pending.append((file_id, old_parents))
+        
+        responses = self.execute_batch([
+            self.service.files().update(
+                fileId=file_id,
+                addParents=moves[file_id],
+                removeParents=','.join(old_parents),
+                fields='id'
+            )
+            for file_id, old_parents in pending
+        ], RATE_LIMIT_WRITE)
+        
+        for (file_id, old_parents), (response, exception) in zip(pending, responses):
+            if exception:
+                logger.error(f"Error moviendo '{file_id}' a '{moves[file_id]}': {exception}")
+                continue
+            for parent_id in (moves[file_id], *old_parents):
+                self.listing_cache.delete(parent_id)
+            moved.append(file_id)
+        
+        return moved
+    
+    def trash_file(self, file_id: str) -> None:
+        """
+        Envía un archivo o carpeta a la papelera.
+        
+        Args:
+            file_id: ID del archivo o carpeta
+        """
+        try:
+            self._execute(self.service.files().update(
+                fileId=file_id,
+                body={'trashed': True},
+                fields='id'
+            ), RATE_LIMIT_WRITE)
+            self.metadata_cache.invalidate(file_id)
             
         except Exception as e:
-            logger.error(f"Error obteniendo información del archivo '{file_id}': {e}")
+            logger.error(f"Error enviando '{file_id}' a la papelera: {e}")
             raise
+    
+    def _execute(self, request: HttpRequest, kind: str, size: int = 0) -> Any:
+        """
+        Ejecuta un request respetando la cuota compartida de Drive.
+        
+        Args:
+            request: Request sin ejecutar
+            kind: RATE_LIMIT_READ o RATE_LIMIT_WRITE
+            size: Bytes que sube el request (para el circuit breaker)
+            
+        Returns:
+            Respuesta de Drive
+        """
+        self.rate_limiter.acquire(kind)
+        metrics.increment('drive.requests', labels={'account': self.account, 'kind': kind})
+        try:
+            with self.circuit_breaker.guard(size):
+                return request.execute()
+        except HttpError as e:
+            self._record_error(kind, e)
+            raise
+    
+    def _record_error(self, kind: str, exception: Exception) -> None:
+        """
+        Cuenta un error de Drive de esta cuenta y vacía su cuota si fue un límite.
+        
+        Args:
+            kind: RATE_LIMIT_READ o RATE_LIMIT_WRITE
+            exception: Excepción del request
+        """
+        status = exception.resp.status if isinstance(exception, HttpError) else 'error'
+        metrics.increment('drive.errors', labels={'account': self.account, 'kind': kind, 'status': status})
+        self.rate_limiter.penalize(kind, exception)
+    
+    def execute_batch(self, requests: List[HttpRequest], kind: str = RATE_LIMIT_READ) -> List[Tuple[Any, Optional[Exception]]]:
+        """
+        Ejecuta requests independientes agrupados en requests multipart al
+        endpoint batch de Drive (máximo DRIVE_BATCH_SIZE por request HTTP).
+        Cada request del batch consume cuota, así que cada grupo reserva
+        tantos tokens como requests lleva y no supera la ráfaga del bucket.
+        
+        Args:
+            requests: Requests sin ejecutar
+            kind: RATE_LIMIT_READ o RATE_LIMIT_WRITE
+            
+        Returns:
+            List con (respuesta, excepción) de cada request, en el mismo orden
+        """
+        batch_size = min(getattr(settings, 'DRIVE_BATCH_SIZE', 100), self.rate_limiter.burst(kind))
+        results: List[Tuple[Any, Optional[Exception]]] = [(None, None)] * len(requests)
+        
+        def callback(request_id, response, exception):
+            results[int(request_id)] = (response, exception)
+        
+        for start in range(0, len(requests), batch_size):
+            batch = BatchHttpRequest(callback=callback, batch_uri=self.batch_uri)
+            indexes = range(start, min(start + batch_size, len(requests)))
+            
+            for index in indexes:
+                batch.add(requests[index], request_id=str(index))
+            
+            self.rate_limiter.acquire(kind, len(indexes))
+            metrics.increment('drive.requests', len(indexes), {'account': self.account, 'kind': kind})
+            try:
+                with self.circuit_breaker.guard():
+                    batch.execute(http=self.http_pool.get())
+            except HttpError as e:
+                self._record_error(kind, e)
+                raise
+            
+            for index in indexes:
+                if results[index][1] is not None:
+                    self._record_error(kind, results[index][1])
+        
+        return results
+    
+    def find_folders_batch(self, parent_id: str, folder_names: List[str], company_id: int = None) -> Dict[str, Optional[str]]:
+        """
+        Busca varias carpetas de un mismo padre con un solo request batch.
+        Solo consulta en Drive las que no están en el índice.
+        
+        Args:
+            parent_id: ID de la carpeta padre
+            folder_names: Nombres de las carpetas
+            company_id: ID de la compañía para el índice (opcional)
+            
+        Returns:
+            Dict nombre -> ID de la carpeta (None si no existe)
+        """
+        found = self.find_folder_pairs_batch([(parent_id, name) for name in folder_names], company_id)
+        return {name: folder_id for (_, name), folder_id in found.items()}
+    
+    def create_folders_batch(self, parent_id: str, folder_names: List[str], company_id: int = None) -> Dict[str, str]:
+        """
+        Obtiene o crea varias carpetas de un mismo padre agrupando los requests.
+        
+        Args:
+            parent_id: ID de la carpeta padre
+            folder_names: Nombres de las carpetas
+            company_id: ID de la compañía para el índice (opcional)
+            
+        Returns:
+            Dict nombre -> ID de la carpeta (solo las que existen o se crearon)
+        """
+        folders = self.create_folder_pairs_batch([(parent_id, name) for name in folder_names], company_id)
+        return {name: folder_id for (_, name), folder_id in folders.items()}
+    
+    def find_folder_pairs_batch(self, pairs: List[Tuple[str, str]], company_id: int = None) -> Dict[Tuple[str, str], Optional[str]]:
+        """
+        Busca varias carpetas (padre, nombre), de uno o varios padres, con
+        requests batch. Solo consulta en Drive las que no están en el índice.
+        
+        Args:
+            pairs: Pares (ID de la carpeta padre, nombre)
+            company_id: ID de la compañía para el índice (opcional)
+            
+        Returns:
+            Dict (padre, nombre) -> ID de la carpeta (None si no existe)
+        """
+        found = self.folder_index.get_folder_ids_for_pairs(pairs)
+        missing = [pair for pair in pairs if pair not in found]
+        
+        if missing:
+            responses = self.execute_batch(
+                [self._find_folder_request(name, parent_id) for parent_id, name in missing], RATE_LIMIT_READ
+            )
+            
+            for (parent_id, name), (response, exception) in zip(missing, responses):
+                if exception:
+                    logger.error(f"Error buscando carpeta '{name}' en batch: {exception}")
+                    found[(parent_id, name)] = None
+                else:
+                    found[(parent_id, name)] = self._register_found_folder(response, name, parent_id, company_id)
+        
+        for (parent_id, name), folder_id in found.items():
+            if folder_id:
+                self.folder_cache.set_folder(parent_id, name, folder_id)
+        
+        return found
+    
+    def create_folder_pairs_batch(self, pairs: List[Tuple[str, str]], company_id: int = None) -> Dict[Tuple[str, str], str]:
+        """
+        Obtiene o crea varias carpetas (padre, nombre) agrupando los requests.
+        Si otro worker crea la misma carpeta a la vez, la restricción única del
+        índice decide cuál queda y la otra se envía a la papelera.
+        
+        Args:
+            pairs: Pares (ID de la carpeta padre, nombre)
+            company_id: ID de la compañía para el índice (opcional)
+            
+        Returns:
+            Dict (padre, nombre) -> ID de la carpeta (solo las que existen o se crearon)
+        """
+        folders = self.find_folder_pairs_batch(pairs, company_id)
+        missing = [pair for pair, folder_id in folders.items() if not folder_id]
+        
+        if missing:
+            responses = self.execute_batch(
+                [self._create_folder_request(name, parent_id) for parent_id, name in missing], RATE_LIMIT_WRITE
+            )
+            
+            for (parent_id, name), (response, exception) in zip(missing, responses):
+                if exception:
+                    logger.error(f"Error creando carpeta '{name}' en batch: {exception}")
+                    folders.pop((parent_id, name))
+                    continue
+                
+                folder_id = self._register_created_folder(response.get('id'), name, parent_id, company_id)
+                folders[(parent_id, name)] = folder_id
+                self.folder_cache.set_folder(parent_id, name, folder_id)
+                logger.info(f"Carpeta creada en batch: {name} (ID: {folder_id})")
+        
+        return folders
+    
+    def ensure_folder_paths_batch(self, root_id: str, paths: List[Tuple[str, ...]], company_id: int = None) -> Dict[Tuple[str, ...], str]:
+        """
+        Obtiene o crea varias rutas de carpetas bajo una misma raíz, nivel por
+        nivel, con un request batch por nivel para todas las rutas a la vez.
+        Las rutas resueltas quedan en la caché de rutas y en el índice.
+        
+        Args:
+            root_id: ID de la carpeta raíz (carpeta de la compañía)
+            paths: Rutas como tuplas de nombres, p. ej. (sender, año, mes, día)
+            company_id: ID de la compañía para el índice (opcional)
+            
+        Returns:
+            Dict ruta -> ID de la carpeta final (se omiten las que fallan)
+        """
+        resolved: Dict[Tuple[str, ...], str] = {(): root_id}
+        depth = max((len(path) for path in paths), default=0)
+        
+        for level in range(1, depth + 1):
+            prefixes = {path[:level] for path in paths if len(path) >= level and path[:level - 1] in resolved}
+            pairs = sorted({(resolved[prefix[:-1]], prefix[-1]) for prefix in prefixes})
+            folders = self.create_folder_pairs_batch(pairs, company_id)
+            
+            for prefix in prefixes:
+                folder_id = folders.get((resolved[prefix[:-1]], prefix[-1]))
+                if folder_id:
+                    resolved[prefix] = folder_id
+        
+        result = {}
+        for path in paths:
+            if path in resolved:
+                result[path] = resolved[path]
+                self.folder_cache.set_path(root_id, tuple(path), resolved[path])
+        
+        return result
+    
+    def get_files_info_batch(self, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene la metadata de varios archivos: los que están en la caché de
+        metadata salen de ahí y el resto se pide con requests batch.
+        
+        Args:
+            file_ids: IDs de los archivos en Google Drive
+            
+        Returns:
+            Dict file_id -> información del archivo (se omiten los que fallan)
+        """
+        return self.metadata_cache.get_many(file_ids, self._fetch_files_info)
+    
+    def invalidate_file_info(self, file_id: str) -> None:
+        """
+        Descarta la metadata en caché de un archivo que cambió en Drive.
+        
+        Args:
+            file_id: ID del archivo en Google Drive
+        """
+        self.metadata_cache.invalidate(file_id)
+    
+    def _fetch_files_info(self, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Pide a Drive la metadata de varios archivos con requests batch.
+        
+        Args:
+            file_ids: IDs de los archivos en Google Drive
+            
+        Returns:
+            Dict file_id -> información del archivo (se omiten los que fallan)
+        """
+        files_info = {}
+        responses = self.execute_batch([self._file_info_request(file_id) for file_id in file_ids], RATE_LIMIT_READ)
+        
+        for file_id, (response, exception) in zip(file_ids, responses):
+            if exception:
+                logger.error(f"Error obteniendo información del archivo '{file_id}' en batch: {exception}")
+                continue
+            files_info[file_id] = self._format_file_info(response)
+        
+        return files_info
+    
+    def get_start_page_token(self) -> str:
+        """
+        Obtiene el page token actual del feed de cambios de la cuenta.
+        
+        Returns:
+            str: Page token desde el que se verán los cambios futuros
+        """
+        response = self._execute(self.service.changes().getStartPageToken(supportsAllDrives=True), RATE_LIMIT_READ)
+        return response['startPageToken']
+    
+    def list_changes(self, page_token: str) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]:
+        """
+        Lee una página del feed de cambios de la cuenta.
+        
+        Args:
+            page_token: Page token desde el que leer
+            
+        Returns:
+            Tuple con (cambios, token de la página siguiente, token de inicio
+            para la próxima ejecución). Solo uno de los dos tokens viene informado.
+        """
+        response = self._execute(self.service.changes().list(
+            pageToken=page_token,
+            pageSize=1000,
+            includeRemoved=True,
+            includeItemsFromAllDrives=True,
+            supportsAllDrives=True,
+            fields="nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, mimeType, parents, trashed))"
+        ), RATE_LIMIT_READ)
+        
+        return response.get('changes', []), response.get('nextPageToken'), response.get('newStartPageToken')
+
+
+_clients: Dict[str, GoogleDriveServiceAccountClient] = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+
+
+def get_drive_client(account: str = None) -> GoogleDriveServiceAccountClient:
+    """
+    Retorna el cliente de Drive del proceso para una Service Account del
+    pool, construyéndolo la primera vez.
+    
+    El cliente es seguro entre hilos, así que se comparte por todo el proceso
+    en lugar de releer el Service Account y reconstruir el servicio por mensaje.
+    Tras un fork (p. ej. workers de gunicorn con preload) se reconstruye.
+    
+    Args:
+        account: Nombre de la cuenta en el pool (por defecto la primera)
+        
+    Returns:
+        GoogleDriveServiceAccountClient: Cliente compartido
+    """
+    global _clients_pid
+    accounts = get_service_accounts()
+    account = account or next(iter(accounts))
+    
+    client = _clients.get(account)
+    if client is not None and _clients_pid == os.getpid():
+        return client
+    
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+        
+        if account not in _clients:
+            _clients[account] = GoogleDriveServiceAccountClient(accounts[account], account=account)
+        
+        return _clients[account]
+
+
+def get_drive_client_for_company(company) -> GoogleDriveServiceAccountClient:
+    """
+    Retorna el cliente de la Service Account asignada a una compañía.
+    
+    Args:
+        company: Compañía
+        
+    Returns:
+        GoogleDriveServiceAccountClient: Cliente compartido de esa cuenta
+    """
+    return get_drive_client(get_company_account(company))
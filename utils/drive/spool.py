@@ -0,0 +1,179 @@
+import json
+import os
+import socket
+import uuid
+import logging
+from typing import Any, Dict, List, Tuple
+import httplib2
+from django.conf import settings
+from googleapiclient.errors import HttpError
+from utils.drive.rate_limiter import DriveRateLimitExceeded, get_retry_after
+from utils.resilience.circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class DriveSpool:
+    """
+    Cola local y durable de archivos que no se pudieron subir a Drive.
+    Single Responsibility: Solo guarda, lee y borra archivos pendientes en disco
+
+    Cada archivo pendiente son dos entradas bajo DRIVE_SPOOL_DIR: {key}.bin
+    con el contenido y {key}.json con los datos para subirlo después. Las dos
+    se escriben de forma atómica (archivo temporal + fsync + rename) y el
+    .json va al final, así una clave visible siempre tiene su contenido.
+    """
+
+    def __init__(self, directory: str = None):
+        """
+        Inicializa el spool.
+
+        Args:
+            directory: Directorio del spool (por defecto DRIVE_SPOOL_DIR)
+        """
+        self.directory = directory or getattr(settings, 'DRIVE_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'spool'))
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+
+    def put(self, file_content: bytes, metadata: Dict[str, Any]) -> str:
+        """
+        Guarda un archivo pendiente de subir.
+
+        Args:
+            file_content: Contenido del archivo
+            metadata: Datos para subirlo después (deben ser serializables a JSON)
+
+        Returns:
+            str: Clave del archivo en el spool
+        """
+        key = uuid.uuid4().hex
+        self._write(f'{key}.bin', file_content)
+        self._write(f'{key}.json', json.dumps(metadata).encode())
+        self._sync_directory()
+        return key
+
+    def get(self, key: str) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        Lee un archivo pendiente.
+
+        Args:
+            key: Clave del archivo en el spool
+
+        Returns:
+            Tuple con (contenido, metadata)
+
+        Raises:
+            FileNotFoundError: Si la clave no está en el spool
+        """
+        with open(self._path(key, '.json')) as metadata_file:
+            metadata = json.load(metadata_file)
+        with open(self._path(key, '.bin'), 'rb') as content_file:
+            return content_file.read(), metadata
+
+    def remove(self, key: str) -> None:
+        """
+        Borra un archivo pendiente (ya subido). El .json va primero para no
+        dejar nunca una clave sin contenido.
+
+        Args:
+            key: Clave del archivo en el spool
+        """
+        for suffix in ('.json', '.bin'):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def discard(self, key: str) -> None:
+        """
+        Aparta un archivo que no se pudo subir en DRIVE_SPOOL_DIR/failed, para
+        revisarlo a mano sin que cuente como pendiente.
+
+        Args:
+            key: Clave del archivo en el spool
+        """
+        failed_directory = os.path.join(self.directory, 'failed')
+        os.makedirs(failed_directory, mode=0o700, exist_ok=True)
+        # El .json primero: la clave deja de estar pendiente aunque falle el .bin
+        for suffix in ('.json', '.bin'):
+            try:
+                os.replace(self._path(key, suffix), os.path.join(failed_directory, key + suffix))
+            except FileNotFoundError:
+                pass
+
+    def keys(self) -> List[str]:
+        """
+        Retorna las claves de los archivos pendientes.
+
+        Returns:
+            List[str]: Claves presentes en el spool
+        """
+        return [name[:-5] for name in os.listdir(self.directory) if name.endswith('.json')]
+
+    def _path(self, key: str, suffix: str) -> str:
+        if not key or os.path.basename(key) != key:
+            raise ValueError(f"Clave de spool inválida: {key!r}")
+        return os.path.join(self.directory, key + suffix)
+
+    def _write(self, name: str, data: bytes) -> None:
+        path = os.path.join(self.directory, name)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'wb') as spool_file:
+            spool_file.write(data)
+            spool_file.flush()
+            os.fsync(spool_file.fileno())
+        os.replace(temporary_path, path)
+
+    def _sync_directory(self) -> None:
+        # Sin fsync del directorio, un corte de luz puede perder los renames
+        descriptor = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+def get_spool_host() -> str:
+    """
+    Retorna el nombre de este nodo para los archivos que guarda en el spool.
+
+    Returns:
+        str: DRIVE_SPOOL_HOST o, si no está configurado, el hostname
+    """
+    return getattr(settings, 'DRIVE_SPOOL_HOST', '') or socket.gethostname()
+
+
+def is_drive_unavailable(exception: Exception) -> bool:
+    """
+    Indica si un error de subida significa que Drive está caído o lento (y
+    el archivo se puede reintentar más tarde) y no que el request es inválido.
+
+    Args:
+        exception: Excepción de la subida
+
+    Returns:
+        bool: True si conviene guardar el archivo en el spool
+    """
+    if isinstance(exception, HttpError):
+        return exception.resp.status >= 500 or get_retry_after(exception) is not None
+
+    return isinstance(exception, (CircuitOpenError, DriveRateLimitExceeded, httplib2.ServerNotFoundError,
+                                  socket.timeout, TimeoutError, ConnectionError))
+
+
+def is_drive_failure(exception: Exception) -> bool:
+    """
+    Indica si un error de Drive cuenta como falla para su circuit breaker:
+    5xx, timeouts y errores de conexión. Los límites de cuota (429, 403
+    rateLimitExceeded) no: Drive está sano y de esos se ocupa el limitador.
+
+    Args:
+        exception: Excepción del request a Drive
+
+    Returns:
+        bool: True si cuenta como falla para el circuito
+    """
+    if isinstance(exception, HttpError):
+        return exception.resp.status >= 500
+
+    return isinstance(exception, (httplib2.ServerNotFoundError, socket.timeout, TimeoutError, ConnectionError))
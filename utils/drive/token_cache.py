@@ -0,0 +1,291 @@
+import datetime
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from typing import Any, Dict, Iterable, Optional
+from django.conf import settings
+from google.auth import credentials as google_credentials
+from utils.metrics.registry import metrics
+
+logger = logging.getLogger(__name__)
+
+# Libera el lock solo si sigue siendo nuestro (pudo expirar y tomarlo otro proceso)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisTokenStore:
+    """
+    Caché de access tokens compartida en Redis.
+    Single Responsibility: Solo guarda tokens y el lock de quien los renueva
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self._release = self.client.register_script(_RELEASE_LOCK_SCRIPT)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.client.get(key)
+        return json.loads(value) if value else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        self.client.set(key, json.dumps(value), ex=max(1, ttl))
+
+    def try_lock(self, key: str, timeout: float) -> Optional[str]:
+        handle = uuid.uuid4().hex
+        if self.client.set(f'{key}:lock', handle, nx=True, px=int(timeout * 1000)):
+            return handle
+        return None
+
+    def unlock(self, key: str, handle: str) -> None:
+        self._release(keys=[f'{key}:lock'], args=[handle])
+
+
+class FileTokenStore:
+    """
+    Caché de access tokens compartida en archivos locales.
+    Single Responsibility: Solo guarda tokens y el lock de quien los renueva
+
+    Sirve a todos los procesos de un mismo host: el lock es un flock sobre
+    un archivo y cada token se escribe de forma atómica (archivo temporal +
+    rename) con permisos 0600.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + suffix)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key, '.json')) as token_file:
+                return json.load(token_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        path = self._path(key, '.json')
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w') as token_file:
+            json.dump(value, token_file)
+        os.replace(temporary_path, path)
+
+    def try_lock(self, key: str, timeout: float):
+        lock_file = open(self._path(key, '.lock'), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock_file
+        except BlockingIOError:
+            lock_file.close()
+            return None
+
+    def unlock(self, key: str, handle) -> None:
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+
+class SharedTokenCredentials(google_credentials.Credentials):
+    """
+    Credenciales de Google que comparten el access token entre procesos.
+    Single Responsibility: Solo decide de dónde sale el token de cada request
+
+    Envuelve las credenciales reales (Service Account o usuario OAuth). Antes
+    de cada request, si el token vence en menos de DRIVE_TOKEN_REFRESH_MARGIN,
+    se busca uno vigente en la caché compartida. Solo quien toma el lock pide
+    uno nuevo a Google; los demás siguen con el token actual mientras sea
+    válido o esperan a que el renovador lo publique.
+    """
+
+    def __init__(self, credentials, cache_key: str, store=None):
+        """
+        Inicializa las credenciales compartidas.
+
+        Args:
+            credentials: Credenciales reales que saben renovar el token
+            cache_key: Clave del token en la caché (cuenta + scopes)
+            store: Backend de la caché (por defecto según REDIS_URL)
+        """
+        super().__init__()
+        self.credentials = credentials
+        self.cache_key = cache_key
+        self.store = store or _build_store()
+        self.refresh_margin = getattr(settings, 'DRIVE_TOKEN_REFRESH_MARGIN', 300)
+        self.lock_timeout = getattr(settings, 'DRIVE_TOKEN_LOCK_TIMEOUT', 10)
+        self._lock = threading.Lock()
+        # Credenciales de usuario cargadas de token.json pueden traer un token vigente
+        self._adopt(credentials.token, credentials.expiry)
+
+    @property
+    def requires_scopes(self) -> bool:
+        return False
+
+    def refresh(self, request) -> None:
+        """
+        Renueva el token tras un rechazo (401): el token actual no se vuelve
+        a tomar de la caché aunque no haya vencido.
+        """
+        self._refresh(request, rejected=self.token)
+
+    def before_request(self, request, method, url, headers) -> None:
+        """
+        Renueva por adelantado si el token vence pronto y lo aplica al request.
+        """
+        if not self._is_fresh(self.token, self.expiry):
+            self._refresh(request)
+        self.apply(headers)
+
+    def _refresh(self, request, rejected: str = None) -> None:
+        with self._lock:
+            # Otro hilo del proceso pudo renovarlo mientras esperábamos
+            if self.token != rejected and self._is_fresh(self.token, self.expiry):
+                return
+
+            cached = self._read_cache(rejected)
+            if cached and self._is_fresh(*cached):
+                self._adopt(*cached)
+                return
+
+            handle = self._try_lock()
+            if handle is not None:
+                try:
+                    cached = self._read_cache(rejected)
+                    if cached and self._is_fresh(*cached):
+                        self._adopt(*cached)
+                    else:
+                        self._refresh_from_google(request)
+                finally:
+                    self._unlock(handle)
+                return
+
+            # Otro proceso está renovando: seguir con un token aún válido
+            if cached and self._is_valid(*cached):
+                self._adopt(*cached)
+                return
+            if self.token != rejected and self.valid:
+                return
+
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                cached = self._read_cache(rejected)
+                if cached and self._is_valid(*cached):
+                    self._adopt(*cached)
+                    return
+
+            logger.warning(f"Timeout esperando el token compartido de {self.cache_key}, renovando localmente")
+            self._refresh_from_google(request)
+
+    def _refresh_from_google(self, request) -> None:
+        self.credentials.refresh(request)
+        metrics.increment('drive.token.refresh')
+
+        expiry = self.credentials.expiry
+        self._adopt(self.credentials.token, expiry)
+
+        if expiry is None:
+            return
+
+        try:
+            ttl = int((expiry - _utcnow()).total_seconds())
+            self.store.set(self.cache_key, {'token': self.credentials.token, 'expiry': expiry.isoformat()}, ttl)
+        except Exception as e:
+            logger.warning(f"No se pudo publicar el token de {self.cache_key} en la caché compartida: {e}")
+
+    def _read_cache(self, rejected: str = None):
+        try:
+            value = self.store.get(self.cache_key)
+        except Exception as e:
+            logger.warning(f"Caché de tokens no disponible: {e}")
+            return None
+
+        if not value or value['token'] == rejected:
+            return None
+
+        metrics.increment('drive.token.cache_hit')
+        return value['token'], datetime.datetime.fromisoformat(value['expiry'])
+
+    def _try_lock(self):
+        try:
+            return self.store.try_lock(self.cache_key, self.lock_timeout)
+        except Exception as e:
+            logger.warning(f"Lock de tokens no disponible, renovando localmente: {e}")
+            return False
+
+    def _unlock(self, handle) -> None:
+        if handle is False:
+            return
+        try:
+            self.store.unlock(self.cache_key, handle)
+        except Exception as e:
+            logger.warning(f"No se pudo liberar el lock de tokens de {self.cache_key}: {e}")
+
+    def _adopt(self, token: str, expiry: Optional[datetime.datetime]) -> None:
+        self.token = token
+        self.expiry = expiry
+
+    def _is_fresh(self, token: Optional[str], expiry: Optional[datetime.datetime]) -> bool:
+        if token is None:
+            return False
+        return expiry is None or _utcnow() < expiry - datetime.timedelta(seconds=self.refresh_margin)
+
+    def _is_valid(self, token: Optional[str], expiry: Optional[datetime.datetime]) -> bool:
+        return token is not None and (expiry is None or _utcnow() < expiry - datetime.timedelta(seconds=30))
+
+
+def build_cache_key(identity: str, scopes: Iterable[str]) -> str:
+    """
+    Construye la clave del token en la caché compartida.
+
+    Args:
+        identity: Cuenta dueña del token (email del Service Account o client_id)
+        scopes: Scopes del token
+
+    Returns:
+        str: Clave de la caché
+    """
+    scopes_hash = hashlib.sha256(' '.join(sorted(scopes or [])).encode()).hexdigest()[:16]
+    return f'drive:token:{identity}:{scopes_hash}'
+
+
+def share_token(credentials, identity: str, scopes: Iterable[str]) -> SharedTokenCredentials:
+    """
+    Envuelve unas credenciales para que compartan su access token entre procesos.
+
+    Args:
+        credentials: Credenciales reales
+        identity: Cuenta dueña del token
+        scopes: Scopes del token
+
+    Returns:
+        SharedTokenCredentials: Credenciales con caché compartida
+    """
+    return SharedTokenCredentials(credentials, build_cache_key(identity, scopes))
+
+
+def _utcnow() -> datetime.datetime:
+    # google-auth maneja expiry como datetime UTC sin zona horaria
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _build_store():
+    """
+    Construye la caché de tokens: Redis si hay REDIS_URL, si no archivos locales.
+    """
+    redis_url = getattr(settings, 'REDIS_URL', '')
+    if redis_url:
+        return RedisTokenStore(redis_url)
+    return FileTokenStore(getattr(settings, 'DRIVE_TOKEN_CACHE_DIR', '/tmp/drive-token-cache'))
@@ -0,0 +1,69 @@
+import threading
+import urllib.parse
+import httplib2
+import google_auth_httplib2
+from googleapiclient.http import HttpRequest
+from django.conf import settings
+
+
+class ThreadLocalHttpPool:
+    """
+    Pool de transportes HTTP autorizados para la API de Google Drive.
+    Single Responsibility: Solo entrega un transporte seguro para el hilo actual
+
+    httplib2.Http no es seguro entre hilos, así que cada hilo recibe su propio
+    transporte. El transporte se reutiliza entre requests del mismo hilo para
+    conservar las conexiones keep-alive, y todos comparten las mismas
+    credenciales, que se refrescan solo cuando expiran.
+    """
+
+    def __init__(self, credentials, timeout: int = None, root_url: str = None):
+        """
+        Inicializa el pool.
+
+        Args:
+            credentials: Credenciales de Google compartidas por todos los hilos
+            timeout: Timeout en segundos de cada request HTTP
+            root_url: Raíz alternativa de la API (p. ej. servidor falso local)
+        """
+        self.credentials = credentials
+        self.timeout = timeout or getattr(settings, 'DRIVE_HTTP_TIMEOUT', 60)
+        self.root_url = urllib.parse.urlparse(root_url) if root_url else None
+        self._local = threading.local()
+
+    def get(self) -> google_auth_httplib2.AuthorizedHttp:
+        """
+        Retorna el transporte autorizado del hilo actual, creándolo si no existe.
+
+        Returns:
+            AuthorizedHttp: Transporte del hilo actual
+        """
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            transport = httplib2.Http(timeout=self.timeout)
+            # Drive responde 308 en las subidas reanudables: no es una redirección
+            # (lo mismo que hace googleapiclient.http.build_http)
+            transport.redirect_codes = transport.redirect_codes - {308}
+
+            http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=transport)
+            self._local.http = http
+        return http
+
+    def build_request(self, http, *args, **kwargs) -> HttpRequest:
+        """
+        requestBuilder para googleapiclient: ignora el transporte compartido
+        del servicio y usa el del hilo que ejecuta el request.
+
+        Returns:
+            HttpRequest: Request ligado al transporte del hilo actual
+        """
+        if self.root_url and len(args) > 1:
+            # googleapiclient solo cambia el host de las URLs de subida, no el
+            # esquema: apuntar todo a la raíz configurada (http en local)
+            uri = urllib.parse.urlparse(args[1])._replace(
+                scheme=self.root_url.scheme,
+                netloc=self.root_url.netloc
+            )
+            args = (args[0], urllib.parse.urlunparse(uri), *args[2:])
+
+        return HttpRequest(self.get(), *args, **kwargs)
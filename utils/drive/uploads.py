@@ -0,0 +1,102 @@
+import threading
+from typing import Optional
+from django.conf import settings
+
+# Drive exige que los chunks de una subida reanudable sean múltiplos de 256 KiB
+CHUNK_GRANULARITY = 256 * 1024
+
+UPLOAD_MODE_MULTIPART = 'multipart'
+UPLOAD_MODE_RESUMABLE = 'resumable'
+
+
+class ThroughputEstimator:
+    """
+    Estimador del throughput de subida observado hacia Drive.
+    Single Responsibility: Solo mantiene un promedio móvil exponencial de bytes/segundo
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        """
+        Inicializa el estimador.
+
+        Args:
+            alpha: Peso de la observación más reciente (0-1)
+        """
+        self.alpha = alpha
+        self._bytes_per_second: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def observe(self, sent_bytes: int, elapsed: float) -> None:
+        """
+        Registra un envío completado.
+
+        Args:
+            sent_bytes: Bytes enviados
+            elapsed: Segundos que tomó el envío
+        """
+        if sent_bytes <= 0 or elapsed <= 0:
+            return
+
+        sample = sent_bytes / elapsed
+        with self._lock:
+            if self._bytes_per_second is None:
+                self._bytes_per_second = sample
+            else:
+                self._bytes_per_second = self.alpha * sample + (1 - self.alpha) * self._bytes_per_second
+
+    @property
+    def bytes_per_second(self) -> Optional[float]:
+        with self._lock:
+            return self._bytes_per_second
+
+
+# Estimador compartido por todas las subidas del proceso
+throughput_estimator = ThroughputEstimator()
+
+
+def choose_upload_mode(size: int) -> str:
+    """
+    Elige el modo de subida según el tamaño del archivo.
+    Los archivos pequeños van en un solo request multipart y se ahorran el
+    round-trip de inicio de sesión de la subida reanudable.
+
+    Args:
+        size: Tamaño del archivo en bytes
+
+    Returns:
+        str: UPLOAD_MODE_MULTIPART o UPLOAD_MODE_RESUMABLE
+    """
+    threshold = getattr(settings, 'DRIVE_MULTIPART_UPLOAD_MAX_BYTES', 5 * 1024 * 1024)
+    return UPLOAD_MODE_MULTIPART if size <= threshold else UPLOAD_MODE_RESUMABLE
+
+
+def choose_chunk_size(size: int, bytes_per_second: Optional[float] = None) -> int:
+    """
+    Elige el tamaño de chunk de una subida reanudable.
+    Apunta a que cada chunk tarde DRIVE_UPLOAD_CHUNK_TARGET_SECONDS con el
+    throughput observado, acotado entre el mínimo y el máximo configurados.
+
+    Args:
+        size: Tamaño del archivo en bytes
+        bytes_per_second: Throughput observado (por defecto el del estimador compartido)
+
+    Returns:
+        int: Tamaño de chunk en bytes, múltiplo de 256 KiB
+    """
+    min_chunk = getattr(settings, 'DRIVE_UPLOAD_MIN_CHUNK_BYTES', 1024 * 1024)
+    max_chunk = getattr(settings, 'DRIVE_UPLOAD_MAX_CHUNK_BYTES', 64 * 1024 * 1024)
+    target_seconds = getattr(settings, 'DRIVE_UPLOAD_CHUNK_TARGET_SECONDS', 5)
+
+    if bytes_per_second is None:
+        bytes_per_second = throughput_estimator.bytes_per_second
+
+    if bytes_per_second:
+        chunk_size = int(bytes_per_second * target_seconds)
+    else:
+        chunk_size = getattr(settings, 'DRIVE_UPLOAD_DEFAULT_CHUNK_BYTES', 8 * 1024 * 1024)
+
+    # No tiene sentido un chunk mayor que el archivo
+    chunk_size = min(chunk_size, max_chunk, size)
+    chunk_size = max(chunk_size, min_chunk)
+
+    return max(CHUNK_GRANULARITY, chunk_size // CHUNK_GRANULARITY * CHUNK_GRANULARITY)
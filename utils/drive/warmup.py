@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+from django.db import connection
+from utils.drive.folder_cache import get_folder_cache
+from utils.metrics.registry import metrics
+
+logger = logging.getLogger(__name__)
+
+WARMUP_DISABLED = 'disabled'
+WARMUP_RUNNING = 'running'
+WARMUP_READY = 'ready'
+WARMUP_FAILED = 'failed'
+
+
+class FolderCacheWarmer:
+    """
+    Precarga la caché de carpetas recorriendo el árbol de Drive de las compañías.
+    Single Responsibility: Solo llena la caché de carpetas dentro de un presupuesto de tiempo
+
+    El recorrido es en anchura y compartido por todas las compañías: cada
+    nivel se lista con requests batch ('<id>' in parents) para todas las
+    carpetas del nivel, así con un presupuesto corto quedan en caché los
+    niveles de arriba (remitentes, años) de todas las compañías.
+    """
+
+    def __init__(self, budget_seconds: float = None, max_depth: int = None,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Inicializa el precargador.
+
+        Args:
+            budget_seconds: Tiempo máximo de la precarga (por defecto DRIVE_WARMUP_BUDGET_SECONDS)
+            max_depth: Niveles a recorrer bajo la carpeta de cada compañía (por defecto DRIVE_WARMUP_MAX_DEPTH)
+            progress: Función que recibe las estadísticas al terminar cada ronda (opcional)
+        """
+        self.budget_seconds = budget_seconds or getattr(settings, 'DRIVE_WARMUP_BUDGET_SECONDS', 60)
+        self.max_depth = max_depth or getattr(settings, 'DRIVE_WARMUP_MAX_DEPTH', 5)
+        self.max_folders = getattr(settings, 'DRIVE_FOLDER_CACHE_SIZE', 10000)
+        self.batch_size = getattr(settings, 'DRIVE_BATCH_SIZE', 100)
+        self.progress = progress
+        self.folder_cache = get_folder_cache()
+
+    def warm(self, companies: Iterable) -> Dict[str, Any]:
+        """
+        Precarga las carpetas de las compañías hasta recorrer sus árboles o
+        agotar el presupuesto.
+
+        Args:
+            companies: Compañías a precargar (se omiten las que no usan Drive)
+
+        Returns:
+            Dict con companies, folders, depth, elapsed y complete (False si se
+            cortó por tiempo o por el tamaño de la caché)
+        """
+        started_at = time.monotonic()
+        deadline = started_at + self.budget_seconds
+        stats = {'companies': 0, 'folders': 0, 'depth': 0, 'elapsed': 0.0, 'complete': True}
+
+        # parent_id -> (cliente, carpeta de la compañía, segmentos desde la compañía)
+        frontier: Dict[str, Tuple[Any, str, Tuple[str, ...]]] = {}
+        for company in companies:
+            client = _get_drive_client(company)
+            if client is not None:
+                frontier[company.drive_folder_id] = (client, company.drive_folder_id, ())
+                stats['companies'] += 1
+
+        while frontier and stats['depth'] < self.max_depth:
+            warmed_before = stats['folders']
+            next_frontier = {}
+            parent_ids = list(frontier)
+
+            for start in range(0, len(parent_ids), self.batch_size):
+                if time.monotonic() >= deadline or stats['folders'] >= self.max_folders:
+                    stats['complete'] = False
+                    break
+                next_frontier.update(self._warm_parents(parent_ids[start:start + self.batch_size], frontier))
+                stats['folders'] = warmed_before + len(next_frontier)
+
+            stats['depth'] += 1
+            stats['elapsed'] = round(time.monotonic() - started_at, 2)
+            if self.progress:
+                self.progress(dict(stats))
+            if not stats['complete']:
+                break
+            frontier = next_frontier
+
+        stats['elapsed'] = round(time.monotonic() - started_at, 2)
+        metrics.increment('drive.warmup.folders', stats['folders'])
+        metrics.observe('drive.warmup.duration', stats['elapsed'])
+        return stats
+
+    def _warm_parents(self, parent_ids: List[str],
+                      frontier: Dict[str, Tuple[Any, str, Tuple[str, ...]]]) -> Dict[str, Tuple[Any, str, Tuple[str, ...]]]:
+        """
+        Lista las subcarpetas de un grupo de carpetas y las guarda en la caché.
+
+        Args:
+            parent_ids: Carpetas a listar
+            frontier: Nivel actual del recorrido
+
+        Returns:
+            Dict con las subcarpetas encontradas, en el mismo formato que frontier
+        """
+        by_client: Dict[int, List[str]] = {}
+        for parent_id in parent_ids:
+            by_client.setdefault(id(frontier[parent_id][0]), []).append(parent_id)
+
+        found = {}
+        for client_parent_ids in by_client.values():
+            client = frontier[client_parent_ids[0]][0]
+            for parent_id, children in client.list_child_folders_batch(client_parent_ids).items():
+                _, root_id, segments = frontier[parent_id]
+                seen = set()
+                for child in children:
+                    # Con duplicados vale la más antigua, igual que al buscar por nombre
+                    if child['name'] in seen:
+                        continue
+                    seen.add(child['name'])
+
+                    child_segments = (*segments, child['name'])
+                    self.folder_cache.set_folder(parent_id, child['name'], child['id'])
+                    self.folder_cache.set_path(root_id, child_segments, child['id'])
+                    found[child['id']] = (client, root_id, child_segments)
+
+        return found
+
+
+def _get_drive_client(company):
+    """
+    Retorna el cliente de Drive de una compañía, o None si no usa Drive.
+    """
+    from utils.storage.factory import get_storage_backend
+
+    if not company.drive_folder_id:
+        return None
+    storage = get_storage_backend(company)
+    return storage.client if storage.name == 'google_drive' else None
+
+
+_state: Dict[str, Any] = {'status': WARMUP_DISABLED}
+_state_lock = threading.Lock()
+# Proceso dueño de _state: un worker creado con fork hereda el estado pero no el hilo
+_state_pid: Optional[int] = None
+
+
+def get_warmup_state() -> Dict[str, Any]:
+    """
+    Retorna el estado de la precarga de carpetas de este proceso.
+
+    Returns:
+        Dict con status y, si corrió, las estadísticas de la precarga
+    """
+    with _state_lock:
+        if _state_pid != os.getpid():
+            return {'status': WARMUP_DISABLED}
+        return dict(_state)
+
+
+def is_ready() -> bool:
+    """
+    Indica si el proceso puede recibir tráfico: la precarga terminó (o se
+    cortó por presupuesto, o falló) o no está activada.
+
+    Returns:
+        bool: True si el proceso está listo
+    """
+    return get_warmup_state()['status'] != WARMUP_RUNNING
+
+
+def ensure_warmup_started() -> Optional[threading.Thread]:
+    """
+    Lanza la precarga si DRIVE_WARMUP_ON_STARTUP está activo y este proceso
+    todavía no la lanzó. Se llama en cada request: con gunicorn --preload la
+    aplicación se carga en el master, así que la precarga tiene que empezar
+    en cada worker y no al importar core.wsgi.
+
+    Returns:
+        threading.Thread: Hilo de la precarga, o None si ya estaba lanzada o no está activada
+    """
+    if not getattr(settings, 'DRIVE_WARMUP_ON_STARTUP', False) or _state_pid == os.getpid():
+        return None
+
+    with _state_lock:
+        if _state_pid == os.getpid():
+            return None
+        return _start_locked()
+
+
+def start_warmup_in_background() -> threading.Thread:
+    """
+    Lanza la precarga de carpetas de las compañías activas en un hilo aparte.
+    Mientras corre, is_ready() retorna False.
+
+    Returns:
+        threading.Thread: Hilo de la precarga
+    """
+    with _state_lock:
+        return _start_locked()
+
+
+def _start_locked() -> threading.Thread:
+    global _state_pid
+    _state.clear()
+    _state.update({'status': WARMUP_RUNNING, 'companies': 0, 'folders': 0, 'depth': 0})
+    _state_pid = os.getpid()
+
+    thread = threading.Thread(target=_run_warmup, name='drive-folder-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_warmup() -> None:
+    from apps.companies.models import Company
+
+    def report(stats: Dict[str, Any]) -> None:
+        with _state_lock:
+            _state.update(stats)
+        logger.info(
+            f"Precarga de carpetas: nivel {stats['depth']}, {stats['folders']} carpetas "
+            f"de {stats['companies']} compañías en {stats['elapsed']}s"
+        )
+
+    try:
+        companies = Company.objects.filter(is_active=True).exclude(drive_folder_id__isnull=True).exclude(drive_folder_id='')
+        stats = FolderCacheWarmer(progress=report).warm(companies)
+        with _state_lock:
+            _state.update(stats)
+            _state['status'] = WARMUP_READY
+
+        if stats['complete']:
+            logger.info(f"Precarga de carpetas completa: {stats['folders']} carpetas en {stats['elapsed']}s")
+        else:
+            logger.warning(f"Precarga de carpetas cortada por presupuesto: {stats['folders']} carpetas en {stats['elapsed']}s")
+
+    except Exception as e:
+        logger.error(f"Error en la precarga de carpetas, se sigue sin caché: {e}")
+        with _state_lock:
+            _state['status'] = WARMUP_FAILED
+
+    finally:
+        connection.close()
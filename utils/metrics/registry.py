@@ -0,0 +1,111 @@
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, Optional
+
+
+def _metric_key(name: str, labels: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Construye la clave de una métrica con sus etiquetas, p. ej. drive.upload.latency{mode=multipart}.
+
+    Args:
+        name: Nombre de la métrica
+        labels: Etiquetas de la métrica (opcional)
+
+    Returns:
+        str: Clave de la métrica
+    """
+    if not labels:
+        return name
+    rendered = ','.join(f'{key}={value}' for key, value in sorted(labels.items()))
+    return f'{name}{{{rendered}}}'
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas en memoria del proceso.
+    Single Responsibility: Solo acumula contadores, gauges y latencias
+
+    Las latencias guardan conteo, suma, máximo y una ventana de las últimas
+    observaciones para calcular percentiles sin crecer sin límite.
+    """
+
+    def __init__(self, window_size: int = 512):
+        self.window_size = window_size
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, Any] = {}
+        self._timings: Dict[str, Dict[str, Any]] = {}
+
+    def increment(self, name: str, value: float = 1, labels: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Incrementa un contador.
+
+        Args:
+            name: Nombre del contador
+            value: Cantidad a sumar
+            labels: Etiquetas (opcional)
+        """
+        with self._lock:
+            self._counters[_metric_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: Any, labels: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Fija el valor actual de un gauge.
+
+        Args:
+            name: Nombre del gauge
+            value: Valor actual
+            labels: Etiquetas (opcional)
+        """
+        with self._lock:
+            self._gauges[_metric_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Registra una observación de latencia (segundos) u otra distribución.
+
+        Args:
+            name: Nombre de la métrica
+            value: Valor observado
+            labels: Etiquetas (opcional)
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = {'count': 0, 'sum': 0.0, 'max': 0.0, 'window': deque(maxlen=self.window_size)}
+                self._timings[key] = timing
+
+            timing['count'] += 1
+            timing['sum'] += value
+            timing['max'] = max(timing['max'], value)
+            timing['window'].append(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna una copia de todas las métricas.
+
+        Returns:
+            Dict con counters, gauges y timings (con p50/p95 de la ventana reciente)
+        """
+        with self._lock:
+            timings = {}
+            for key, timing in self._timings.items():
+                window = sorted(timing['window'])
+                timings[key] = {
+                    'count': timing['count'],
+                    'avg': timing['sum'] / timing['count'],
+                    'max': timing['max'],
+                    'p50': window[int(len(window) * 0.50)],
+                    'p95': window[min(len(window) - 1, int(len(window) * 0.95))],
+                }
+
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'timings': timings,
+            }
+
+
+# Registro compartido por todo el proceso
+metrics = MetricsRegistry()
@@ -0,0 +1 @@
+# Resilience package
\ No newline at end of file
@@ -0,0 +1,274 @@
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+import requests
+from django.conf import settings
+from utils.metrics.registry import metrics
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+# Las llamadas que transfieren datos se comparan en segundos por MiB (como en
+# AdaptiveConcurrencyLimiter): un chunk grande no es una llamada lenta
+_NORMALIZATION_BYTES = 1024 * 1024
+
+
+class CircuitOpenError(Exception):
+    """
+    El circuito de una dependencia está abierto: la llamada se rechaza sin intentarla.
+    """
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuito '{name}' abierto, se reintentará en {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de una dependencia externa.
+    Single Responsibility: Solo decide si se intenta una llamada según el resultado de las anteriores
+
+    Guarda el resultado de las últimas CIRCUIT_BREAKER_WINDOW_SIZE llamadas.
+    Con al menos CIRCUIT_BREAKER_MINIMUM_CALLS, se abre si la proporción de
+    errores o de llamadas lentas supera su umbral (la lentitud se mide por
+    MiB en las llamadas que indican cuántos bytes transfieren). Abierto rechaza al instante
+    con CircuitOpenError; pasados CIRCUIT_BREAKER_OPEN_SECONDS deja pasar unas
+    pocas llamadas de prueba (semiabierto): si todas salen bien se cierra, si
+    alguna falla vuelve a abrirse.
+    """
+
+    def __init__(self, name: str, is_failure: Optional[Callable[[Exception], bool]] = None):
+        """
+        Inicializa el circuito.
+
+        Args:
+            name: Nombre de la dependencia (aparece en health y métricas)
+            is_failure: Indica qué excepciones cuentan como falla de la
+                dependencia (por defecto todas). Un 404 o un 400 no dicen
+                nada de su salud
+        """
+        self.name = name
+        self.is_failure = is_failure or (lambda exception: True)
+        self.failure_rate = getattr(settings, 'CIRCUIT_BREAKER_FAILURE_RATE', 0.5)
+        self.slow_call_seconds = getattr(settings, 'CIRCUIT_BREAKER_SLOW_CALL_SECONDS', 10)
+        self.slow_call_rate = getattr(settings, 'CIRCUIT_BREAKER_SLOW_CALL_RATE', 0.8)
+        self.minimum_calls = getattr(settings, 'CIRCUIT_BREAKER_MINIMUM_CALLS', 10)
+        self.open_seconds = getattr(settings, 'CIRCUIT_BREAKER_OPEN_SECONDS', 30)
+        self.half_open_calls = getattr(settings, 'CIRCUIT_BREAKER_HALF_OPEN_CALLS', 3)
+        self.labels = {'name': name}
+        self._lock = threading.Lock()
+        # (falló, fue lenta) de las últimas llamadas
+        self._calls = deque(maxlen=getattr(settings, 'CIRCUIT_BREAKER_WINDOW_SIZE', 20))
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probes_succeeded = 0
+        # Número de la ronda semiabierta actual: una prueba solo cuenta en su ronda
+        self._half_open_round = 0
+        self._publish()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    @contextmanager
+    def guard(self, size: int = 0):
+        """
+        Ejecuta una llamada a la dependencia dentro del circuito.
+
+        Args:
+            size: Bytes que transfiere la llamada (p. ej. un chunk de subida),
+                para no contar como lenta una llamada que solo es grande
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto (la llamada no se hace)
+        """
+        probe = self._before_call()
+        started = time.monotonic()
+
+        try:
+            yield
+        except Exception as e:
+            self._after_call(probe, failed=self.is_failure(e), elapsed=self._cost(time.monotonic() - started, size))
+            raise
+
+        self._after_call(probe, failed=False, elapsed=self._cost(time.monotonic() - started, size))
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Llama a una función dentro del circuito.
+
+        Args:
+            func: Función que llama a la dependencia
+            *args, **kwargs: Argumentos de la función
+
+        Returns:
+            Lo que retorne la función
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto
+        """
+        with self.guard():
+            return func(*args, **kwargs)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna el estado del circuito para health y diagnóstico.
+
+        Returns:
+            Dict con state, calls, failures y slow_calls de la ventana actual
+        """
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return {
+                'state': self._state,
+                'calls': len(self._calls),
+                'failures': sum(1 for failed, _ in self._calls if failed),
+                'slow_calls': sum(1 for _, slow in self._calls if slow),
+            }
+
+    def _cost(self, elapsed: float, size: int) -> float:
+        return elapsed / max(1.0, size / _NORMALIZATION_BYTES)
+
+    def _before_call(self) -> Optional[int]:
+        """
+        Admite o rechaza una llamada.
+
+        Returns:
+            int: Ronda semiabierta si la llamada es de prueba, None si el circuito está cerrado
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+
+            if self._state == STATE_OPEN:
+                retry_in = self._opened_at + self.open_seconds - now
+            elif self._state == STATE_HALF_OPEN and self._probes_in_flight >= self.half_open_calls:
+                retry_in = 0
+            elif self._state == STATE_HALF_OPEN:
+                self._probes_in_flight += 1
+                return self._half_open_round
+            else:
+                return None
+
+        metrics.increment('circuit_breaker.rejected', labels=self.labels)
+        raise CircuitOpenError(self.name, retry_in)
+
+    def _after_call(self, probe: Optional[int], failed: bool, elapsed: float) -> None:
+        slow = elapsed >= self.slow_call_seconds
+
+        with self._lock:
+            if probe is not None:
+                if self._state != STATE_HALF_OPEN or probe != self._half_open_round:
+                    # Prueba de una ronda que ya terminó: el circuito decidió sin ella
+                    return
+                self._probes_in_flight -= 1
+                if failed or slow:
+                    self._transition(STATE_OPEN, 'falló la llamada de prueba' if failed else f'llamada de prueba lenta ({elapsed:.1f}s)')
+                    return
+                self._probes_succeeded += 1
+                if self._probes_succeeded >= self.half_open_calls:
+                    self._transition(STATE_CLOSED, 'llamadas de prueba exitosas')
+                return
+
+            if self._state != STATE_CLOSED:
+                # Llamada que empezó antes de abrirse el circuito: no es una prueba
+                return
+
+            self._calls.append((failed, slow))
+            if len(self._calls) < self.minimum_calls:
+                return
+
+            failures = sum(1 for call_failed, _ in self._calls if call_failed)
+            slow_calls = sum(1 for _, call_slow in self._calls if call_slow)
+            if failures / len(self._calls) >= self.failure_rate:
+                self._transition(STATE_OPEN, f'{failures} errores en {len(self._calls)} llamadas')
+            elif slow_calls / len(self._calls) >= self.slow_call_rate:
+                self._transition(STATE_OPEN, f'{slow_calls} llamadas de más de {self.slow_call_seconds}s en {len(self._calls)}')
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == STATE_OPEN and now - self._opened_at >= self.open_seconds:
+            self._transition(STATE_HALF_OPEN, f'pasaron {self.open_seconds}s')
+
+    def _transition(self, state: str, reason: str) -> None:
+        self._state = state
+        self._calls.clear()
+        self._probes_in_flight = 0
+        self._probes_succeeded = 0
+        if state == STATE_OPEN:
+            self._opened_at = time.monotonic()
+        elif state == STATE_HALF_OPEN:
+            self._half_open_round += 1
+
+        self._publish()
+        metrics.increment('circuit_breaker.transitions', labels={**self.labels, 'state': state})
+        log = logger.info if state == STATE_CLOSED else logger.warning
+        log(f"Circuito '{self.name}' {state}: {reason}")
+
+    def _publish(self) -> None:
+        metrics.set_gauge('circuit_breaker.state', self._state, self.labels)
+
+
+def is_http_failure(exception: Exception) -> bool:
+    """
+    Indica si un error de requests es una falla del servicio remoto (caída,
+    timeout o 5xx) y no un error del request. Un 429 no cuenta: el servicio
+    está sano y solo nos limita.
+
+    Args:
+        exception: Excepción de requests
+
+    Returns:
+        bool: True si cuenta como falla para el circuito
+    """
+    if isinstance(exception, requests.HTTPError):
+        response = exception.response
+        return response is None or response.status_code >= 500
+
+    return isinstance(exception, (requests.ConnectionError, requests.Timeout))
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, is_failure: Optional[Callable[[Exception], bool]] = None) -> CircuitBreaker:
+    """
+    Retorna el circuito de una dependencia, compartido por todo el proceso.
+
+    Args:
+        name: Nombre de la dependencia (p. ej. 'drive:default', 'twilio')
+        is_failure: Qué excepciones cuentan como falla (se usa al crearlo)
+
+    Returns:
+        CircuitBreaker: Instancia única del circuito
+    """
+    circuit_breaker = _circuit_breakers.get(name)
+    if circuit_breaker is None:
+        with _circuit_breakers_lock:
+            circuit_breaker = _circuit_breakers.get(name)
+            if circuit_breaker is None:
+                circuit_breaker = CircuitBreaker(name, is_failure)
+                _circuit_breakers[name] = circuit_breaker
+    return circuit_breaker
+
+
+def get_circuit_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """
+    Retorna el estado de todos los circuitos creados en este proceso.
+
+    Returns:
+        Dict con el nombre de cada circuito y su snapshot
+    """
+    with _circuit_breakers_lock:
+        circuit_breakers = list(_circuit_breakers.values())
+    return {circuit_breaker.name: circuit_breaker.snapshot() for circuit_breaker in circuit_breakers}
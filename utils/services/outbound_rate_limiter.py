@@ -0,0 +1,104 @@
+import threading
+import time
+import logging
+from typing import Optional
+from django.conf import settings
+from utils.drive.rate_limiter import LocalBucketStore, RedisBucketStore, build_bucket_store
+from utils.metrics.registry import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundRateLimiter:
+    """
+    Limitador de envíos a WhatsApp por destino y por cuenta de Twilio.
+    Single Responsibility: Solo decide si un envío puede salir ahora o cuánto debe esperar
+
+    Usa los mismos token buckets que el limitador de Drive. Nunca espera:
+    si no hay tokens retorna la espera y el worker reprograma el envío,
+    así un destino saturado no frena a los demás. Los buckets de cuenta
+    son compartidos entre procesos; los de destino solo si el backend es
+    Redis (con 'database' serían una fila por número, se llevan en memoria).
+    """
+
+    def __init__(self, store=None):
+        """
+        Inicializa el limitador.
+
+        Args:
+            store: Backend de los buckets (por defecto WHATSAPP_RATE_LIMIT_BACKEND)
+        """
+        self.store = store or build_bucket_store(getattr(settings, 'WHATSAPP_RATE_LIMIT_BACKEND', ''))
+        self.destination_store = self.store if isinstance(self.store, RedisBucketStore) else LocalBucketStore()
+        self.fallback_store = LocalBucketStore()
+        self.account_rate = getattr(settings, 'WHATSAPP_ACCOUNT_RATE', 20)
+        self.account_burst = getattr(settings, 'WHATSAPP_ACCOUNT_BURST', 20)
+        self.destination_rate = getattr(settings, 'WHATSAPP_DESTINATION_RATE', 1)
+        self.destination_burst = getattr(settings, 'WHATSAPP_DESTINATION_BURST', 3)
+
+    def reserve(self, account: str, to_number: str) -> float:
+        """
+        Reserva un envío si el destino y la cuenta tienen cupo.
+
+        Args:
+            account: Cuenta de Twilio (Account SID)
+            to_number: Número de destino
+
+        Returns:
+            float: 0 si el envío puede salir ya, o los segundos a esperar
+        """
+        # Primero el destino: si después la cuenta no tiene cupo, ese token del
+        # destino se pierde y el destino espera un poco más (nunca de menos)
+        wait = self._reserve(self.destination_store, f'whatsapp:rate:destination:{to_number}',
+                             self.destination_rate, self.destination_burst)
+        if wait == 0:
+            wait = self._reserve(self.store, f'whatsapp:rate:account:{account}', self.account_rate, self.account_burst)
+
+        if wait > 0:
+            metrics.observe('whatsapp.rate_limit.wait', wait)
+        return wait
+
+    def penalize(self, account: str, retry_after: float) -> None:
+        """
+        Vacía el bucket de la cuenta tras un 429 para que todos los workers
+        hagan pausa durante Retry-After.
+
+        Args:
+            account: Cuenta de Twilio (Account SID)
+            retry_after: Segundos de pausa pedidos por Twilio
+        """
+        name = f'whatsapp:rate:account:{account}'
+        logger.warning(f"Twilio limitó los envíos de {account}, pausando {retry_after:.0f}s")
+        metrics.increment('whatsapp.rate_limit.throttled')
+
+        try:
+            self.store.drain(name, self.account_rate, retry_after, time.time())
+        except Exception as e:
+            logger.warning(f"Backend del limitador de WhatsApp no disponible, usando límite local: {e}")
+            self.fallback_store.drain(name, self.account_rate, retry_after, time.time())
+
+    def _reserve(self, store, name: str, rate: float, burst: float) -> float:
+        try:
+            return store.reserve(name, rate, burst, 1, 0, time.time())
+        except Exception as e:
+            logger.warning(f"Backend del limitador de WhatsApp no disponible, usando límite local: {e}")
+            return self.fallback_store.reserve(name, rate, burst, 1, 0, time.time())
+
+
+_outbound_rate_limiter: Optional[OutboundRateLimiter] = None
+_outbound_rate_limiter_lock = threading.Lock()
+
+
+def get_outbound_rate_limiter() -> OutboundRateLimiter:
+    """
+    Retorna el limitador de envíos a WhatsApp, compartido por todo el proceso.
+
+    Returns:
+        OutboundRateLimiter: Instancia única del limitador
+    """
+    global _outbound_rate_limiter
+    if _outbound_rate_limiter is None:
+        with _outbound_rate_limiter_lock:
+            if _outbound_rate_limiter is None:
+                _outbound_rate_limiter = OutboundRateLimiter()
+    return _outbound_rate_limiter
@@ -1,7 +1,29 @@
+import threading
 from typing import Dict, Any, Optional
 from django.conf import settings
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from apps.agentmessages.services import OutboundMessageService
 from apps.sources.models import Source
+from utils.resilience.circuit_breaker import CircuitOpenError, get_circuit_breaker, is_http_failure
+
+_sessions = threading.local()
+
+
+def _get_session() -> requests.Session:
+    """
+    Retorna la sesión HTTP del hilo actual: reutiliza conexiones con Twilio
+    entre envíos. Solo reintenta errores de conexión (el POST no llegó a
+    salir); los demás reintentos los programa la cola con backoff.
+    """
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        retries = Retry(total=2, connect=2, read=0, status=0, other=0, backoff_factor=0.5)
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(max_retries=retries))
+        _sessions.session = session
+    return session
 
 
 class WhatsAppService:
@@ -15,18 +37,49 @@ class WhatsAppService:
     
     def send_message(self, to_number: str, message: str) -> Dict[str, Any]:
         """
-        Envía un mensaje a WhatsApp usando Twilio.
+        Envía un mensaje a WhatsApp. Con WHATSAPP_ASYNC_REPLIES se encola y lo
+        envía el worker run_whatsapp_sender, fuera del request del webhook.
         
         Args:
             to_number: Número de destino (con prefijo internacional)
             message: Mensaje a enviar
             
         Returns:
-            Dict con resultado del envío
+            Dict con resultado del envío (o del encolado)
+        """
+        if not getattr(settings, 'WHATSAPP_ASYNC_REPLIES', True) or not self.source:
+            return self.deliver(to_number, message)
+        
+        try:
+            outbound = OutboundMessageService().enqueue(self.source, to_number, message)
+            return {
+                'success': True,
+                'queued': True,
+                'outbound_message_id': outbound.id
+            }
+        except Exception as e:
+            print(f"❌ Error encolando mensaje a WhatsApp: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def deliver(self, to_number: str, message: str) -> Dict[str, Any]:
+        """
+        Envía un mensaje a WhatsApp usando Twilio, en el momento.
+        
+        Args:
+            to_number: Número de destino (con prefijo internacional)
+            message: Mensaje a enviar
+            
+        Returns:
+            Dict con resultado del envío; si falla, retryable indica si el
+            error es transitorio y conviene reintentar, y retry_after (solo
+            en un 429) cuántos segundos esperar
         """
         try:
             if not self.source:
-                raise Exception("Source no disponible para enviar mensaje")
+                raise ValueError("Source no disponible para enviar mensaje")
             
             # Obtener credenciales de Twilio
             credentials = self.source.get_credentials()
@@ -34,7 +87,7 @@ class WhatsAppService:
             auth_token = credentials.get('additional2')   # Auth Token
             
             if not account_sid or not auth_token:
-                raise Exception("Credenciales de Twilio no configuradas")
+                raise ValueError("Credenciales de Twilio no configuradas")
             
             # URL de la API de Twilio
             url = f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
@@ -51,12 +104,26 @@ class WhatsAppService:
                 'Body': message
             }
             
-            # Enviar mensaje
-            response = requests.post(
-                url,
-                data=data,
-                auth=(account_sid, auth_token)
-            )
+            # Enviar mensaje (con Twilio caído se falla al instante en vez de esperar el timeout)
+            with get_circuit_breaker('twilio', is_http_failure).guard():
+                response = _get_session().post(
+                    url,
+                    data=data,
+                    auth=(account_sid, auth_token),
+                    timeout=getattr(settings, 'OUTBOUND_HTTP_TIMEOUT', 30)
+                )
+                if response.status_code >= 500:
+                    response.raise_for_status()
+            
+            if response.status_code == 429:
+                # Twilio nos limita: no es una caída, se reintenta tras Retry-After sin gastar intentos
+                print(f"⚠️ Twilio limitó el envío a {clean_number}")
+                return {
+                    'success': False,
+                    'retryable': True,
+                    'retry_after': _get_retry_after(response),
+                    'error': f"HTTP 429: {response.text}"
+                }
             
             if response.status_code == 201:
                 result = response.json()
@@ -72,6 +139,7 @@ class WhatsAppService:
                 print(f"❌ Error enviando mensaje a WhatsApp: {response.status_code} - {response.text}")
                 return {
                     'success': False,
+                    'retryable': False,
                     'error': f"HTTP {response.status_code}: {response.text}"
                 }
                 
@@ -79,29 +147,52 @@ class WhatsAppService:
             print(f"❌ Error enviando mensaje a WhatsApp: {e}")
             return {
                 'success': False,
+                'retryable': isinstance(e, CircuitOpenError) or is_http_failure(e),
                 'error': str(e)
             }
     
-    def send_file_uploaded_response(self, to_number: str, filename: str, company_name: str = None, drive_shared_link: str = None) -> Dict[str, Any]:
+    def send_file_uploaded_response(self, to_number: str, filename: str, company_name: str = None, drive_shared_link: str = None,
+                                    folder_link: str = None) -> Dict[str, Any]:
         """
-        Envía respuesta cuando se carga un archivo exitosamente.
+        Envía respuesta cuando se carga un archivo exitosamente. Con
+        WHATSAPP_COALESCE_SECONDS, las confirmaciones de una ráfaga de archivos
+        del mismo remitente salen juntas en un solo mensaje.
         
         Args:
             to_number: Número de destino
             filename: Nombre del archivo cargado
             company_name: Nombre de la compañía (opcional)
+            drive_shared_link: Enlace al archivo (opcional)
+            folder_link: Enlace a la carpeta del día (opcional)
             
         Returns:
-            Dict con resultado del envío
+            Dict con resultado del envío (o del encolado)
         """
-        if company_name:
-            message = f"📁 Archivo '{filename}' cargado exitosamente en la carpeta de {company_name}. "
-            if drive_shared_link:
-                message += f"\n\nEnlace compartido: {drive_shared_link}"
-        else:
-            message = f"📁 Archivo '{filename}' cargado exitosamente."
+        item = {'filename': filename, 'link': drive_shared_link or ''}
+        context = {'company_name': company_name or ''}
+        if folder_link:
+            context['folder_link'] = folder_link
         
-        return self.send_message(to_number, message)
+        coalesce = (getattr(settings, 'WHATSAPP_ASYNC_REPLIES', True)
+                    and getattr(settings, 'WHATSAPP_COALESCE_SECONDS', 10) > 0 and self.source)
+        if not coalesce:
+            return self.send_message(to_number, _render_files_uploaded({**context, 'items': [item]}))
+        
+        try:
+            outbound = OutboundMessageService().enqueue_coalesced(
+                self.source, to_number, 'file_uploaded', item, _render_files_uploaded, context
+            )
+            return {
+                'success': True,
+                'queued': True,
+                'outbound_message_id': outbound.id
+            }
+        except Exception as e:
+            print(f"❌ Error encolando mensaje a WhatsApp: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
     
     def send_no_file_response(self, to_number: str) -> Dict[str, Any]:
         """
@@ -129,3 +220,60 @@ class WhatsAppService:
         """
         message = f"❌ {error_message}. Por favor, intente nuevamente."
         return self.send_message(to_number, message)
+
+
+def _get_retry_after(response: requests.Response) -> float:
+    """
+    Retorna la pausa pedida por Twilio en un 429 (Retry-After), o la de
+    WHATSAPP_RATE_LIMIT_PENALTY_SECONDS si no la indica.
+    """
+    try:
+        return max(0.0, float(response.headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return float(getattr(settings, 'WHATSAPP_RATE_LIMIT_PENALTY_SECONDS', 5))
+
+
+# Twilio corta los mensajes de WhatsApp en 1600 caracteres
+_MAX_BODY_LENGTH = 1600
+
+
+def _render_files_uploaded(context: Dict[str, Any]) -> str:
+    """
+    Arma la confirmación de uno o varios archivos cargados.
+    
+    Args:
+        context: items (filename y link de cada archivo), company_name y folder_link
+        
+    Returns:
+        str: Texto del mensaje
+    """
+    items = context['items']
+    company_name = context.get('company_name')
+    
+    if len(items) == 1:
+        item = items[0]
+        if company_name:
+            message = f"📁 Archivo '{item['filename']}' cargado exitosamente en la carpeta de {company_name}. "
+            if item['link']:
+                message += f"\n\nEnlace compartido: {item['link']}"
+        else:
+            message = f"📁 Archivo '{item['filename']}' cargado exitosamente."
+        return message
+    
+    header = f"📁 {len(items)} archivos cargados exitosamente"
+    if company_name:
+        header += f" en la carpeta de {company_name}"
+    footer = f"\n\nCarpeta del día: {context['folder_link']}" if context.get('folder_link') else ''
+    
+    # Se listan los nombres que entran; del resto solo se informa la cantidad
+    budget = _MAX_BODY_LENGTH - len(header) - len(footer) - 40
+    lines = []
+    for item in items:
+        line = f"• {item['filename']}"
+        if len(line) + 1 > budget:
+            lines.append(f"… y {len(items) - len(lines)} más")
+            break
+        lines.append(line)
+        budget -= len(line) + 1
+    
+    return header + ":\n" + "\n".join(lines) + footer
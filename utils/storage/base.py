@@ -0,0 +1,167 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class StorageBackend(ABC):
+    """
+    Backend de almacenamiento de los archivos recibidos.
+    Strategy Pattern: Permite intercambiar Google Drive por otro almacenamiento
+
+    Las carpetas y archivos se identifican con IDs opacos del backend (IDs de
+    Drive, rutas relativas en disco, etc.) y los resultados usan el mismo
+    formato en todos los backends.
+    """
+
+    name: str = ''
+
+    @abstractmethod
+    def get_company_root(self, company) -> str:
+        """
+        Retorna el ID de la carpeta raíz de una compañía.
+
+        Args:
+            company: Compañía
+
+        Returns:
+            str: ID de la carpeta raíz
+
+        Raises:
+            ValueError: Si la compañía no tiene carpeta configurada
+        """
+        pass
+
+    @abstractmethod
+    def ensure_folder_path(self, root_id: str, segments: Tuple[str, ...], company_id: int = None) -> str:
+        """
+        Obtiene o crea una ruta de carpetas bajo la raíz.
+
+        Args:
+            root_id: ID de la carpeta raíz
+            segments: Nombres de las carpetas desde la raíz
+            company_id: ID de la compañía (opcional)
+
+        Returns:
+            str: ID de la carpeta final
+        """
+        pass
+
+    def ensure_folder_paths(self, root_id: str, paths: List[Tuple[str, ...]], company_id: int = None) -> Dict[Tuple[str, ...], str]:
+        """
+        Obtiene o crea varias rutas de carpetas bajo una misma raíz.
+
+        Args:
+            root_id: ID de la carpeta raíz
+            paths: Rutas como tuplas de nombres
+            company_id: ID de la compañía (opcional)
+
+        Returns:
+            Dict ruta -> ID de la carpeta final
+        """
+        return {path: self.ensure_folder_path(root_id, path, company_id) for path in paths}
+
+    @abstractmethod
+    def upload_file(self, file_content: bytes, filename: str, folder_id: str, mime_type: str = None) -> Dict[str, Any]:
+        """
+        Guarda un archivo en una carpeta.
+
+        Args:
+            file_content: Contenido del archivo en bytes
+            filename: Nombre del archivo
+            folder_id: ID de la carpeta destino
+            mime_type: Tipo MIME del archivo
+
+        Returns:
+            Dict con file_id, filename, size, web_view_link, web_content_link y folder_id
+        """
+        pass
+
+    @abstractmethod
+    def get_file_info(self, file_id: str) -> Dict[str, Any]:
+        """
+        Obtiene la metadata de un archivo.
+
+        Args:
+            file_id: ID del archivo
+
+        Returns:
+            Dict con file_id, filename, size, mime_type, created_time,
+            modified_time, web_view_link y web_content_link
+        """
+        pass
+
+    @abstractmethod
+    def list_children(self, parent_id: str, folders_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Lista el contenido de una carpeta, del más antiguo al más nuevo.
+
+        Args:
+            parent_id: ID de la carpeta
+            folders_only: Si es True, solo retorna subcarpetas
+
+        Returns:
+            List con id, name, mimeType y createdTime de cada elemento
+        """
+        pass
+
+    def list_children_page(self, parent_id: str, page_token: Optional[str] = None,
+                           page_size: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Lista una página del contenido de una carpeta.
+
+        Args:
+            parent_id: ID de la carpeta
+            page_token: Token de la página (None para la primera)
+            page_size: Elementos por página
+
+        Returns:
+            Tuple con (elementos, token de la página siguiente o None)
+
+        Raises:
+            ValueError: Si el token no es válido
+        """
+        try:
+            offset = int(page_token or 0)
+        except ValueError:
+            raise ValueError(f"Token de página inválido: {page_token}")
+        children = self.list_children(parent_id)
+        end = offset + page_size
+        return children[offset:end], (str(end) if end < len(children) else None)
+
+    def owns_folder(self, company, folder_id: str) -> bool:
+        """
+        Indica si una carpeta pertenece al árbol de una compañía.
+
+        Args:
+            company: Compañía
+            folder_id: ID de la carpeta
+
+        Returns:
+            bool: True si la compañía puede ver la carpeta
+        """
+        return folder_id == self.get_company_root(company)
+
+    def get_folder_link(self, folder_id: str) -> str:
+        """
+        Retorna el enlace para abrir una carpeta.
+
+        Args:
+            folder_id: ID de la carpeta
+
+        Returns:
+            str: Enlace a la carpeta, o '' si el backend no tiene uno
+        """
+        return ''
+
+    @abstractmethod
+    def move_files(self, moves: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Mueve varios archivos a otras carpetas.
+
+        Args:
+            moves: file_id -> ID de la carpeta destino
+
+        Returns:
+            Dict file_id original -> file_id y web_view_link tras moverlo
+            (se omiten los que fallan)
+        """
+        pass
@@ -0,0 +1,69 @@
+from typing import Dict, Type
+from django.conf import settings
+from django.utils.module_loading import import_string
+from utils.storage.base import StorageBackend
+
+
+class StorageFactory:
+    """
+    Factory para crear backends de almacenamiento.
+    Factory Pattern: Centraliza la creación de backends de almacenamiento
+    """
+
+    # Se importan en su primer uso: el backend local no arrastra el cliente de Drive
+    _backends: Dict[str, str] = {
+        'google_drive': 'utils.storage.google_drive.GoogleDriveStorage',
+        'local': 'utils.storage.local.LocalFileSystemStorage',
+    }
+
+    _loaded_backends: Dict[str, Type[StorageBackend]] = {}
+
+    @classmethod
+    def create_backend(cls, name: str, company=None) -> StorageBackend:
+        """
+        Crea un backend de almacenamiento.
+
+        Args:
+            name: Nombre del backend (google_drive, local)
+            company: Compañía para la que se usa el backend
+
+        Returns:
+            StorageBackend: Instancia del backend
+
+        Raises:
+            ValueError: Si el backend no está soportado
+        """
+        if name not in cls._backends:
+            raise ValueError(f"Backend de almacenamiento no soportado: {name}")
+
+        backend_class = cls._loaded_backends.get(name)
+        if backend_class is None:
+            backend_class = import_string(cls._backends[name])
+            cls._loaded_backends[name] = backend_class
+
+        return backend_class(company)
+
+    @classmethod
+    def get_supported_backends(cls) -> list:
+        """
+        Retorna lista de backends soportados.
+
+        Returns:
+            list: Lista de backends soportados
+        """
+        return list(cls._backends.keys())
+
+
+def get_storage_backend(company) -> StorageBackend:
+    """
+    Retorna el backend de almacenamiento de una compañía: el configurado en
+    la compañía o, si no tiene, STORAGE_BACKEND.
+
+    Args:
+        company: Compañía
+
+    Returns:
+        StorageBackend: Backend de la compañía
+    """
+    name = company.storage_backend or getattr(settings, 'STORAGE_BACKEND', 'google_drive')
+    return StorageFactory.create_backend(name, company)
@@ -0,0 +1,61 @@
+from typing import Any, Dict, List, Optional, Tuple
+from apps.drive.selectors import DriveFolderSelector
+from utils.drive.service_account_client import GoogleDriveServiceAccountClient, get_drive_client_for_company
+from utils.storage.base import StorageBackend
+
+
+class GoogleDriveStorage(StorageBackend):
+    """
+    Almacenamiento en Google Drive.
+    Single Responsibility: Solo adapta el cliente de Drive a la interfaz de almacenamiento
+    """
+
+    name = 'google_drive'
+
+    def __init__(self, company=None, client: GoogleDriveServiceAccountClient = None):
+        """
+        Inicializa el backend.
+
+        Args:
+            company: Compañía (define la Service Account del pool a usar)
+            client: Cliente de Drive ya construido (opcional)
+        """
+        self.client = client or get_drive_client_for_company(company)
+
+    def get_company_root(self, company) -> str:
+        if not company.drive_folder_id:
+            raise ValueError(f"La compañía {company.name} no tiene carpeta de Drive configurada")
+        return company.drive_folder_id
+
+    def ensure_folder_path(self, root_id: str, segments: Tuple[str, ...], company_id: int = None) -> str:
+        return self.client.ensure_folder_path(root_id, segments, company_id)
+
+    def ensure_folder_paths(self, root_id: str, paths: List[Tuple[str, ...]], company_id: int = None) -> Dict[Tuple[str, ...], str]:
+        return self.client.ensure_folder_paths_batch(root_id, paths, company_id)
+
+    def upload_file(self, file_content: bytes, filename: str, folder_id: str, mime_type: str = None) -> Dict[str, Any]:
+        return self.client.upload_file(file_content, filename, folder_id, mime_type)
+
+    def get_file_info(self, file_id: str) -> Dict[str, Any]:
+        return self.client.get_file_info(file_id)
+
+    def list_children(self, parent_id: str, folders_only: bool = False) -> List[Dict[str, Any]]:
+        return self.client.list_children(parent_id, folders_only)
+
+    def list_children_page(self, parent_id: str, page_token: Optional[str] = None,
+                           page_size: int = 100) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        return self.client.list_children_page(parent_id, page_token, page_size)
+
+    def owns_folder(self, company, folder_id: str) -> bool:
+        # Fuera de la raíz solo se aceptan carpetas del índice de la compañía
+        if folder_id == self.get_company_root(company):
+            return True
+        folder = DriveFolderSelector.get_folder_by_folder_id(folder_id)
+        return folder is not None and folder.company_id == company.id
+
+    def get_folder_link(self, folder_id: str) -> str:
+        return f'https://drive.google.com/drive/folders/{folder_id}'
+
+    def move_files(self, moves: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        # En Drive el ID y el enlace no cambian al mover
+        return {file_id: {'file_id': file_id} for file_id in self.client.move_files_batch(moves)}
@@ -0,0 +1,172 @@
+import mimetypes
+import os
+import uuid
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from django.conf import settings
+from utils.storage.base import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+
+class LocalFileSystemStorage(StorageBackend):
+    """
+    Almacenamiento en el sistema de archivos local.
+    Single Responsibility: Solo guarda y lista archivos bajo LOCAL_STORAGE_ROOT
+
+    Los IDs de carpetas y archivos son rutas relativas a la raíz, así que
+    no hace falta ningún índice: resolver una ruta es un mkdir.
+    """
+
+    name = 'local'
+
+    def __init__(self, company=None, root: str = None):
+        """
+        Inicializa el backend.
+
+        Args:
+            company: Compañía (no se usa; todas comparten la raíz)
+            root: Directorio raíz (por defecto LOCAL_STORAGE_ROOT)
+        """
+        self.root = Path(root or getattr(settings, 'LOCAL_STORAGE_ROOT', Path(settings.BASE_DIR) / 'storage')).resolve()
+        self.base_url = getattr(settings, 'LOCAL_STORAGE_BASE_URL', '')
+
+    def get_company_root(self, company) -> str:
+        root_id = f'company-{company.id}'
+        self._path(root_id).mkdir(parents=True, exist_ok=True)
+        return root_id
+
+    def ensure_folder_path(self, root_id: str, segments: Tuple[str, ...], company_id: int = None) -> str:
+        folder_id = '/'.join([root_id, *(self._safe_name(segment) for segment in segments)])
+        self._path(folder_id).mkdir(parents=True, exist_ok=True)
+        return folder_id
+
+    def upload_file(self, file_content: bytes, filename: str, folder_id: str, mime_type: str = None) -> Dict[str, Any]:
+        path = self._path(f'{folder_id}/{self._safe_name(filename)}')
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Escritura atómica: un lector nunca ve el archivo a medio escribir
+        temporary_path = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+        temporary_path.write_bytes(file_content)
+        try:
+            path = self._link_unique(temporary_path, path)
+        finally:
+            temporary_path.unlink()
+        file_id = f'{folder_id}/{path.name}'
+
+        return {
+            'file_id': file_id,
+            'filename': path.name,
+            'size': str(len(file_content)),
+            'web_view_link': self._link(file_id),
+            'web_content_link': self._link(file_id),
+            'folder_id': folder_id
+        }
+
+    def get_file_info(self, file_id: str) -> Dict[str, Any]:
+        path = self._path(file_id)
+        stat = path.stat()
+
+        return {
+            'file_id': file_id,
+            'filename': path.name,
+            'size': str(stat.st_size),
+            'mime_type': mimetypes.guess_type(path.name)[0] or 'application/octet-stream',
+            'created_time': self._timestamp(stat.st_ctime),
+            'modified_time': self._timestamp(stat.st_mtime),
+            'web_view_link': self._link(file_id),
+            'web_content_link': self._link(file_id)
+        }
+
+    def list_children(self, parent_id: str, folders_only: bool = False) -> List[Dict[str, Any]]:
+        children = []
+        with os.scandir(self._path(parent_id)) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or (folders_only and not entry.is_dir()):
+                    continue
+
+                children.append({
+                    'id': f'{parent_id}/{entry.name}',
+                    'name': entry.name,
+                    'mimeType': FOLDER_MIME_TYPE if entry.is_dir() else (mimetypes.guess_type(entry.name)[0] or 'application/octet-stream'),
+                    'createdTime': self._timestamp(entry.stat().st_ctime)
+                })
+
+        return sorted(children, key=lambda child: (child['createdTime'], child['name']))
+
+    def owns_folder(self, company, folder_id: str) -> bool:
+        # Se comparan rutas resueltas: 'company-1/../company-2' empieza igual pero es otra compañía
+        if '..' in folder_id.replace('\\', '/').split('/'):
+            return False
+
+        try:
+            path = self._path(folder_id)
+        except ValueError:
+            return False
+
+        company_root = self._path(self.get_company_root(company))
+        return path == company_root or company_root in path.parents
+
+    def get_folder_link(self, folder_id: str) -> str:
+        return self._link(folder_id)
+
+    def move_files(self, moves: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        moved = {}
+        for file_id, folder_id in moves.items():
+            new_file_id = f'{folder_id}/{self._path(file_id).name}'
+            try:
+                if self._path(new_file_id).exists():
+                    raise FileExistsError(f"ya existe {new_file_id}")
+                self._path(folder_id).mkdir(parents=True, exist_ok=True)
+                os.replace(self._path(file_id), self._path(new_file_id))
+            except OSError as e:
+                logger.error(f"Error moviendo '{file_id}' a '{folder_id}': {e}")
+                continue
+            moved[file_id] = {'file_id': new_file_id, 'web_view_link': self._link(new_file_id)}
+        return moved
+
+    def _path(self, item_id: str) -> Path:
+        """
+        Convierte un ID en ruta absoluta, sin permitir salir de la raíz.
+        """
+        path = (self.root / item_id).resolve()
+        if path != self.root and self.root not in path.parents:
+            raise ValueError(f"Ruta fuera del almacenamiento local: {item_id}")
+        return path
+
+    def _link_unique(self, source: Path, path: Path) -> Path:
+        """
+        Publica source en path sin pisar un archivo existente: si el nombre
+        ya está tomado se agrega un sufijo (nombre (1).ext, nombre (2).ext...).
+
+        Returns:
+            Path: Ruta final del archivo
+        """
+        candidate = path
+        attempt = 0
+        while True:
+            try:
+                # link falla si el destino existe, a diferencia de replace
+                os.link(source, candidate)
+                return candidate
+            except FileExistsError:
+                attempt += 1
+                candidate = path.with_name(f'{path.stem} ({attempt}){path.suffix}')
+
+    def _safe_name(self, name: str) -> str:
+        name = name.replace('/', '_').replace('\\', '_').strip()
+        if name in ('', '.', '..'):
+            raise ValueError(f"Nombre inválido para el almacenamiento local: {name!r}")
+        return name
+
+    def _link(self, file_id: str) -> str:
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{file_id}"
+        return self._path(file_id).as_uri()
+
+    def _timestamp(self, value: float) -> str:
+        return datetime.fromtimestamp(value, tz=timezone.utc).isoformat().replace('+00:00', 'Z')
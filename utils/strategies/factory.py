@@ -1,7 +1,6 @@
 from typing import Dict, Type
+from django.utils.module_loading import import_string
 from utils.strategies.base import MessageStrategy
-from utils.strategies.twilio_strategy import TwilioWhatsAppStrategy
-from utils.strategies.telegram_strategy import TelegramStrategy
 
 
 class StrategyFactory:
@@ -9,38 +8,59 @@ class StrategyFactory:
     Factory para crear estrategias de procesamiento de mensajes.
     Factory Pattern: Centraliza la creación de estrategias
     """
-    
-    _strategies: Dict[str, Type[MessageStrategy]] = {
-        'whatsapp': TwilioWhatsAppStrategy,
-        'telegram': TelegramStrategy,
+
+    # Las estrategias se registran por ruta y se importan en su primer uso,
+    # así cargar las URLs no arrastra Drive, Twilio ni requests
+    _strategies: Dict[str, str] = {
+        'whatsapp': 'utils.strategies.twilio_strategy.TwilioWhatsAppStrategy',
+        'telegram': 'utils.strategies.telegram_strategy.TelegramStrategy',
     }
-    
+
+    _loaded_strategies: Dict[str, Type[MessageStrategy]] = {}
+
     @classmethod
     def create_strategy(cls, platform: str, source=None) -> MessageStrategy:
         """
         Crea una estrategia para la plataforma especificada.
-        
+
         Args:
             platform: Nombre de la plataforma (whatsapp, telegram)
             source: Objeto Source para la estrategia
-            
+
         Returns:
             MessageStrategy: Instancia de la estrategia
-            
+
         Raises:
             ValueError: Si la plataforma no está soportada
         """
         if platform not in cls._strategies:
             raise ValueError(f"Plataforma no soportada: {platform}")
-        
-        strategy_class = cls._strategies[platform]
+
+        strategy_class = cls._get_strategy_class(platform)
         return strategy_class(source)
-    
+
+    @classmethod
+    def _get_strategy_class(cls, platform: str) -> Type[MessageStrategy]:
+        """
+        Importa la clase de la estrategia la primera vez que se necesita.
+
+        Args:
+            platform: Nombre de la plataforma
+
+        Returns:
+            Type[MessageStrategy]: Clase de la estrategia
+        """
+        strategy_class = cls._loaded_strategies.get(platform)
+        if strategy_class is None:
+            strategy_class = import_string(cls._strategies[platform])
+            cls._loaded_strategies[platform] = strategy_class
+        return strategy_class
+
     @classmethod
     def get_supported_platforms(cls) -> list:
         """
         Retorna lista de plataformas soportadas.
-        
+
         Returns:
             list: Lista de plataformas soportadas
         """
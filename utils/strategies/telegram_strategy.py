@@ -7,6 +7,7 @@ from utils.drive.service import DriveService
 from apps.agentmessages.services import MessageService as AgentMessageService
 from apps.users.services import UserService
 from apps.sources.services import SourceService
+from utils.resilience.circuit_breaker import get_circuit_breaker, is_http_failure
 
 
 class TelegramStrategy(MessageStrategy):
@@ -223,10 +224,15 @@ class TelegramStrategy(MessageStrategy):
             bytes: Contenido del archivo o None si hay error
         """
         try:
+            # Con Telegram caído se falla al instante en vez de esperar el timeout
+            circuit_breaker = get_circuit_breaker('telegram', is_http_failure)
+            timeout = getattr(settings, 'OUTBOUND_HTTP_TIMEOUT', 30)
+            
             # Primero obtener la información del archivo
             get_file_url = f"https://api.telegram.org/bot{bot_token}/getFile"
-            get_file_response = requests.get(get_file_url, params={'file_id': file_id})
-            get_file_response.raise_for_status()
+            with circuit_breaker.guard():
+                get_file_response = requests.get(get_file_url, params={'file_id': file_id}, timeout=timeout)
+                get_file_response.raise_for_status()
             
             file_info = get_file_response.json()
             if not file_info.get('ok'):
@@ -236,8 +242,9 @@ class TelegramStrategy(MessageStrategy):
             
             # Descargar el archivo
             download_url = f"https://api.telegram.org/file/bot{bot_token}/{file_path}"
-            download_response = requests.get(download_url)
-            download_response.raise_for_status()
+            with circuit_breaker.guard():
+                download_response = requests.get(download_url, timeout=timeout)
+                download_response.raise_for_status()
             
             return download_response.content
             
@@ -273,9 +280,9 @@ class TelegramStrategy(MessageStrategy):
             # Determinar MIME type basado en el tipo de archivo
             mime_type = self._get_mime_type_from_file_type(file_info['file_type'])
             
-            # Subir a Google Drive
+            # Subir a Google Drive (al spool local si Drive no responde)
             drive_service = DriveService()
-            drive_result = drive_service.upload_file_from_message(
+            drive_result = drive_service.upload_or_spool(
                 file_content=file_content,
                 filename=file_info['filename'],
                 sender_number=sender_number,
@@ -351,6 +358,15 @@ class TelegramStrategy(MessageStrategy):
                     'drive_file_id': drive_result['drive_file_id'],
                     'drive_shared_link': drive_result['drive_shared_link'],
                     'drive_folder_path': drive_result['drive_folder_path'],
+                    'drive_folder_id': drive_result.get('drive_folder_id', ''),
+                })
+            elif drive_result and drive_result.get('spool_key'):
+                # Archivo en el spool: drain_drive_spool completa los datos de Drive
+                message_data_dict.update({
+                    'drive_folder_path': drive_result['drive_folder_path'],
+                    'drive_status': 'pending',
+                    'spool_key': drive_result['spool_key'],
+                    'spool_host': drive_result['spool_host'],
                 })
             
             # Usar el service para crear el mensaje
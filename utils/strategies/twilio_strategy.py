@@ -8,6 +8,7 @@ from apps.agentmessages.services import MessageService as AgentMessageService
 from apps.users.services import UserService
 from apps.sources.services import SourceService
 from utils.services.whatsapp_service import WhatsAppService
+from utils.resilience.circuit_breaker import get_circuit_breaker, is_http_failure
 
 
 class TwilioWhatsAppStrategy(MessageStrategy):
@@ -82,7 +83,10 @@ class TwilioWhatsAppStrategy(MessageStrategy):
                     # Archivo cargado exitosamente
                     filename = drive_result.get('filename', file_info.get('filename', 'archivo'))
                     company_name = drive_result.get('company_name')
-                    self.whatsapp_service.send_file_uploaded_response(sender_number, filename, company_name, message.drive_shared_link)
+                    self.whatsapp_service.send_file_uploaded_response(
+                        sender_number, filename, company_name, message.drive_shared_link,
+                        folder_link=drive_result.get('drive_folder_link')
+                    )
                 
                 return JsonResponse({
                     'status': 'success',
@@ -219,8 +223,14 @@ class TwilioWhatsAppStrategy(MessageStrategy):
             bytes: Contenido del archivo o None si hay error
         """
         try:
-            response = requests.get(media_url, auth=(auth_sid, auth_token))
-            response.raise_for_status()
+            # Con Twilio caído se falla al instante en vez de esperar el timeout
+            with get_circuit_breaker('twilio', is_http_failure).guard():
+                response = requests.get(
+                    media_url,
+                    auth=(auth_sid, auth_token),
+                    timeout=getattr(settings, 'OUTBOUND_HTTP_TIMEOUT', 30)
+                )
+                response.raise_for_status()
             return response.content
         except Exception as e:
             print(f"Error descargando archivo desde Twilio: {e}")
@@ -260,9 +270,9 @@ class TwilioWhatsAppStrategy(MessageStrategy):
             if not file_content:
                 raise Exception("No se pudo descargar el archivo desde Twilio")
             
-            # Subir a Google Drive
+            # Subir a Google Drive (al spool local si Drive no responde)
             drive_service = DriveService()
-            drive_result = drive_service.upload_file_from_message(
+            drive_result = drive_service.upload_or_spool(
                 file_content=file_content,
                 filename=file_info['filename'],
                 sender_number=sender_number,
@@ -330,6 +340,15 @@ class TwilioWhatsAppStrategy(MessageStrategy):
                     'drive_file_id': drive_result['drive_file_id'],
                     'drive_shared_link': drive_result['drive_shared_link'],
                     'drive_folder_path': drive_result['drive_folder_path'],
+                    'drive_folder_id': drive_result.get('drive_folder_id', ''),
+                })
+            elif drive_result and drive_result.get('spool_key'):
+                # Archivo en el spool: drain_drive_spool completa los datos de Drive
+                message_data.update({
+                    'drive_folder_path': drive_result['drive_folder_path'],
+                    'drive_status': 'pending',
+                    'spool_key': drive_result['spool_key'],
+                    'spool_host': drive_result['spool_host'],
                 })
             
             # Usar el service para crear el mensaje con información de compañía